@@ -0,0 +1,232 @@
+#! /usr/bin/env python3
+
+import argparse
+import math
+import random
+import time
+from typing import Callable, List, Optional, Tuple
+
+import numpy as np
+from map_distance_server import DistanceEngineFactory
+from map_distance_server.srv import GetDistanceMapResponse
+from task_generator.manager.map_manager import MapManager
+from task_generator.shared import Waypoint
+
+
+class LegacyMapManager(MapManager):
+    """
+    Map manager sampling like before the free cell index and the forbidden
+    zone index were introduced, i.e. scanning the whole map for every
+    position and checking it against the list of all forbidden zones.
+    """
+
+    def get_random_pos_on_map(
+        self,
+        safe_dist: float,
+        forbid: bool = True,
+        forbidden_zones: Optional[List[Waypoint]] = None,
+    ) -> Waypoint:
+        safe_dist_in_cells = math.ceil(safe_dist / self._map.info.resolution) + 1
+
+        # converted to cells on every call, as in the original implementation
+        forbidden_zones_in_cells: List[Waypoint] = [
+            (
+                math.ceil(point[0] / self._map.info.resolution),
+                math.ceil(point[1] / self._map.info.resolution),
+                math.ceil(point[2] / self._map.info.resolution),
+            )
+            for point in self._forbidden_zones
+            + (forbidden_zones if forbidden_zones is not None else [])
+        ]
+
+        possible_cells: List[Tuple[np.intp, np.intp]] = (
+            np.array(np.where(self._map_with_distances > safe_dist_in_cells))
+            .transpose()
+            .tolist()
+        )
+
+        assert len(possible_cells) > 0, "No cells available"
+
+        while len(possible_cells) > 0:
+            x, y = possible_cells.pop(random.randrange(len(possible_cells)))
+
+            if self._is_pos_valid(
+                float(x), float(y), safe_dist_in_cells, forbidden_zones_in_cells
+            ):
+                break
+
+        else:
+            raise Exception("can't find any non-occupied spaces")
+
+        point = self._to_waypoint(x, y)
+
+        if forbid:
+            self.forbid([point])
+
+        return point
+
+    def _is_pos_valid(
+        self, x: float, y: float, safe_dist: float, forbidden_zones: List[Waypoint]
+    ):
+        for p in forbidden_zones:
+            f_x, f_y, radius = p
+
+            dist = (
+                math.floor(np.linalg.norm(np.array([x, y]) - np.array([f_x, f_y])))
+                - radius
+            )
+
+            if dist <= safe_dist:
+                return False
+
+        return True
+
+
+def generate_distance_map(size: int, resolution: float, seed: int) -> GetDistanceMapResponse:
+    """
+    Generates a square map with a closed border and randomly placed
+    rectangular obstacles and wraps its distance map into a service response.
+    """
+    rng = np.random.default_rng(seed)
+
+    map_2d = np.zeros((size, size), dtype=np.int8)
+    map_2d[0, :] = map_2d[-1, :] = map_2d[:, 0] = map_2d[:, -1] = 100
+
+    for _ in range(size * size // 2000):
+        x, y = rng.integers(0, size, 2)
+        w, h = rng.integers(1, 10, 2)
+        map_2d[y : y + h, x : x + w] = 100
+
+    distance_map = DistanceEngineFactory.instantiate("chessboard")().compute(map_2d)
+
+    response = GetDistanceMapResponse()
+    response.info.resolution = resolution
+    response.info.width = size
+    response.info.height = size
+    response.data = distance_map.ravel().tolist()
+
+    return response
+
+
+def reset(map_manager: MapManager, n_obstacles: int, n_dynamic_obstacles: int):
+    """
+    Samples the positions of a `RandomTask` reset one after another: robot
+    start and goal, static obstacles and dynamic obstacles with their
+    waypoints.
+    """
+    start_pos = map_manager.get_random_pos_on_map(1.0)
+    map_manager.get_random_pos_on_map(1.0, forbidden_zones=[start_pos])
+
+    map_manager.init_forbidden_zones()
+
+    for _ in range(n_obstacles):
+        map_manager.get_random_pos_on_map(0.5)
+
+    for _ in range(n_dynamic_obstacles):
+        map_manager.get_random_pos_on_map(0.5)
+        map_manager.get_random_pos_on_map(0.1)
+
+
+def reset_batched(map_manager: MapManager, n_obstacles: int, n_dynamic_obstacles: int):
+    """
+    Same reset with the obstacle positions sampled at once, as `ITF_Random`
+    does.
+    """
+    start_pos = map_manager.get_random_pos_on_map(1.0)
+    map_manager.get_random_pos_on_map(1.0, forbidden_zones=[start_pos])
+
+    map_manager.init_forbidden_zones()
+
+    map_manager.sample_positions(
+        n_obstacles + n_dynamic_obstacles, safe_dist=0.5, min_separation=0.5
+    )
+
+    for _ in range(n_dynamic_obstacles):
+        map_manager.get_random_pos_on_map(0.1)
+
+
+def benchmark(
+    map_manager: MapManager,
+    reset_fnc: Callable[[MapManager, int, int], None],
+    n_obstacles: int,
+    n_dynamic_obstacles: int,
+    resets: int,
+) -> float:
+    start = time.perf_counter()
+
+    for _ in range(resets):
+        reset_fnc(map_manager, n_obstacles, n_dynamic_obstacles)
+
+    return (time.perf_counter() - start) / resets
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Compares the reset time of the map manager with and without the free cell index."
+    )
+    parser.add_argument("--sizes", type=int, nargs="+", default=[400, 800])
+    parser.add_argument("--resolution", type=float, default=0.1)
+    parser.add_argument("--obstacles", type=int, default=50)
+    parser.add_argument("--dynamic-obstacles", type=int, default=10)
+    parser.add_argument(
+        "--crowded-size",
+        type=int,
+        default=1600,
+        help="size of the map of an additional run with many obstacles, 0 to skip it",
+    )
+    parser.add_argument("--crowded-obstacles", type=int, default=200)
+    parser.add_argument("--crowded-dynamic-obstacles", type=int, default=20)
+    parser.add_argument("--resets", type=int, default=10)
+    parser.add_argument(
+        "--legacy-resets",
+        type=int,
+        default=1,
+        help="resets of the legacy map manager, a reset takes minutes on the crowded map",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    runs = [(size, args.obstacles, args.dynamic_obstacles) for size in args.sizes]
+    if args.crowded_size > 0:
+        runs.append(
+            (args.crowded_size, args.crowded_obstacles, args.crowded_dynamic_obstacles)
+        )
+
+    print(
+        f"{'size':>6} {'obstacles':>10} {'legacy [s]':>12} {'indexed [s]':>12} "
+        f"{'batched [s]':>12} {'speedup':>10}"
+    )
+
+    for size, n_obstacles, n_dynamic_obstacles in runs:
+        distance_map = generate_distance_map(size, args.resolution, args.seed)
+
+        random.seed(args.seed)
+        np.random.seed(args.seed)
+        legacy = benchmark(
+            LegacyMapManager(distance_map),
+            reset,
+            n_obstacles,
+            n_dynamic_obstacles,
+            args.legacy_resets,
+        )
+
+        random.seed(args.seed)
+        np.random.seed(args.seed)
+        indexed = benchmark(
+            MapManager(distance_map), reset, n_obstacles, n_dynamic_obstacles, args.resets
+        )
+
+        random.seed(args.seed)
+        np.random.seed(args.seed)
+        batched = benchmark(
+            MapManager(distance_map),
+            reset_batched,
+            n_obstacles,
+            n_dynamic_obstacles,
+            args.resets,
+        )
+
+        print(
+            f"{size:>6} {n_obstacles + n_dynamic_obstacles:>10} {legacy:>12.5f} "
+            f"{indexed:>12.5f} {batched:>12.5f} {legacy / batched:>10.1f}"
+        )
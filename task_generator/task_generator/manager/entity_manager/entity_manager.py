@@ -30,7 +30,6 @@ class EntityManager:
 
         self._robot_name = rosparam_get(str, "robot_model", "")
 
-        self._spawned_obstacles = []
         self._namespaces = dict()
 
     def spawn_obstacles(self, obstacles: Collection[Obstacle]):
@@ -63,7 +62,8 @@ class EntityManager:
     def remove_obstacles(self, purge: bool = True):
         """
         Removes obstacles from simulator.
-        @purge: if False, only remove unused obstacles
+        @purge: if False, only remove unused obstacles. Managers pooling
+            obstacles may only mark all of them unused on purge.
         """
         raise NotImplementedError()
 
@@ -1,6 +1,8 @@
-from typing import Collection
+from typing import Collection, Dict, List, Optional, Tuple
+import itertools
 import rospy
 import yaml
+from nav_msgs.msg import MapMetaData, OccupancyGrid
 from task_generator.constants import FlatlandRandomModel
 from task_generator.shared import (
     DynamicObstacle,
@@ -13,6 +15,7 @@ from task_generator.shared import (
     Robot,
 )
 from task_generator.simulators.flatland_simulator import FlatlandSimulator
+from task_generator.utils import rosparam_get
 from .entity_manager import EntityManager
 
 import random
@@ -25,7 +28,35 @@ STATIC_OBS_BASENAME = "static_obs_"
 DYNAMIC_OBS_BASENAME = "dynamic_obs_"
 
 
+@dataclasses.dataclass
+class PooledObstacle:
+    name: str
+    used: bool
+    # slot in the parking area, None if the body isn't parked
+    parking_slot: Optional[int] = None
+
+
 class FlatlandManager(EntityManager):
+    """
+    Obstacles are pooled per footprint class. Instead of deleting and
+    respawning all obstacles on every reset, unused bodies of a previous
+    episode are moved to their new position and only the difference in
+    obstacle count is spawned. Static bodies left unused after a reset are
+    parked in a lot next to the map, bodies exceeding `~obstacle_pool_spare`
+    per footprint class are deleted. Unused dynamic bodies are always
+    deleted, their RandomMove plugin would move them back onto the map.
+    """
+
+    TOPIC_MAP = "/map"
+    # distance of the parking lot to the map border, in meters
+    PARKING_MARGIN = 10.0
+    PARKING_SPACING = 4 * FlatlandRandomModel.MAX_RADIUS
+    PARKING_ROW_LENGTH = 10
+
+    _pool: Dict[str, List[PooledObstacle]]
+    _map_info: Optional[MapMetaData]
+    # parking lot origin of the parked bodies
+    _parked_at: Optional[Tuple[float, float]]
 
     def __init__(self, namespace: Namespace, simulator: FlatlandSimulator):
         super().__init__(namespace, simulator)
@@ -36,75 +67,169 @@ class FlatlandManager(EntityManager):
         self._static_obs_count = 0
         self._dynamic_obs_count = 0
 
+        self._pool = dict()
+        self._pool_spare = rosparam_get(int, "~obstacle_pool_spare", 20)
+
+        self._map_info = None
+        self._parked_at = None
+        self._map_sub = rospy.Subscriber(
+            FlatlandManager.TOPIC_MAP, OccupancyGrid, self._map_callback
+        )
+
+    def _map_callback(self, msg: OccupancyGrid):
+        self._map_info = msg.info
+
     def spawn_obstacle(self, obstacle: ObstacleProps):
         if not self._simulator.spawn_entity(obstacle):
             rospy.logwarn(f"Couldn't spawn obstacle '{obstacle.name}'")
 
     def spawn_obstacles(self, obstacles: Collection[Obstacle]):
-        for obstacle in obstacles:
-            obs_name = FlatlandManager._generate_name(
-                is_dynamic=False, count=self._static_obs_count
-            )
-            obstacle = dataclasses.replace(
-                obstacle,
-                model=ModelWrapper.from_model(
-                    FlatlandManager._generate_YAML_model(obs_name)
-                ),
-            )
-            obstacle = dataclasses.replace(
-                obstacle,
-                name=FlatlandManager._generate_name(
-                    is_dynamic=False, count=self._static_obs_count
-                ),
-            )
+        self._spawn_pooled(obstacles, is_dynamic=False)
+
+    def spawn_dynamic_obstacles(self, obstacles: Collection[DynamicObstacle]):
+        self._spawn_pooled(obstacles, is_dynamic=True)
 
-            self.spawn_obstacle(obstacle)
+    def _spawn_pooled(self, obstacles: Collection[ObstacleProps], is_dynamic: bool):
+        """
+        Reuses unused bodies of the pool and spawns the missing ones in a single request.
+        """
+        pool = self._pool.setdefault(
+            FlatlandManager._footprint_class(is_dynamic), [])
+        free = [body for body in pool if not body.used]
 
-            self._static_obs_count += 1
-            self._spawned_obstacles.append(obs_name)
+        setups: List[ObstacleProps] = []
 
-    def spawn_dynamic_obstacles(self, obstacles: Collection[DynamicObstacle]):
         for obstacle in obstacles:
-            obs_name = FlatlandManager._generate_name(
-                is_dynamic=True, count=self._dynamic_obs_count
-            )
+            if free:
+                body = free.pop()
+                self._simulator.move_entity(body.name, obstacle.position)
+                body.used, body.parking_slot = True, None
+                continue
+
+            if is_dynamic:
+                obs_name = FlatlandManager._generate_name(
+                    is_dynamic=True, count=self._dynamic_obs_count
+                )
+                self._dynamic_obs_count += 1
+            else:
+                obs_name = FlatlandManager._generate_name(
+                    is_dynamic=False, count=self._static_obs_count
+                )
+                self._static_obs_count += 1
+
             obstacle = dataclasses.replace(
                 obstacle,
                 model=ModelWrapper.from_model(
                     FlatlandManager._generate_YAML_model(
-                        name=obs_name, is_dynamic=True)
+                        name=obs_name, is_dynamic=is_dynamic)
                 ),
-            )
-            obstacle = dataclasses.replace(
-                obstacle,
                 name=obs_name,
             )
 
-            self.spawn_obstacle(obstacle)
+            setups.append(obstacle)
+
+        if not setups:
+            return
+
+        results = self._simulator.spawn_entities(setups)
+
+        for obstacle, success in zip(setups, results):
+            if not success:
+                rospy.logwarn(f"Couldn't spawn obstacle '{obstacle.name}'")
+                continue
 
-            self._dynamic_obs_count += 1
-            self._spawned_obstacles.append(obs_name)
+            pool.append(PooledObstacle(name=obstacle.name, used=True))
 
     def remove_obstacles(self, purge: bool = True):
-        return
+        """
+        Parks unused static obstacles next to the map and deletes the ones exceeding
+        the spare pool size and all unused dynamic obstacles.
+        If purge is set, all obstacles are returned to the pool first. They are
+        reused by the next spawns, so this doesn't touch the simulation.
+        """
+        if purge:
+            self.unuse_obstacles()
+            return
+
+        to_delete: List[str] = []
+
+        parking_origin = self._parking_origin()
+        if parking_origin != self._parked_at:
+            # the map changed, parked bodies may be on it now
+            for pool in self._pool.values():
+                for body in pool:
+                    body.parking_slot = None
+            self._parked_at = parking_origin
+
+        # slots are shared by all pools
+        occupied = {
+            body.parking_slot
+            for pool in self._pool.values()
+            for body in pool
+            if body.parking_slot is not None
+        }
+        free_slots = (slot for slot in itertools.count() if slot not in occupied)
 
-    def unuse_obstacles(self):
-        # for i in range(self._static_obs_count):
-        #     self._simulator.delete_entity(
-        #         FlatlandManager._generate_name(is_dynamic=False, count=i)
-        #     )
+        for footprint, pool in self._pool.items():
+            unused = [body for body in pool if not body.used]
 
-        # for i in range(self._dynamic_obs_count):
-        #     self._simulator.delete_entity(
-        #         FlatlandManager._generate_name(is_dynamic=True, count=i)
-        #     )
+            spare = (
+                0
+                if footprint == FlatlandManager._footprint_class(is_dynamic=True)
+                else self._pool_spare
+            )
+
+            for body in unused[spare:]:
+                to_delete.append(body.name)
+
+            for body in unused[:spare]:
+                if body.parking_slot is None:
+                    body.parking_slot = next(free_slots)
+                    self._simulator.move_entity(
+                        body.name, self._parking_position(parking_origin, body.parking_slot)
+                    )
+
+            self._pool[footprint] = [
+                body for body in pool if body.name not in to_delete]
 
         # TODO change all spawns/moves/deletes in base sim to multi-requests
-        if not FlatlandSimulator.delete_all_entities(self._simulator, self._spawned_obstacles):  # type: ignore # nopep8
+        if to_delete and not FlatlandSimulator.delete_all_entities(self._simulator, to_delete):  # type: ignore # nopep8
             rospy.logwarn("Couldn't remove obstacles")
 
-        self._spawned_obstacles = []
-        self._static_obs_count, self._dynamic_obs_count = 0, 0
+    def unuse_obstacles(self):
+        for pool in self._pool.values():
+            for body in pool:
+                body.used = False
+
+    def _parking_origin(self) -> Tuple[float, float]:
+        """
+        Returns: origin of the parking lot right of the current map, in meters
+        """
+        if self._map_info is None:
+            self._map_info = rospy.wait_for_message(
+                FlatlandManager.TOPIC_MAP, OccupancyGrid
+            ).info
+
+        info = self._map_info
+
+        return (
+            info.origin.position.x
+            + info.width * info.resolution
+            + FlatlandManager.PARKING_MARGIN,
+            info.origin.position.y,
+        )
+
+    @staticmethod
+    def _parking_position(
+        origin: Tuple[float, float], slot: int
+    ) -> PositionOrientation:
+        row, col = divmod(slot, FlatlandManager.PARKING_ROW_LENGTH)
+
+        return (
+            origin[0] + col * FlatlandManager.PARKING_SPACING,
+            origin[1] + row * FlatlandManager.PARKING_SPACING,
+            0,
+        )
 
     def spawn_robot(self, robot: Robot):
         self._simulator.spawn_entity(robot)
@@ -208,6 +333,13 @@ class FlatlandManager(EntityManager):
             path="",
         )
 
+    @staticmethod
+    def _footprint_class(is_dynamic: bool) -> str:
+        """
+        Bodies of the same footprint class are interchangeable, see `_generate_YAML_model`.
+        """
+        return "circle" if is_dynamic else "polygon"
+
     @staticmethod
     def _generate_name(is_dynamic: bool, count: int) -> str:
         return (
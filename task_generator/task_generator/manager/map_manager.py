@@ -1,46 +1,350 @@
-from typing import List, Optional, Tuple
+from typing import Dict, List, Optional, Set, Tuple, Union
 import numpy as np
 import random
 import math
 
+import rospy
 
-from map_distance_server.srv import GetDistanceMapResponse
+from map_distance_server import SharedDistanceMap
+from map_distance_server.srv import GetDistanceMapResponse, GetDistanceWindowResponse, SampleFreeCells
 from geometry_msgs.msg import Point
 from task_generator.shared import Waypoint
 
+MapSource = Union[GetDistanceMapResponse,
+                  GetDistanceWindowResponse, SharedDistanceMap]
+
+
+class ForbiddenZoneIndex:
+    """
+    Uniform grid over forbidden zones in cell coordinates.
+
+    Every zone is stored in all buckets overlapped by its bounding box, so a
+    query only checks the zones of the buckets overlapped by the bounding box
+    of the query point grown by the safe distance instead of all zones.
+    A position keeps safe_dist to a zone if floor(dist) - radius > safe_dist.
+    """
+
+    # edge length of a bucket in cells
+    BUCKET_SIZE = 16
+
+    _zones: List[Tuple[int, int, int]]
+    _buckets: Dict[Tuple[int, int], List[int]]
+
+    def __init__(self):
+        self._zones = []
+        self._buckets = dict()
+
+    def __len__(self) -> int:
+        return len(self._zones)
+
+    def copy(self) -> "ForbiddenZoneIndex":
+        index = ForbiddenZoneIndex()
+        index._zones = list(self._zones)
+        index._buckets = {
+            key: list(bucket) for key, bucket in self._buckets.items()}
+        return index
+
+    def add(self, row: int, col: int, radius: int):
+        """
+        @row, col: center of the zone in cells
+        @radius: radius of the zone in cells
+        """
+        index = len(self._zones)
+        self._zones.append((row, col, radius))
+
+        for key in self._keys(row, col, max(radius, 0)):
+            self._buckets.setdefault(key, []).append(index)
+
+    def is_valid(self, row: int, col: int, safe_dist: float) -> bool:
+        """
+        @safe_dist: minimal distance to the forbidden zones in cells
+        """
+        checked = set()
+
+        for key in self._keys(row, col, safe_dist + 1):
+            for index in self._buckets.get(key, ()):
+                if index in checked:
+                    continue
+                checked.add(index)
+
+                f_row, f_col, radius = self._zones[index]
+
+                if math.floor(math.hypot(row - f_row, col - f_col)) - radius <= safe_dist:
+                    return False
+
+        return True
+
+    def valid_mask(self, rows: np.ndarray, cols: np.ndarray, safe_dist: float) -> np.ndarray:
+        """
+        Vectorized `is_valid` for many cells. Every zone is rasterized into
+        the bounding box of the cells, so the cost grows with the number of
+        zones and cells but not with their product.
+        Returns: mask of the cells keeping safe_dist to all forbidden zones
+        """
+        if len(rows) == 0 or len(self._zones) == 0:
+            return np.ones(len(rows), dtype=bool)
+
+        top, left = int(rows.min()), int(cols.min())
+        blocked = np.zeros(
+            (int(rows.max()) - top + 1, int(cols.max()) - left + 1), dtype=bool)
+        height, width = blocked.shape
+
+        for f_row, f_col, radius in self._zones:
+            reach = int(math.ceil(safe_dist + radius + 1))
+
+            r_from, r_to = max(f_row - reach - top, 0), min(f_row + reach - top + 1, height)
+            c_from, c_to = max(f_col - reach - left, 0), min(f_col + reach - left + 1, width)
+
+            if r_from >= r_to or c_from >= c_to:
+                continue
+
+            window_rows = np.arange(r_from, r_to)[:, np.newaxis] + top - f_row
+            window_cols = np.arange(c_from, c_to)[np.newaxis, :] + left - f_col
+
+            blocked[r_from:r_to, c_from:c_to] |= np.floor(
+                np.hypot(window_rows, window_cols)) - radius <= safe_dist
+
+        return ~blocked[rows - top, cols - left]
+
+    def _keys(self, row: float, col: float, radius: float):
+        size = ForbiddenZoneIndex.BUCKET_SIZE
+
+        for key_row in range(math.floor((row - radius) / size), math.floor((row + radius) / size) + 1):
+            for key_col in range(math.floor((col - radius) / size), math.floor((col + radius) / size) + 1):
+                yield key_row, key_col
+
+
+class PoissonDiskSampler:
+    """
+    Greedily accepts candidate cells in the order they are added if they keep
+    min_separation to all accepted cells (dart throwing Poisson-disk sampling).
+
+    Accepted cells are stored in a background grid with a cell size of
+    min_separation / sqrt(2), so every grid cell holds at most one of them and
+    only the 5x5 neighbourhood of a candidate has to be checked. Without a
+    separation only repeated cells are rejected.
+    """
+
+    # candidates checked against each other at once
+    MAX_BATCH_SIZE = 256
+
+    _rows: np.ndarray
+    _cols: np.ndarray
+    _count: int
+    _grid: Optional[np.ndarray]
+    _accepted: Set[Tuple[int, int]]
+
+    def __init__(self, n: int, shape: Tuple[int, int], min_separation: float):
+        """
+        @n: number of cells to accept
+        @shape: shape of the map in cells
+        @min_separation: minimal distance between accepted cells in cells
+        """
+        self._min_separation = min_separation
+        self._rows = np.empty(n, dtype=np.int64)
+        self._cols = np.empty(n, dtype=np.int64)
+        self._count = 0
+
+        self._grid = None
+        self._accepted = set()
+
+        if min_separation > 0:
+            self._grid_size = min_separation / math.sqrt(2)
+            # padded so that neighbourhoods never leave the grid
+            self._grid = np.full(
+                (int(shape[0] / self._grid_size) + 5,
+                 int(shape[1] / self._grid_size) + 5),
+                -1,
+                dtype=np.int32
+            )
+
+    def __len__(self) -> int:
+        return self._count
+
+    @property
+    def missing(self) -> int:
+        return len(self._rows) - self._count
+
+    @property
+    def rows(self) -> np.ndarray:
+        return self._rows[:self._count]
+
+    @property
+    def cols(self) -> np.ndarray:
+        return self._cols[:self._count]
+
+    def add(self, rows: np.ndarray, cols: np.ndarray):
+        """
+        Tries the candidate cells in order until all cells are accepted.
+        """
+        start = 0
+        while self.missing > 0 and start < len(rows):
+            batch_size = min(max(4 * self.missing, 64),
+                             PoissonDiskSampler.MAX_BATCH_SIZE)
+
+            if self._grid is None:
+                self._add_distinct(
+                    rows[start:start + batch_size], cols[start:start + batch_size])
+            else:
+                self._add_separated(
+                    rows[start:start + batch_size], cols[start:start + batch_size])
+
+            start += batch_size
+
+    def _accept(self, row: int, col: int):
+        self._rows[self._count] = row
+        self._cols[self._count] = col
+        self._count += 1
+
+    def _add_distinct(self, rows: np.ndarray, cols: np.ndarray):
+        for cell in zip(rows.tolist(), cols.tolist()):
+            if cell in self._accepted:
+                continue
+
+            self._accepted.add(cell)
+            self._accept(*cell)
+
+            if self.missing == 0:
+                return
+
+    def _add_separated(self, rows: np.ndarray, cols: np.ndarray):
+        offsets = np.arange(-2, 3)
+
+        grid_rows = (rows / self._grid_size).astype(np.int64) + 2
+        grid_cols = (cols / self._grid_size).astype(np.int64) + 2
+
+        # conflicts with previously accepted cells
+        neighbours = self._grid[
+            grid_rows[:, np.newaxis, np.newaxis] + offsets[np.newaxis, :, np.newaxis],
+            grid_cols[:, np.newaxis, np.newaxis] + offsets[np.newaxis, np.newaxis, :]
+        ].reshape(len(rows), -1)
+
+        too_close = (neighbours >= 0) & (np.hypot(
+            rows[:, np.newaxis] - self._rows[neighbours],
+            cols[:, np.newaxis] - self._cols[neighbours]
+        ) < self._min_separation)
+
+        alive = ~np.any(too_close, axis=1)
+
+        # conflicts within the batch are resolved in order
+        conflicts = np.hypot(
+            rows[:, np.newaxis] - rows[np.newaxis, :],
+            cols[:, np.newaxis] - cols[np.newaxis, :]
+        ) < self._min_separation
+
+        for i in np.flatnonzero(alive):
+            if not alive[i]:
+                continue
+
+            self._grid[grid_rows[i], grid_cols[i]] = self._count
+            self._accept(rows[i], cols[i])
+
+            if self.missing == 0:
+                return
+
+            alive &= ~conflicts[i]
+
 
 class MapManager:
     """
     The map manager manages the static map
     and is used to get new goal, robot and
     obstacle positions.
+
+    If only the map metadata is passed (e.g. an empty window of the
+    distance map server), the distance map is not held locally and
+    candidate cells are sampled by the map distance server instead.
+
+    If a shared distance map is passed, the distance map published by the
+    map distance server is mapped read-only, so all map managers of a host
+    share one copy of it.
     """
 
-    _map: GetDistanceMapResponse
-    _map_with_distances: np.ndarray
+    SERVICE_SAMPLE_FREE_CELLS = "/distance_map/sample_free_cells"
+    # number of candidate cells requested at once in remote mode,
+    # all free cells are requested if none of them is valid
+    REMOTE_SAMPLE_SIZE = 100
+    # random picks before all free cells are checked against the forbidden zones
+    MAX_SAMPLING_ATTEMPTS = 100
+
+    _map: MapSource
+    _map_with_distances: Optional[np.ndarray]
     _origin: Point
     _forbidden_zones: List[Waypoint]
+    # forbidden zones in cells
+    _forbidden_index: ForbiddenZoneIndex
+    # free cell index per safe distance in cells
+    _free_cells: Dict[int, np.ndarray]
+
+    _sample_free_cells_service: Optional[rospy.ServiceProxy]
+    _shared_map: Optional[SharedDistanceMap]
 
-    def __init__(self, map: GetDistanceMapResponse):
+    def __init__(self, map: MapSource):
+        self._sample_free_cells_service = None
+        self._shared_map = None
+        self._forbidden_zones = list()
         self.update_map(map)
         self.init_forbidden_zones()
 
-    def update_map(self, map: GetDistanceMapResponse):
+    @property
+    def remote(self) -> bool:
+        return self._map_with_distances is None
+
+    @property
+    def shared_map(self) -> Optional[SharedDistanceMap]:
+        return self._shared_map
+
+    def update_map(self, map: MapSource):
+        self._free_cells = dict()
+        self._set_map(map)
+
+        # cell coordinates of the forbidden zones depend on the map
+        self.init_forbidden_zones(self._forbidden_zones)
+
+    def _set_map(self, map: MapSource):
+        if isinstance(map, SharedDistanceMap):
+            # attaches to the latest published distance map
+            map.refresh()
+            assert map.distance_map is not None, f"No distance map published at {map.path}"
+
+            self._shared_map = map
+            self._map = map
+            self._origin = map.info.origin.position
+            self._map_with_distances = map.distance_map
+            return
+
+        self._shared_map = None
         self._map = map
+        self._origin = map.info.origin.position
+
+        if isinstance(map, GetDistanceWindowResponse):
+            self._map_with_distances = None
+
+            if self._sample_free_cells_service is None:
+                rospy.wait_for_service(MapManager.SERVICE_SAMPLE_FREE_CELLS)
+                self._sample_free_cells_service = rospy.ServiceProxy(
+                    MapManager.SERVICE_SAMPLE_FREE_CELLS, SampleFreeCells, persistent=True
+                )
+            return
+
         self._map_with_distances = np.reshape(
             self._map.data,
             (self._map.info.height, self._map.info.width)
         )
-        self._origin = map.info.origin.position
 
     def init_forbidden_zones(self, init: Optional[List[Waypoint]] = None):
         if init is None:
             init = list()
 
-        self._forbidden_zones = init
+        self._forbidden_zones = list()
+        self._forbidden_index = ForbiddenZoneIndex()
+
+        self.forbid(init)
 
     def forbid(self, forbidden_zones: List[Waypoint]):
-        self._forbidden_zones += forbidden_zones
+        for zone in forbidden_zones:
+            self._forbidden_zones.append(zone)
+            self._forbidden_index.add(*self._zone_to_cells(zone))
 
     def get_random_pos_on_map(self, safe_dist: float, forbid: bool = True, forbidden_zones: Optional[List[Waypoint]] = None) -> Waypoint:
         """
@@ -51,7 +355,8 @@ class MapManager:
         and then validate the position. If the position
         is not valid a new position is chosen. When
         no valid position is found after 100 retries
-        an error is thrown.
+        all free cells are validated at once and an
+        error is thrown if none of them is valid.
         Args:
             safe_dist: minimal distance to the next
                 obstacles for calculated positons
@@ -64,71 +369,254 @@ class MapManager:
         Returns:
             A tuple with three elements: x, y, theta
         """
-        # safe_dist is in meters so at first calc safe dist to distance on
-        # map -> resolution of map is m / cell -> safe_dist in cells is
-        # safe_dist / resolution
-        safe_dist_in_cells = math.ceil(
-            safe_dist / self._map.info.resolution) + 1
-
-        forbidden_zones_in_cells: List[Waypoint] = [
-            (
-                math.ceil(point[0] / self._map.info.resolution),
-                math.ceil(point[1] / self._map.info.resolution),
-                math.ceil(point[2] / self._map.info.resolution)
-            )
-            for point in self._forbidden_zones + (forbidden_zones if forbidden_zones is not None else [])
-        ]
-
-        # Now get index of all cells were dist is > safe_dist_in_cells
-        possible_cells: List[Tuple[np.intp, np.intp]] = np.array(
-            np.where(self._map_with_distances > safe_dist_in_cells)).transpose().tolist()
-
-        # return (random.randint(1,6), random.randint(1, 9), 0)
-        assert len(possible_cells) > 0, "No cells available"
+        safe_dist_in_cells, forbidden_index = self._to_cells(
+            safe_dist, forbidden_zones)
 
         # The position should not lie in the forbidden zones and keep the safe
         # dist to these zones as well. We could remove all cells here but since
         # we only need one position and the amount of cells can get very high
         # we just pick positions at random and check if the distance to all
         # forbidden zones is high enough
+        if self.remote:
+            x, y = self._sample_remote_cell(
+                safe_dist_in_cells, forbidden_index)
+        else:
+            x, y = self._sample_cell(
+                safe_dist_in_cells, forbidden_index)
 
-        while len(possible_cells) > 0:
+        point = self._to_waypoint(x, y)
 
-            # Select a random cell
-            x, y = possible_cells.pop(random.randrange(len(possible_cells)))
+        if forbid:
+            self.forbid([point])
 
-            # Check if valid
-            if self._is_pos_valid(float(x), float(y), safe_dist_in_cells, forbidden_zones_in_cells):
-                break
+        return point
+
+    def sample_positions(
+        self,
+        n: int,
+        safe_dist: float,
+        min_separation: float = 0,
+        forbidden_zones: Optional[List[Waypoint]] = None,
+        forbid: bool = True
+    ) -> List[Waypoint]:
+        """
+        Samples positions for several entities at once.
+        Random free cells outside of the forbidden zones are accepted
+        greedily in batches if they keep min_separation to all previously
+        accepted positions (dart throwing Poisson-disk sampling).
+        If not all positions fit, all candidates are tried before giving up
+        and a warning is logged.
+        Args:
+            n: number of positions
+            safe_dist: minimal distance to the next
+                obstacles for calculated positions
+            min_separation: minimal distance between
+                the returned positions in meters
+            forbid: add returned waypoints to forbidden zones
+            forbidden_zones: Array of (x, y, radius),
+                see `get_random_pos_on_map`
+        Returns:
+            Up to n tuples with three elements: x, y, theta.
+            Less positions are returned if no more fit on the map.
+        """
+        if n <= 0:
+            return []
+
+        safe_dist_in_cells, forbidden_index = self._to_cells(
+            safe_dist, forbidden_zones)
+        min_separation_in_cells = min_separation / self._map.info.resolution
 
+        sampler = PoissonDiskSampler(
+            n,
+            (self._map.info.height, self._map.info.width),
+            min_separation_in_cells
+        )
+
+        if self.remote:
+            rows, cols, _ = self._sample_remote_candidates(
+                max(MapManager.REMOTE_SAMPLE_SIZE, 4 * n), safe_dist_in_cells)
+            valid = forbidden_index.valid_mask(
+                rows, cols, safe_dist_in_cells)
+            sampler.add(rows[valid], cols[valid])
         else:
-            raise Exception("can't find any non-occupied spaces")
+            self._sample_local_cells(
+                sampler, safe_dist_in_cells, forbidden_index)
+
+        if len(sampler) < n:
+            rospy.logwarn(
+                f"Only {len(sampler)} of {n} positions fit on the map")
+
+        points = [
+            self._to_waypoint(int(x), int(y))
+            for x, y in zip(sampler.rows, sampler.cols)
+        ]
+
+        if forbid:
+            self.forbid(points)
+
+        return points
+
+    def _to_cells(self, safe_dist: float, forbidden_zones: Optional[List[Waypoint]]) -> Tuple[int, ForbiddenZoneIndex]:
+        """
+        Converts the safe distance from meters to cells and returns the
+        index of the stored forbidden zones extended by forbidden_zones.
+        """
+        # safe_dist is in meters so at first calc safe dist to distance on
+        # map -> resolution of map is m / cell -> safe_dist in cells is
+        # safe_dist / resolution
+        safe_dist_in_cells = math.ceil(
+            safe_dist / self._map.info.resolution) + 1
+
+        if not forbidden_zones:
+            return safe_dist_in_cells, self._forbidden_index
+
+        forbidden_index = self._forbidden_index.copy()
+        for zone in forbidden_zones:
+            forbidden_index.add(*self._zone_to_cells(zone))
+
+        return safe_dist_in_cells, forbidden_index
+
+    def _zone_to_cells(self, zone: Waypoint) -> Tuple[int, int, int]:
+        """
+        Converts a forbidden zone (x, y, radius) in meters to the
+        (row, col, radius) in cells, inverse of `_to_waypoint`.
+        """
+        x, y, radius = zone
+
+        return (
+            round((y - self._origin.x) / self._map.info.resolution),
+            round((x - self._origin.y) / self._map.info.resolution),
+            math.ceil(radius / self._map.info.resolution)
+        )
 
+    def _to_waypoint(self, x: int, y: int) -> Waypoint:
+        """
+        Converts a cell to a position with random orientation.
+        """
         theta = random.uniform(-math.pi, math.pi)
 
-        point: Waypoint = (
+        return (
             float(np.round(y * self._map.info.resolution + self._origin.y, 3)),
             float(np.round(x * self._map.info.resolution + self._origin.x, 3)),
             theta
         )
 
-        if forbid:
-            self._forbidden_zones.append(point)
+    def _get_free_cells(self, safe_dist_in_cells: int) -> np.ndarray:
+        """
+        Returns the sorted flat indices of all cells with a distance greater
+        than safe_dist_in_cells. The index is computed once per threshold
+        and map and reused until the map is updated.
+        """
+        assert self._map_with_distances is not None
 
-        return point
+        free_cells = self._free_cells.get(safe_dist_in_cells)
+
+        if free_cells is None:
+            free_cells = np.flatnonzero(
+                self._map_with_distances > safe_dist_in_cells)
+            self._free_cells[safe_dist_in_cells] = free_cells
 
-    def _is_pos_valid(self, x: float, y: float, safe_dist: float, forbidden_zones: List[Waypoint]):
+        return free_cells
+
+    def _sample_cell(self, safe_dist_in_cells: int, forbidden_zones: ForbiddenZoneIndex) -> Tuple[int, int]:
         """
-        @safe_dist: minimal distance to the next obstacles for calculated positions
+        Samples a free cell outside of the forbidden zones.
+        Returns: row and column of the cell
         """
-        for p in forbidden_zones:
-            f_x, f_y, radius = p
+        free_cells = self._get_free_cells(safe_dist_in_cells)
+        width = self._map_with_distances.shape[1]
 
-            # euklidian distance to the forbidden zone
-            dist = math.floor(np.linalg.norm(
-                np.array([x, y]) - np.array([f_x, f_y]))) - radius
+        assert len(free_cells) > 0, "No cells available"
 
-            if dist <= safe_dist:
-                return False
+        for _ in range(min(MapManager.MAX_SAMPLING_ATTEMPTS, len(free_cells))):
+            x, y = divmod(int(free_cells[random.randrange(len(free_cells))]), width)
 
-        return True
+            if forbidden_zones.is_valid(x, y, safe_dist_in_cells):
+                return x, y
+
+        # crowded map, check all cells at once instead of guessing
+        rows, cols = np.divmod(free_cells, width)
+        valid = forbidden_zones.valid_mask(rows, cols, safe_dist_in_cells)
+
+        valid_cells = np.flatnonzero(valid)
+
+        if len(valid_cells) == 0:
+            raise Exception("can't find any non-occupied spaces")
+
+        index = valid_cells[random.randrange(len(valid_cells))]
+
+        return int(rows[index]), int(cols[index])
+
+    def _sample_local_cells(self, sampler: PoissonDiskSampler, safe_dist_in_cells: int, forbidden_zones: ForbiddenZoneIndex):
+        """
+        Adds random free cells outside of the forbidden zones to the sampler
+        until it is full. Cells are picked at random in batches, all free
+        cells are only shuffled once a batch yields no position anymore
+        (crowded map), so the cost doesn't grow with the size of the map.
+        """
+        free_cells = self._get_free_cells(safe_dist_in_cells)
+        width = self._map_with_distances.shape[1]
+
+        if len(free_cells) == 0:
+            return
+
+        while sampler.missing > 0:
+            picks = np.random.randint(
+                len(free_cells), size=max(4 * sampler.missing, 64))
+            rows, cols = np.divmod(free_cells[picks], width)
+            valid = forbidden_zones.valid_mask(rows, cols, safe_dist_in_cells)
+
+            accepted = len(sampler)
+            sampler.add(rows[valid], cols[valid])
+
+            if len(sampler) == accepted:
+                break
+
+        if sampler.missing > 0:
+            # crowded map, try all free cells in random order
+            rows, cols = np.divmod(np.random.permutation(free_cells), width)
+            valid = forbidden_zones.valid_mask(rows, cols, safe_dist_in_cells)
+            sampler.add(rows[valid], cols[valid])
+
+    def _sample_remote_candidates(self, n: int, safe_dist_in_cells: int) -> Tuple[np.ndarray, np.ndarray, int]:
+        """
+        Requests up to n random free cells from the map distance server.
+        Returns: rows and columns of the cells and the number of free cells
+        """
+        assert self._sample_free_cells_service is not None
+
+        response = self._sample_free_cells_service(
+            n=n,
+            min_distance=safe_dist_in_cells
+        )
+
+        return np.array(response.y, dtype=int), np.array(response.x, dtype=int), response.available
+
+    def _sample_remote_cell(self, safe_dist_in_cells: int, forbidden_zones: ForbiddenZoneIndex) -> Tuple[int, int]:
+        """
+        Samples a free cell outside of the forbidden zones from the
+        candidates sampled by the map distance server.
+        Returns: row and column of the cell
+        """
+        rows, cols, available = self._sample_remote_candidates(
+            MapManager.REMOTE_SAMPLE_SIZE, safe_dist_in_cells)
+
+        assert len(rows) > 0, "No cells available"
+
+        for x, y in zip(rows, cols):
+            if forbidden_zones.is_valid(x, y, safe_dist_in_cells):
+                return int(x), int(y)
+
+        # crowded map, check all free cells at once like the local path
+        if available > len(rows):
+            rows, cols, _ = self._sample_remote_candidates(
+                available, safe_dist_in_cells)
+
+            valid_cells = np.flatnonzero(
+                forbidden_zones.valid_mask(rows, cols, safe_dist_in_cells))
+
+            if len(valid_cells) > 0:
+                index = valid_cells[random.randrange(len(valid_cells))]
+                return int(rows[index]), int(cols[index])
+
+        raise Exception("can't find any non-occupied spaces")
@@ -82,6 +82,8 @@ class ObstacleManager:
 
     def reset(self):
         """
-        Unuse and remove all obstacles
+        Removes all obstacles. Entity managers pooling obstacles (flatland)
+        only mark them unused, they are reused by the next spawns and the
+        remaining ones are removed by the next `respawn`.
         """
         self._dynamic_manager.remove_obstacles(purge=True)
@@ -1,5 +1,5 @@
 import itertools
-from typing import Callable, Collection, Dict
+from typing import Callable, Collection, Dict, List
 
 from task_generator.shared import ModelType, EntityProps, Namespace, PositionOrientation
 
@@ -49,6 +49,14 @@ class BaseSimulator:
     def spawn_entity(self, entity: EntityProps) -> bool:
         raise NotImplementedError()
 
+    def spawn_entities(self, entities: Collection[EntityProps]) -> List[bool]:
+        """
+        Spawns multiple entities. Simulators supporting batched requests
+        should override this to spawn all entities in a single request.
+        Returns: success of every entity in the order of entities
+        """
+        return [self.spawn_entity(entity) for entity in entities]
+
     def move_entity(self, name: str, pos: PositionOrientation):
         """
         Move the robot to the given position.
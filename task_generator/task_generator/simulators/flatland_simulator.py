@@ -10,11 +10,14 @@ from flatland_msgs.srv import (
     DeleteModelsRequest,
     DeleteModels,
     SpawnModelRequest,
+    SpawnModelsRequest,
 )
 
 import flatland_msgs.msg
 
-from task_generator.shared import ModelType
+from typing import Collection, List, Optional
+
+from task_generator.shared import EntityProps, ModelType
 
 from task_generator.utils import rosparam_get
 from geometry_msgs.msg import Pose2D
@@ -47,12 +50,16 @@ class FlatlandSimulator(BaseSimulator):
     _move_model_srv: rospy.ServiceProxy
     _spawn_model_srv: rospy.ServiceProxy
     _spawn_model_from_string_srv: rospy.ServiceProxy
-    _spawn_models_from_string_srv: rospy.ServiceProxy
+    # None if the flatland version doesn't provide batched spawning
+    _spawn_models_from_string_srv: Optional[rospy.ServiceProxy]
     _delete_model_srv: rospy.ServiceProxy
     _delete_models_srv: rospy.ServiceProxy
 
     _tmp_model_path: str
 
+    # seconds to wait for spawn_models_from_string once the other services are up
+    SPAWN_MODELS_PROBE_TIMEOUT = 5
+
     def __init__(self, namespace):
         super().__init__(namespace)
 
@@ -75,9 +82,7 @@ class FlatlandSimulator(BaseSimulator):
         self._spawn_model[ModelType.YAML] = rospy.ServiceProxy(
             self._namespace("spawn_model_from_string"), SpawnModel
         )
-        self._spawn_models_from_string_srv = rospy.ServiceProxy(
-            self._namespace("spawn_models_from_string"), SpawnModels
-        )
+        self._spawn_models_from_string_srv = self._probe_spawn_models()
         self._delete_model_srv = rospy.ServiceProxy(
             self._namespace("delete_model"), DeleteModel
         )
@@ -85,6 +90,23 @@ class FlatlandSimulator(BaseSimulator):
             self._namespace("delete_models"), DeleteModels
         )
 
+    def _probe_spawn_models(self) -> Optional[rospy.ServiceProxy]:
+        try:
+            rospy.wait_for_service(
+                self._namespace("spawn_models_from_string"),
+                timeout=FlatlandSimulator.SPAWN_MODELS_PROBE_TIMEOUT,
+            )
+        except rospy.ROSException:
+            rospy.logwarn(
+                f"Service {self._namespace('spawn_models_from_string')} not available, "
+                "spawning models one by one"
+            )
+            return None
+
+        return rospy.ServiceProxy(
+            self._namespace("spawn_models_from_string"), SpawnModels, persistent=True
+        )
+
     def before_reset_task(self):
         pass
 
@@ -134,23 +156,52 @@ class FlatlandSimulator(BaseSimulator):
 
         self._move_model_srv(move_model_request)
 
-    # def _spawn_obstacles(self, obstacles):
-
-    #     request = SpawnModelsRequest()
-
-    #     models = []
-
-    #     for obstacle in obstacles:
-    #         m = flatland_msgs.msg.Model()
-    #         m.yaml_path = obstacle[0]
-    #         m.name = obstacle[1]
-    #         m.ns = self._namespace
-    #         m.pose.x = obstacle[2][0]
-    #         m.pose.y = obstacle[2][1]
-    #         m.pose.theta = obstacle[2][2]
-
-    #         models.append(m)
-
-    #     request.models = models
-
-    #     self._spawn_models_from_string_srv(request)
+    def spawn_entities(self, entities: Collection[EntityProps]) -> List[bool]:
+        """
+        Spawns all yaml models in a single `spawn_models_from_string` request.
+        If the batch fails, its models are removed and spawned one by one to
+        find out which of them failed. Without the batch service all models
+        are spawned one by one.
+        """
+        if self._spawn_models_from_string_srv is None:
+            return super().spawn_entities(entities)
+
+        results = {}
+        batch: List[EntityProps] = []
+
+        for entity in entities:
+            if entity.model.get(self.MODEL_TYPES).type == ModelType.YAML:
+                batch.append(entity)
+            else:
+                results[entity.name] = self.spawn_entity(entity)
+
+        if batch:
+            request = SpawnModelsRequest()
+
+            for entity in batch:
+                model = flatland_msgs.msg.Model()
+                model.yaml_path = entity.model.get(self.MODEL_TYPES).description
+                model.name = entity.name
+                model.ns = self._namespace(entity.name)
+                model.pose = Pose2D(
+                    x=entity.position[0], y=entity.position[1], theta=entity.position[2]
+                )
+
+                request.models.append(model)
+
+            try:
+                success = bool(self._spawn_models_from_string_srv(request).success)
+            except rospy.ServiceException as e:
+                rospy.logwarn(f"Batch spawn failed: {e}")
+                success = False
+
+            if success:
+                results.update({entity.name: True for entity in batch})
+            else:
+                # the batch may have been spawned partially
+                self.delete_all_entities([entity.name for entity in batch])
+                results.update(
+                    {entity.name: bool(self.spawn_entity(entity)) for entity in batch}
+                )
+
+        return [results[entity.name] for entity in entities]
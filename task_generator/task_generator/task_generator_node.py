@@ -8,7 +8,8 @@ from typing import Dict, List
 import rospkg
 import rospy
 import yaml
-from map_distance_server.srv import GetDistanceMap
+from map_distance_server import SharedDistanceMap
+from map_distance_server.srv import GetDistanceMap, GetDistanceWindow
 from rospkg import RosPack
 from std_msgs.msg import Empty as EmptyMsg
 from std_msgs.msg import Int16
@@ -172,11 +173,27 @@ class TaskGenerator:
                 self._namespace.simulation_ns
             )
 
+        # the map distance server sets up the shared map before its services
         rospy.wait_for_service("/distance_map")
 
-        service_client_get_map = rospy.ServiceProxy("/distance_map", GetDistanceMap)
+        shared_path = rosparam_get(str, "/distance_map/shared_path", "")
+
+        if shared_path and rosparam_get(bool, "~shared_distance_map", True):
+            map_response = SharedDistanceMap(shared_path)
+        elif rosparam_get(bool, "~remote_distance_map", False):
+            # only fetch the map metadata, positions are sampled by the server
+            rospy.wait_for_service("/distance_map/window")
+
+            service_client_get_map = rospy.ServiceProxy(
+                "/distance_map/window", GetDistanceWindow
+            )
+
+            map_response = service_client_get_map(x=0, y=0, width=0, height=0)
+        else:
+            service_client_get_map = rospy.ServiceProxy("/distance_map", GetDistanceMap)
+
+            map_response = service_client_get_map()
 
-        map_response = service_client_get_map()
         map_manager = MapManager(map_response)
 
         if self._entity_mode == Constants.EntityManager.PEDSIM:
@@ -62,7 +62,7 @@ class DynamicMapStagedTask(RandomTask):
         denominator: float = (
             rosparam_get(float, "num_envs", 1)
             if "eval_sim" not in self.robot_managers[0].namespace
-            else 1.0
+            else rosparam_get(float, "num_eval_envs", 1)
         )
         self._iterator = 1 / denominator
 
@@ -114,48 +114,60 @@ class ParametrizedTask(BaseTask):
         static_obstacles_array: List[Obstacle] = list()
         interactive_obstacles_array: List[Obstacle] = list()
 
+        def count(config: ET.Element) -> int:
+            return random.randint(
+                int(get_attrib(config, "min")),
+                int(get_attrib(config, "max"))
+            )
+
+        static_configs = [
+            (config, count(config))
+            for config in root.findall("./static/obstacle") or []
+        ]
+        interactive_configs = [
+            (config, count(config))
+            for config in root.findall("./interactive/obstacle") or []
+        ]
+        dynamic_configs = [
+            (config, count(config))
+            for config in root.findall("./dynamic/obstacle") or []
+        ]
+
+        # the positions of all obstacles are sampled at once
+        positions = self.itf_obstacle.sample_obstacle_positions(
+            sum(n for _, n in [*static_configs, *interactive_configs, *dynamic_configs])
+        )
+
         # Create static obstacles
-        for config in root.findall("./static/obstacle") or []:
-            for i in range(
-                random.randint(
-                    int(get_attrib(config, "min")),
-                    int(get_attrib(config, "max"))
-                )
-            ):
+        for config, n in static_configs:
+            for i in range(n):
                 obstacle = self.itf_obstacle.create_obstacle(
                     name=f'{get_attrib(config, "name")}_static_{i+1}',
-                    model=self.model_loader.bind(get_attrib(config, "model"))
+                    model=self.model_loader.bind(get_attrib(config, "model")),
+                    position=next(positions)
                 )
                 obstacle.extra["type"] = get_attrib(config, "type", "")
                 static_obstacles_array.append(obstacle)
 
         # Create interactive obstacles
-        for config in root.findall("./interactive/obstacle") or []:
-            for i in range(
-                random.randint(
-                    int(get_attrib(config, "min")),
-                    int(get_attrib(config, "max"))
-                )
-            ):
+        for config, n in interactive_configs:
+            for i in range(n):
                 obstacle = self.itf_obstacle.create_obstacle(
                     name=f'{get_attrib(config, "name")}_interactive_{i+1}',
-                    model=self.model_loader.bind(get_attrib(config, "model"))
+                    model=self.model_loader.bind(get_attrib(config, "model")),
+                    position=next(positions)
                 )
                 obstacle.extra["type"] = get_attrib(config, "type", "")
                 static_obstacles_array.append(obstacle)
 
         # Create dynamic obstacles
-        for config in root.findall("./dynamic/obstacle") or []:
-            for i in range(
-                random.randint(
-                    int(get_attrib(config, "min")),
-                    int(get_attrib(config, "max"))
-                )
-            ):
+        for config, n in dynamic_configs:
+            for i in range(n):
                 obstacle = self.itf_obstacle.create_dynamic_obstacle(
                     name=f'{get_attrib(config, "name")}_dynamic_{i+1}',
                     model=self.dynamic_model_loader.bind(
-                        get_attrib(config, "model"))
+                        get_attrib(config, "model")),
+                    position=next(positions)
                 )
                 obstacle.extra["type"] = get_attrib(config, "type", "")
                 dynamic_obstacles_array.append(obstacle)
@@ -42,7 +42,13 @@ from std_msgs.msg import Bool
 import xml.etree.ElementTree as ET
 
 from nav_msgs.msg import OccupancyGrid
-from map_distance_server.srv import GetDistanceMap, GetDistanceMapResponse
+from map_distance_server import SharedDistanceMap
+from map_distance_server.srv import (
+    GetDistanceMap,
+    GetDistanceMapResponse,
+    GetDistanceWindow,
+    GetDistanceWindowResponse,
+)
 from std_msgs.msg import String
 
 
@@ -61,9 +67,33 @@ class ITF_Obstacle(ITF_Base):
     Helper methods to fill partially initialized obstacles
     """
 
+    # meters
+    OBSTACLE_SAFE_DISTANCE = 0.5
+
     def __init__(self, TASK: Props_):
         ITF_Base.__init__(self, TASK=TASK)
 
+    def sample_obstacle_positions(
+        self, n: int
+    ) -> Generator[Optional[PositionOrientation], None, None]:
+        """
+        Samples the positions of n obstacles at once, keeping the safe
+        distance to each other like obstacles placed one after another.
+        Positions that don't fit on the map are None, `create_obstacle`
+        then samples them on its own.
+        """
+        points = self.PROPS.map_manager.sample_positions(
+            n,
+            safe_dist=ITF_Obstacle.OBSTACLE_SAFE_DISTANCE,
+            min_separation=ITF_Obstacle.OBSTACLE_SAFE_DISTANCE,
+        )
+
+        for point in points:
+            yield (point[0], point[1], np.pi * np.random.random())
+
+        for _ in range(n - len(points)):
+            yield None
+
     def create_dynamic_obstacle(
         self, waypoints: Optional[List[Waypoint]] = None, **kwargs
     ) -> DynamicObstacle:
@@ -115,11 +145,9 @@ class ITF_Obstacle(ITF_Base):
         @extra: (optional) Extra properties to store
         """
 
-        safe_distance = 0.5
-
         if position is None:
             point: Waypoint = self.PROPS.map_manager.get_random_pos_on_map(
-                safe_distance
+                ITF_Obstacle.OBSTACLE_SAFE_DISTANCE
             )
             position = (point[0], point[1], np.pi * np.random.random())
 
@@ -298,9 +326,21 @@ class RandomObstacleList(NamedTuple):
 
 
 class ITF_Random(ITF_Obstacle, ITF_Base):
+    # meters, default of configuration/task_mode/random/obstacle_separation,
+    # obstacles placed one after another kept the safe distance to each other
+    OBSTACLE_SEPARATION = ITF_Obstacle.OBSTACLE_SAFE_DISTANCE
+
+    obstacle_separation: float
+
     def __init__(self, TASK: Props_):
         ITF_Base.__init__(self, TASK=TASK)
 
+        self.obstacle_separation = rosparam_get(
+            float,
+            "configuration/task_mode/random/obstacle_separation",
+            ITF_Random.OBSTACLE_SEPARATION,
+        )
+
     def load_obstacle_list(self) -> RandomObstacleList:
         def str_to_RandomList(value: list) -> RandomList:
             # TODO optional probability weighting of models in config
@@ -437,35 +477,47 @@ class ITF_Random(ITF_Obstacle, ITF_Base):
         self.PROPS.obstacle_manager.reset()
         self.PROPS.map_manager.init_forbidden_zones()
 
-        # Create static obstacles
-        if n_static_obstacles:
-            self.PROPS.obstacle_manager.spawn_obstacles(
-                [
-                    ITF_Obstacle.create_obstacle(
-                        self, name=model, model=self.PROPS.model_loader.bind(model)
-                    )
-                    for model in random.choices(
-                        population=list(static_obstacles.keys()),
-                        weights=list(static_obstacles.values()),
-                        k=n_static_obstacles,
-                    )
-                ]
+        # place all obstacles at once, obstacles that don't fit are skipped
+        positions = iter(
+            self.PROPS.map_manager.sample_positions(
+                n_static_obstacles + n_interactive_obstacles + n_dynamic_obstacles,
+                safe_dist=ITF_Random.OBSTACLE_SAFE_DISTANCE,
+                min_separation=self.obstacle_separation,
+            )
+        )
+
+        def to_position(point: Waypoint) -> PositionOrientation:
+            return (point[0], point[1], np.pi * np.random.random())
+
+        def choose_models(models: RandomList, k: int) -> List[str]:
+            if k <= 0:
+                return []
+
+            return random.choices(
+                population=list(models.keys()),
+                weights=list(models.values()),
+                k=k,
             )
 
-        # Create interactive obstacles
-        if n_interactive_obstacles:
-            self.PROPS.obstacle_manager.spawn_obstacles(
+        # Create static and interactive obstacles, spawned in one batch
+        obstacles = [
+            ITF_Obstacle.create_obstacle(
+                self,
+                name=model,
+                model=self.PROPS.model_loader.bind(model),
+                position=to_position(point),
+            )
+            for model, point in zip(
                 [
-                    ITF_Obstacle.create_obstacle(
-                        self, name=model, model=self.PROPS.model_loader.bind(model)
-                    )
-                    for model in random.choices(
-                        population=list(interactive_obstacles.keys()),
-                        weights=list(interactive_obstacles.values()),
-                        k=n_interactive_obstacles,
-                    )
-                ]
+                    *choose_models(static_obstacles, n_static_obstacles),
+                    *choose_models(interactive_obstacles, n_interactive_obstacles),
+                ],
+                positions,
             )
+        ]
+
+        if obstacles:
+            self.PROPS.obstacle_manager.spawn_obstacles(obstacles)
 
         # Create dynamic obstacles
         if n_dynamic_obstacles:
@@ -475,11 +527,11 @@ class ITF_Random(ITF_Obstacle, ITF_Base):
                         self,
                         name=model,
                         model=self.PROPS.dynamic_model_loader.bind(model),
+                        position=to_position(point),
                     )
-                    for model in random.choices(
-                        population=list(dynamic_obstacles.keys()),
-                        weights=list(dynamic_obstacles.values()),
-                        k=n_dynamic_obstacles,
+                    for model, point in zip(
+                        choose_models(dynamic_obstacles, n_dynamic_obstacles),
+                        positions,
                     )
                 ]
             )
@@ -616,7 +668,9 @@ class ITF_Staged(ITF_Obstacle, ITF_Base):
 
     @property
     def IS_EVAL_SIM(self) -> bool:
-        return self.PROPS.namespace == "eval_sim"
+        return self.PROPS.namespace == "eval_sim" or self.PROPS.namespace.startswith(
+            "eval_sim_"
+        )
 
     @property
     def MIN_STAGE(self) -> StageIndex:
@@ -707,10 +761,12 @@ class ITF_DynamicMap(ITF_Base):
     TOPIC_SIGNAL_MAP = "/signal_new_distance_map"
 
     SERVICE_DISTANCE_MAP = "/distance_map"
+    SERVICE_DISTANCE_WINDOW = "/distance_map/window"
 
     __map_request_pub: rospy.Publisher
     __task_reset_pub: rospy.Publisher
     __get_dist_map_service: rospy.ServiceProxy
+    __get_dist_window_service: rospy.ServiceProxy
 
     __configurations: DynamicMapConfigurations
 
@@ -733,6 +789,9 @@ class ITF_DynamicMap(ITF_Base):
         self.__get_dist_map_service = rospy.ServiceProxy(
             ITF_DynamicMap.SERVICE_DISTANCE_MAP, GetDistanceMap
         )
+        self.__get_dist_window_service = rospy.ServiceProxy(
+            ITF_DynamicMap.SERVICE_DISTANCE_WINDOW, GetDistanceWindow
+        )
 
     @staticmethod
     def parse(config: List[Dict]) -> DynamicMapConfigurations:
@@ -760,11 +819,30 @@ class ITF_DynamicMap(ITF_Base):
                 f"'DYNAMIC_MAP_RANDOM' task can only be used with dynamic map, otherwise the MapGenerator isn't used. (expected: {Constants.MapGenerator.MAP_FOLDER_NAME}, got: {map_name})"
             )
 
-    def update_map(self, dist_map: Optional[GetDistanceMapResponse] = None):
+    def update_map(
+        self,
+        dist_map: Optional[
+            Union[
+                GetDistanceMapResponse, GetDistanceWindowResponse, SharedDistanceMap
+            ]
+        ] = None,
+    ):
         if dist_map is None:
-            dist_map = self.__get_dist_map_service()
+            if self.PROPS.map_manager.shared_map is not None:
+                # the new map is already published, attach to it
+                dist_map = self.PROPS.map_manager.shared_map
+            elif self.PROPS.map_manager.remote:
+                # metadata only, the distance map stays on the server
+                dist_map = self.__get_dist_window_service(
+                    x=0, y=0, width=0, height=0
+                )
+            else:
+                dist_map = self.__get_dist_map_service()
 
-        if isinstance(dist_map, GetDistanceMapResponse):
+        if isinstance(
+            dist_map,
+            (GetDistanceMapResponse, GetDistanceWindowResponse, SharedDistanceMap),
+        ):
             self.PROPS.map_manager.update_map(dist_map)
 
     def subscribe_reset(self, callback: Callable) -> rospy.Subscriber:
@@ -0,0 +1,128 @@
+from typing import Callable, Dict, Set
+
+import pytest
+
+rospy = pytest.importorskip("rospy")
+pytest.importorskip("flatland_msgs")
+
+from flatland_msgs.srv import (
+    DeleteModelResponse,
+    DeleteModelsResponse,
+    SpawnModelResponse,
+    SpawnModelsResponse,
+)
+from task_generator.shared import EntityProps, Model, ModelType, ModelWrapper, Namespace
+from task_generator.simulators.flatland_simulator import FlatlandSimulator
+
+
+class FakeFlatland:
+    """
+    Stand-in for the model services of flatland, spawning fails for the
+    models in failing and the batch fails if any of its models does.
+    """
+
+    def __init__(self, batch: bool = True):
+        self.batch = batch
+        self.failing: Set[str] = set()
+        self.spawned: Set[str] = set()
+        self.batch_requests = 0
+
+    def services(self) -> Dict[str, Callable]:
+        services = {
+            "move_model": lambda request: None,
+            "spawn_model": self.spawn_model,
+            "spawn_model_from_string": self.spawn_model,
+            "delete_model": self.delete_model,
+            "delete_models": self.delete_models,
+        }
+        if self.batch:
+            services["spawn_models_from_string"] = self.spawn_models
+        return services
+
+    def spawn_model(self, request):
+        if request.name in self.failing:
+            return SpawnModelResponse(success=False, message="failing")
+        self.spawned.add(request.name)
+        return SpawnModelResponse(success=True)
+
+    def spawn_models(self, request):
+        self.batch_requests += 1
+        success = True
+        for model in request.models:
+            success = self.spawn_model(model).success and success
+        return SpawnModelsResponse(success=success)
+
+    def delete_model(self, request):
+        self.spawned.discard(request.name)
+        return DeleteModelResponse(success=True)
+
+    def delete_models(self, request):
+        self.spawned.difference_update(request.name)
+        return DeleteModelsResponse(success=True)
+
+
+@pytest.fixture
+def connect(monkeypatch):
+    def connect(flatland: FakeFlatland) -> FlatlandSimulator:
+        services = {
+            Namespace("sim_1")(name): service
+            for name, service in flatland.services().items()
+        }
+
+        def wait_for_service(name, timeout=None):
+            if name not in services:
+                raise rospy.ROSException(f"timeout exceeded while waiting for service {name}")
+
+        monkeypatch.setattr(rospy, "wait_for_service", wait_for_service)
+        monkeypatch.setattr(
+            rospy, "ServiceProxy", lambda name, *args, **kwargs: services[name]
+        )
+        monkeypatch.setattr(rospy, "Publisher", lambda *args, **kwargs: None)
+        monkeypatch.setattr(
+            rospy, "get_param", lambda param_name, default=None: default
+        )
+        monkeypatch.setattr(FlatlandSimulator, "SPAWN_MODELS_PROBE_TIMEOUT", 0)
+
+        return FlatlandSimulator(Namespace("sim_1"))
+
+    return connect
+
+
+def obstacle(name: str) -> EntityProps:
+    model = Model(type=ModelType.YAML, name=name, description="bodies: []", path="")
+    return EntityProps(
+        position=(1.0, 2.0, 0.0),
+        name=name,
+        model=ModelWrapper.from_model(model),
+        extra={},
+    )
+
+
+def test_spawns_batch(connect):
+    flatland = FakeFlatland()
+    simulator = connect(flatland)
+
+    assert simulator.spawn_entities([obstacle("a"), obstacle("b")]) == [True, True]
+    assert flatland.spawned == {"a", "b"}
+    assert flatland.batch_requests == 1
+
+
+def test_reports_failures_individually(connect):
+    flatland = FakeFlatland()
+    flatland.failing = {"b"}
+    simulator = connect(flatland)
+
+    results = simulator.spawn_entities([obstacle("a"), obstacle("b"), obstacle("c")])
+
+    assert results == [True, False, True]
+    assert flatland.spawned == {"a", "c"}
+
+
+def test_falls_back_without_batch_service(connect):
+    flatland = FakeFlatland(batch=False)
+    flatland.failing = {"a"}
+    simulator = connect(flatland)
+
+    assert simulator.spawn_entities([obstacle("a"), obstacle("b")]) == [False, True]
+    assert flatland.spawned == {"b"}
+    assert flatland.batch_requests == 0
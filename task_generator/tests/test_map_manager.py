@@ -0,0 +1,81 @@
+import itertools
+import math
+
+import numpy as np
+import pytest
+
+rospy = pytest.importorskip("rospy")
+pytest.importorskip("map_distance_server.srv")
+
+from map_distance_server import DistanceEngineFactory
+from map_distance_server.srv import GetDistanceMapResponse
+from task_generator.manager.map_manager import MapManager
+
+RESOLUTION = 0.1
+
+
+def distance_map(size: int, seed: int = 0) -> GetDistanceMapResponse:
+    rng = np.random.default_rng(seed)
+
+    map_2d = np.zeros((size, size), dtype=np.int8)
+    map_2d[0, :] = map_2d[-1, :] = map_2d[:, 0] = map_2d[:, -1] = 100
+    for _ in range(size * size // 2000):
+        x, y = rng.integers(0, size, 2)
+        map_2d[y : y + 5, x : x + 5] = 100
+
+    response = GetDistanceMapResponse()
+    response.info.resolution = RESOLUTION
+    response.info.width = size
+    response.info.height = size
+    response.data = (
+        DistanceEngineFactory.instantiate("chessboard")().compute(map_2d).ravel().tolist()
+    )
+    return response
+
+
+def to_cell(point) -> tuple:
+    x, y, _ = point
+    return round(y / RESOLUTION), round(x / RESOLUTION)
+
+
+@pytest.fixture
+def map_manager() -> MapManager:
+    return MapManager(distance_map(200))
+
+
+@pytest.mark.parametrize("min_separation", [0, 1.0])
+def test_sample_positions(map_manager, min_separation):
+    points = map_manager.sample_positions(50, safe_dist=0.5, min_separation=min_separation)
+    cells = [to_cell(point) for point in points]
+
+    assert len(points) == 50
+    assert len(set(cells)) == 50
+
+    safe_dist_in_cells = math.ceil(0.5 / RESOLUTION) + 1
+    distances = np.reshape(map_manager._map.data, (200, 200))
+    assert all(distances[cell] > safe_dist_in_cells for cell in cells)
+
+    for a, b in itertools.combinations(cells, 2):
+        assert math.dist(a, b) * RESOLUTION >= min_separation - 1e-9
+
+
+def test_sample_positions_avoid_forbidden_zones(map_manager):
+    zone = (10.0, 10.0, 3.0)
+    points = map_manager.sample_positions(20, safe_dist=0.5, forbidden_zones=[zone])
+
+    assert len(points) == 20
+    for x, y, _ in points:
+        assert math.hypot(x - zone[0], y - zone[1]) > zone[2] + 0.5
+
+
+def test_sample_positions_on_crowded_map(map_manager, monkeypatch):
+    warnings = []
+    monkeypatch.setattr(rospy, "logwarn", warnings.append)
+
+    points = map_manager.sample_positions(1000, safe_dist=0.5, min_separation=2.0)
+    cells = [to_cell(point) for point in points]
+
+    assert 0 < len(points) < 1000
+    assert len(warnings) == 1
+    for a, b in itertools.combinations(cells, 2):
+        assert math.dist(a, b) * RESOLUTION >= 2.0 - 1e-9
@@ -0,0 +1,136 @@
+#!/usr/bin/env python
+"""
+Evaluates the checkpoints the AsyncEvalCallback of a running training saves
+(callbacks.periodic_eval.asynchronous) on the eval simulations and writes
+the results back to the async eval directory. Started by the callback,
+always evaluates the newest checkpoint and skips older ones it fell behind
+on. Exits when the training process does.
+"""
+
+import argparse
+import os
+import time
+
+import numpy as np
+import rospy
+from stable_baselines3.common.evaluation import evaluate_policy
+from stable_baselines3.common.vec_env import VecNormalize
+from stable_baselines3.common.vec_env.base_vec_env import VecEnv
+
+# registers the custom policies
+import rosnav.model.custom_policy
+import rosnav.model.custom_sb3_policy
+from tools.async_eval import (
+    EvalResult,
+    checkpoint_path,
+    next_checkpoint,
+    read_evaluator_config,
+    write_result,
+)
+from tools.checkpoint_manager import (
+    MODEL_FILE,
+    VEC_NORMALIZE_FILE,
+    CheckpointManager,
+)
+from tools.env_utils import make_eval_env, wrap_vec_framestack
+from tools.model_utils import ALGORITHMS
+
+
+def evaluate_checkpoint(
+    path: str, timesteps: int, eval_env: VecEnv, config: dict, device: str
+) -> EvalResult:
+    checkpoint = checkpoint_path(path, timesteps)
+    algorithm = ALGORITHMS[CheckpointManager.algorithm(checkpoint)]
+
+    env = eval_env
+    if os.path.isfile(os.path.join(checkpoint, VEC_NORMALIZE_FILE)):
+        env = VecNormalize.load(os.path.join(checkpoint, VEC_NORMALIZE_FILE), eval_env)
+        env.training = False
+        # rewards are reported unnormalized by the monitor
+        env.norm_reward = False
+
+    model = algorithm.load(os.path.join(checkpoint, MODEL_FILE), device=device)
+
+    successes = []
+
+    def log_success(locals_: dict, globals_: dict):
+        if locals_["done"] and "is_success" in locals_["info"]:
+            successes.append(locals_["info"]["is_success"])
+
+    periodic_eval_cfg = config["callbacks"]["periodic_eval"]
+    stage = rospy.get_param("/curr_stage", -1)
+    start = time.time()
+
+    episode_rewards, episode_lengths = evaluate_policy(
+        model,
+        env,
+        n_eval_episodes=periodic_eval_cfg["n_eval_episodes"],
+        deterministic=True,
+        return_episode_rewards=True,
+        callback=log_success,
+    )
+
+    return EvalResult(
+        timesteps=timesteps,
+        mean_reward=float(np.mean(episode_rewards)),
+        std_reward=float(np.std(episode_rewards)),
+        mean_ep_length=float(np.mean(episode_lengths)),
+        success_rate=float(np.mean(successes)) if successes else 0.0,
+        episode_rewards=[float(reward) for reward in episode_rewards],
+        episode_lengths=[int(length) for length in episode_lengths],
+        stage=stage if rospy.get_param("/curr_stage", -1) == stage else None,
+        duration=time.time() - start,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--path", type=str, required=True, help="async eval directory")
+    parser.add_argument(
+        "--parent_pid", type=int, default=None, help="exit when this process is gone"
+    )
+    parser.add_argument("--device", type=str, default="cpu")
+    parser.add_argument("--poll_interval", type=float, default=1.0)
+    args = parser.parse_args()
+
+    evaluator_config = read_evaluator_config(args.path)
+    config, paths = evaluator_config["config"], evaluator_config["paths"]
+
+    # all eval envs share the node of this process
+    rospy.init_node("checkpoint_evaluator", anonymous=True, disable_signals=False)
+
+    eval_env = wrap_vec_framestack(
+        config,
+        make_eval_env(
+            config, paths, rospy.get_param("/ns_for_nodes", True), init_node=False
+        ),
+    )
+
+    while not rospy.is_shutdown():
+        if args.parent_pid is not None and os.getppid() != args.parent_pid:
+            break
+
+        timesteps = next_checkpoint(args.path)
+        if timesteps is None:
+            time.sleep(args.poll_interval)
+            continue
+
+        try:
+            result = evaluate_checkpoint(
+                args.path, timesteps, eval_env, config, args.device
+            )
+        except FileNotFoundError:
+            # removed by the training in the meantime
+            continue
+
+        write_result(args.path, result)
+        print(
+            f"Evaluated checkpoint {timesteps} in {result.duration:.0f}s: "
+            f"reward {result.mean_reward:.2f}, success rate {result.success_rate:.2f}"
+        )
+
+    eval_env.close()
+
+
+if __name__ == "__main__":
+    main()
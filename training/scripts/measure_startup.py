@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+"""
+Measures the time to the first training step, i.e. how long waiting for the
+simulations, creating the environments, the first reset and the first step
+take. Start the simulation with the number of environments to measure
+(e.g. 8, 16 and 32) and run this script with the same --n_envs.
+"""
+
+import argparse
+import time
+
+import numpy as np
+import rospy
+from tools.constants import TRAINING_CONSTANTS
+from tools.env_utils import init_envs
+from tools.general import initialize_config, load_config, wait_for_nodes
+from tools.ros_param_distributor import populate_ros_configs, populate_ros_params
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--config",
+        type=str,
+        default="training_config.yaml",
+        help="name of the training config file",
+    )
+    parser.add_argument("--n_envs", type=int, required=True)
+    parser.add_argument(
+        "--vec_env",
+        type=str,
+        choices=["subproc", "flatland"],
+        default=None,
+        help="overrides vec_env of the config",
+    )
+    args = parser.parse_args()
+
+    config = load_config(args.config)
+    config["n_envs"] = args.n_envs
+    config["debug_mode"] = False
+    # nothing is stored
+    config["rl_agent"]["normalize"]["enabled"] = False
+    if args.vec_env is not None:
+        config["vec_env"] = args.vec_env
+
+    populate_ros_configs(config)
+
+    paths = {
+        "eval": None,
+        "curriculum": TRAINING_CONSTANTS.PATHS.CURRICULUM(
+            config["callbacks"]["training_curriculum"]["training_curriculum_file"]
+        ),
+    }
+    ns_for_nodes = rospy.get_param("/ns_for_nodes", True)
+
+    timings = {}
+    start = time.monotonic()
+
+    wait_for_nodes(
+        with_ns=ns_for_nodes,
+        n_envs=config["n_envs"],
+        timeout=60,
+        services=["step_world"],
+    )
+    timings["simulations ready"] = time.monotonic()
+
+    config = initialize_config(
+        PATHS=paths, config=config, n_envs=config["n_envs"], debug_mode=True
+    )
+    populate_ros_params(config)
+
+    train_env, _ = init_envs(config, paths, ns_for_nodes)
+    timings["envs created"] = time.monotonic()
+
+    train_env.reset()
+    timings["first reset"] = time.monotonic()
+
+    train_env.step(
+        np.array([train_env.action_space.sample() for _ in range(train_env.num_envs)])
+    )
+    timings["first step"] = time.monotonic()
+
+    print(
+        f"\nTime to first step with {config['n_envs']} envs "
+        f"({config.get('vec_env', 'subproc')}):"
+    )
+    last = start
+    for phase, timestamp in timings.items():
+        print(
+            f"{phase:>20}: {timestamp - last:8.2f}s (total {timestamp - start:8.2f}s)"
+        )
+        last = timestamp
+
+    train_env.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -4,12 +4,13 @@ import time
 
 import rospy
 from rosnav.model.agent_factory import AgentFactory
-from stable_baselines3.common.vec_env.vec_normalize import VecNormalize
 from std_msgs.msg import Empty
 from tools.argsparser import parse_training_args
+from tools.checkpoint_manager import CheckpointManager, SaveCheckpoint
 from tools.env_utils import init_envs
 from tools.general import *
 from tools.model_utils import get_ppo_instance, init_callbacks
+from tools.step_profiling_callback import LogStepProfile
 from tools.ros_param_distributor import *
 
 """
@@ -37,8 +38,10 @@ TODO:
 """
 
 
-def on_shutdown(model):
+def on_shutdown(model, checkpoint_manager):
     model.env.close()
+    if checkpoint_manager is not None:
+        checkpoint_manager.close()
     sys.exit()
 
 
@@ -64,7 +67,12 @@ def main():
     ns_for_nodes = rospy.get_param("/ns_for_nodes", True)
 
     # check if simulations are booted
-    wait_for_nodes(with_ns=ns_for_nodes, n_envs=config["n_envs"], timeout=5)
+    wait_for_nodes(
+        with_ns=ns_for_nodes,
+        n_envs=config["n_envs"],
+        timeout=60,
+        services=["step_world"],
+    )
 
     # initialize hyperparameters (save to/ load from json)
     config = initialize_config(
@@ -77,24 +85,43 @@ def main():
     populate_ros_params(config)
 
     train_env, eval_env = init_envs(config, PATHS, ns_for_nodes)
-    eval_cb = init_callbacks(config, train_env, eval_env, PATHS)
+
+    # models and VecNormalize statistics are serialized in the background
+    checkpoint_cfg = config["callbacks"].get("checkpoints", {})
+    checkpoint_manager = (
+        None
+        if config["debug_mode"]
+        else CheckpointManager(
+            PATHS["checkpoints"],
+            keep_last=checkpoint_cfg.get("keep_last", 3),
+            export_best_path=PATHS["model"],
+        )
+    )
+
+    eval_cb = init_callbacks(config, train_env, eval_env, PATHS, checkpoint_manager)
+    callbacks = [eval_cb]
+    if checkpoint_manager is not None:
+        callbacks.append(
+            SaveCheckpoint(checkpoint_manager, checkpoint_cfg.get("save_freq", 0))
+        )
+    if config["monitoring"].get("profile_steps", False):
+        callbacks.append(LogStepProfile())
     model = get_ppo_instance(config, train_env, PATHS, AgentFactory)
 
-    rospy.on_shutdown(lambda: on_shutdown(model))
+    rospy.on_shutdown(lambda: on_shutdown(model, checkpoint_manager))
 
-    ## Save model once
-    if not config["debug_mode"]:
-        model.save(os.path.join(PATHS["model"], "best_model"))
-        if isinstance(train_env, VecNormalize):
-            train_env.save(os.path.join(PATHS["model"], "vec_normalize.pkl"))
+    ## Save model once, resumed agents already have a best model
+    if checkpoint_manager is not None and not config["rl_agent"]["resume"]:
+        checkpoint_manager.save(model, model.num_timesteps, best=True)
 
     # start training
     start = time.time()
     try:
         model.learn(
             total_timesteps=config["n_timesteps"] or 40000000,
-            callback=eval_cb,
-            reset_num_timesteps=True,
+            callback=callbacks,
+            # resumed trainings continue counting, checkpoints are named by timesteps
+            reset_num_timesteps=not config["rl_agent"]["resume"],
         )
     except KeyboardInterrupt:
         print("KeyboardInterrupt..")
@@ -102,6 +129,8 @@ def main():
     print(f"Time passed: {time.time()-start}s. \n Training script will be terminated..")
 
     model.env.close()
+    if checkpoint_manager is not None:
+        checkpoint_manager.close()
 
     sys.exit()
 
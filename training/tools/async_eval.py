@@ -0,0 +1,328 @@
+import json
+import os
+import shutil
+import subprocess
+import sys
+import time
+from dataclasses import asdict, dataclass, field
+from typing import List, Optional
+
+import numpy as np
+import rospy
+import yaml
+from stable_baselines3.common.callbacks import BaseCallback, EvalCallback
+from stable_baselines3.common.vec_env.base_vec_env import VecEnv
+
+from rl_utils.utils.utils import copy_file_atomic, write_json_atomic
+from tools.checkpoint_manager import MODEL_FILE, VEC_NORMALIZE_FILE, CheckpointManager
+from tools.constants import TRAINING_CONSTANTS
+
+"""
+Evaluation of training checkpoints in a separate evaluator process
+(scripts/evaluate_checkpoints.py) with its own eval simulations, so the
+training isn't paused for the evaluation episodes.
+
+Layout of the async eval directory:
+    evaluator.yaml          config and paths the evaluator builds its eval env from
+    checkpoints/            checkpoints of a `CheckpointManager`
+    results/<timesteps>.json
+
+Results are written to temporary paths and renamed, so readers only see
+complete ones.
+"""
+
+EVALUATOR_FILE = "evaluator.yaml"
+CHECKPOINT_DIR = "checkpoints"
+RESULT_DIR = "results"
+
+EVALUATOR_SCRIPT = os.path.join(
+    TRAINING_CONSTANTS.PATHS.MAIN, "scripts", "evaluate_checkpoints.py"
+)
+
+
+@dataclass
+class EvalResult:
+    timesteps: int
+    mean_reward: float
+    std_reward: float
+    mean_ep_length: float
+    success_rate: float
+    episode_rewards: List[float] = field(default_factory=list)
+    episode_lengths: List[int] = field(default_factory=list)
+    # training stage the checkpoint was evaluated on, None if it changed during the evaluation
+    stage: Optional[int] = None
+    # seconds the evaluation took
+    duration: float = 0.0
+
+
+def write_evaluator_config(path: str, config: dict, paths: dict):
+    with open(os.path.join(path, EVALUATOR_FILE), "w", encoding="utf-8") as target:
+        yaml.dump({"config": config, "paths": paths}, target)
+
+
+def read_evaluator_config(path: str) -> dict:
+    with open(os.path.join(path, EVALUATOR_FILE), "r", encoding="utf-8") as source:
+        return yaml.load(source, Loader=yaml.FullLoader)
+
+
+def checkpoint_path(path: str, timesteps: int) -> str:
+    return CheckpointManager.checkpoint_path(
+        os.path.join(path, CHECKPOINT_DIR), timesteps
+    )
+
+
+def checkpoints(path: str) -> List[int]:
+    """Returns: timesteps of the complete checkpoints in ascending order"""
+    return CheckpointManager.checkpoints(os.path.join(path, CHECKPOINT_DIR))
+
+
+def remove_checkpoints(path: str, up_to: int):
+    """Removes the checkpoints of up to the given timesteps."""
+    for timesteps in checkpoints(path):
+        if timesteps <= up_to:
+            shutil.rmtree(checkpoint_path(path, timesteps), ignore_errors=True)
+
+
+def write_result(path: str, result: EvalResult):
+    result_dir = os.path.join(path, RESULT_DIR)
+    os.makedirs(result_dir, exist_ok=True)
+    write_json_atomic(os.path.join(result_dir, f"{result.timesteps}.json"), asdict(result))
+
+
+def results(path: str, after: int = -1) -> List[EvalResult]:
+    """Returns: results of checkpoints after the given timesteps in ascending order"""
+    result_dir = os.path.join(path, RESULT_DIR)
+    if not os.path.isdir(result_dir):
+        return []
+
+    timesteps = sorted(
+        int(name[: -len(".json")])
+        for name in os.listdir(result_dir)
+        if name.endswith(".json") and name[: -len(".json")].isdigit()
+    )
+
+    new_results = []
+    for result_timesteps in timesteps:
+        if result_timesteps <= after:
+            continue
+        with open(
+            os.path.join(result_dir, f"{result_timesteps}.json"), "r", encoding="utf-8"
+        ) as source:
+            new_results.append(EvalResult(**json.load(source)))
+    return new_results
+
+
+def next_checkpoint(path: str) -> Optional[int]:
+    """
+    Returns: the newest checkpoint newer than all results, older checkpoints
+    are skipped when the evaluator falls behind
+    """
+    evaluated = max((result.timesteps for result in results(path)), default=-1)
+    pending = [timesteps for timesteps in checkpoints(path) if timesteps > evaluated]
+    return pending[-1] if pending else None
+
+
+class AsyncEvalCallback(EvalCallback):
+    """
+    EvalCallback that evaluates in a separate evaluator process. Every
+    eval_freq steps the model and the VecNormalize statistics are saved as a
+    checkpoint (written in the background), the evaluator evaluates the
+    newest checkpoint on its own eval simulations and writes the result to
+    the async eval directory. Results are polled every poll_interval seconds
+    and handled like the evaluations of the EvalCallback: the best
+    checkpoint is added to checkpoint_manager (or copied to
+    best_model_save_path without one) and callback_on_new_best /
+    callback_on_eval_end (e.g. `InitiateNewTrainStage`) are called.
+
+    Results of a checkpoint evaluated on another stage than the current one
+    are discarded, they would otherwise trigger a second stage change.
+
+    :param train_env: training environment
+    :param async_eval_path: async eval directory, see `tools.async_eval`
+    :param config: training config, passed to the evaluator
+    :param paths: program relevant paths, passed to the evaluator
+    :param checkpoint_manager: manager of the training checkpoints the best checkpoint is added to
+    :param start_evaluator: start scripts/evaluate_checkpoints.py, disable to run it separately
+    :param poll_interval: seconds between checking for new results
+    """
+
+    def __init__(
+        self,
+        train_env: VecEnv,
+        async_eval_path: str,
+        config: dict,
+        paths: dict,
+        checkpoint_manager: Optional[CheckpointManager] = None,
+        callback_on_eval_end: Optional[BaseCallback] = None,
+        callback_on_new_best: Optional[BaseCallback] = None,
+        n_eval_episodes: int = 5,
+        eval_freq: int = 10000,
+        log_path: Optional[str] = None,
+        best_model_save_path: Optional[str] = None,
+        deterministic: bool = True,
+        start_evaluator: bool = True,
+        poll_interval: float = 1.0,
+        verbose: int = 1,
+    ):
+        # the train env only stands in for the eval env, it is never stepped here
+        super(AsyncEvalCallback, self).__init__(
+            eval_env=train_env,
+            train_env=train_env,
+            n_eval_episodes=n_eval_episodes,
+            eval_freq=eval_freq,
+            log_path=log_path,
+            best_model_save_path=best_model_save_path,
+            deterministic=deterministic,
+            callback_on_eval_end=callback_on_eval_end,
+            callback_on_new_best=callback_on_new_best,
+            verbose=verbose,
+        )
+        self.async_eval_path = async_eval_path
+        self.checkpoint_manager = checkpoint_manager
+        self.start_evaluator = start_evaluator
+        self.poll_interval = poll_interval
+
+        self._config = config
+        self._paths = paths
+        self._on_eval_end = callback_on_eval_end
+        self._checkpoints: Optional[CheckpointManager] = None
+        self._evaluator: Optional[subprocess.Popen] = None
+        self._last_poll = 0.0
+        self._last_result_timesteps = -1
+
+        self.last_success_rate = -np.inf
+
+    def _init_callback(self) -> None:
+        super(AsyncEvalCallback, self)._init_callback()
+
+        # checkpoints are removed once evaluated
+        self._checkpoints = CheckpointManager(
+            os.path.join(self.async_eval_path, CHECKPOINT_DIR), keep_last=None
+        )
+        write_evaluator_config(self.async_eval_path, self._config, self._paths)
+        # results of a previous run with this agent
+        self._last_result_timesteps = max(
+            (result.timesteps for result in results(self.async_eval_path)),
+            default=-1,
+        )
+
+        if self.start_evaluator:
+            self._evaluator = subprocess.Popen(
+                [
+                    sys.executable,
+                    EVALUATOR_SCRIPT,
+                    "--path",
+                    self.async_eval_path,
+                    "--parent_pid",
+                    str(os.getpid()),
+                ]
+            )
+
+    def _on_step(self) -> bool:
+        if self.eval_freq > 0 and self.n_calls % self.eval_freq == 0:
+            self._checkpoints.save(self.model, self.num_timesteps)
+
+        if time.monotonic() - self._last_poll < self.poll_interval:
+            return True
+        self._last_poll = time.monotonic()
+
+        if self._evaluator is not None and self._evaluator.poll() is not None:
+            rospy.logwarn_throttle(
+                60,
+                f"Checkpoint evaluator exited with code {self._evaluator.returncode}",
+            )
+
+        continue_training = True
+        for result in results(self.async_eval_path, after=self._last_result_timesteps):
+            continue_training = self._on_result(result) and continue_training
+        return continue_training
+
+    def _on_result(self, result: EvalResult) -> bool:
+        self._last_result_timesteps = result.timesteps
+        continue_training = True
+
+        curr_stage = rospy.get_param("/curr_stage", -1)
+        if result.stage != curr_stage:
+            if self.verbose > 0:
+                print(
+                    f"Discarding evaluation of checkpoint {result.timesteps}, "
+                    f"evaluated on stage {result.stage} instead of {curr_stage}"
+                )
+            remove_checkpoints(self.async_eval_path, up_to=result.timesteps)
+            return continue_training
+
+        if self.log_path is not None:
+            self.evaluations_timesteps.append(result.timesteps)
+            self.evaluations_results.append(result.episode_rewards)
+            self.evaluations_length.append(result.episode_lengths)
+            np.savez(
+                self.log_path,
+                timesteps=self.evaluations_timesteps,
+                results=self.evaluations_results,
+                ep_lengths=self.evaluations_length,
+            )
+
+        self.last_mean_reward = result.mean_reward
+        self.last_success_rate = result.success_rate
+
+        if self.verbose > 0:
+            print(
+                f"Eval checkpoint={result.timesteps}, "
+                f"episode_reward={result.mean_reward:.2f} +/- {result.std_reward:.2f}"
+            )
+            print(
+                f"Episode length: {result.mean_ep_length:.2f}, "
+                f"success rate: {100 * result.success_rate:.2f}%"
+            )
+        self.logger.record("eval/mean_reward", result.mean_reward)
+        self.logger.record("eval/mean_ep_length", result.mean_ep_length)
+        self.logger.record("eval/success_rate", result.success_rate)
+        self.logger.record("eval/checkpoint_timesteps", result.timesteps)
+        # timesteps the training advanced while the checkpoint was evaluated
+        self.logger.record("eval/checkpoint_lag", self.num_timesteps - result.timesteps)
+        self.logger.record("eval/duration", result.duration)
+        self.logger.record(
+            "time/total_timesteps", self.num_timesteps, exclude="tensorboard"
+        )
+        self.logger.dump(self.num_timesteps)
+
+        if result.mean_reward > self.best_mean_reward:
+            if self.verbose > 0:
+                print("New best mean reward!")
+            if self.checkpoint_manager is not None:
+                self.checkpoint_manager.add_best(
+                    checkpoint_path(self.async_eval_path, result.timesteps),
+                    result.timesteps,
+                )
+            elif self.best_model_save_path is not None:
+                self._save_best(result.timesteps)
+            self.best_mean_reward = result.mean_reward
+            if self.callback_on_new_best is not None:
+                continue_training = self.callback_on_new_best.on_step()
+
+        if self._on_eval_end is not None:
+            self._on_eval_end._on_step(self)
+
+        remove_checkpoints(self.async_eval_path, up_to=result.timesteps)
+        return continue_training
+
+    def _save_best(self, timesteps: int):
+        checkpoint = checkpoint_path(self.async_eval_path, timesteps)
+        copy_file_atomic(
+            os.path.join(checkpoint, MODEL_FILE),
+            os.path.join(self.best_model_save_path, "best_model.zip"),
+        )
+        if os.path.isfile(os.path.join(checkpoint, VEC_NORMALIZE_FILE)):
+            copy_file_atomic(
+                os.path.join(checkpoint, VEC_NORMALIZE_FILE),
+                os.path.join(self.best_model_save_path, VEC_NORMALIZE_FILE),
+            )
+
+    def _on_training_end(self) -> None:
+        self._checkpoints.close()
+        if self._evaluator is not None and self._evaluator.poll() is None:
+            self._evaluator.terminate()
+            try:
+                self._evaluator.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                self._evaluator.kill()
@@ -0,0 +1,339 @@
+import copy
+import json
+import os
+import pickle
+import queue
+import shutil
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Union
+
+import rospy
+import torch
+from stable_baselines3.common.base_class import BaseAlgorithm
+from stable_baselines3.common.callbacks import BaseCallback
+from stable_baselines3.common.save_util import recursive_getattr, save_to_zip_file
+
+from rl_utils.utils.utils import copy_file_atomic, write_json_atomic
+
+"""
+Checkpoints of a model and the statistics of its VecNormalize env, written
+in a background thread.
+
+Every checkpoint is a directory <timesteps>/ holding model.zip,
+vec_normalize.pkl (if the model is trained with a VecNormalize env) and
+checkpoint.json. Directories are written under a temporary name and
+renamed, so every checkpoint directory holds a consistent pair.
+"""
+
+MODEL_FILE = "model.zip"
+VEC_NORMALIZE_FILE = "vec_normalize.pkl"
+CHECKPOINT_FILE = "checkpoint.json"
+# timesteps of the best checkpoint
+BEST_FILE = "best.json"
+# seconds `CheckpointManager.close` waits for the pending checkpoints to be written
+CLOSE_TIMEOUT = 120
+
+
+def _copy_state(value: Any) -> Any:
+    """Deep copy of (nested) state dicts with all tensors copied to the cpu."""
+    if isinstance(value, torch.Tensor):
+        return value.detach().to("cpu", copy=True)
+    if isinstance(value, dict):
+        return value.__class__((key, _copy_state(item)) for key, item in value.items())
+    if isinstance(value, list):
+        return [_copy_state(item) for item in value]
+    return copy.deepcopy(value)
+
+
+@dataclass
+class _Snapshot:
+    timesteps: int
+    algorithm: str
+    # arguments of `save_to_zip_file`, as in `BaseAlgorithm.save`
+    data: Dict[str, Any]
+    params: Dict[str, Dict[str, Any]]
+    pytorch_variables: Optional[Dict[str, Any]]
+    # pickled VecNormalize
+    vec_normalize: Optional[bytes]
+    best: bool
+
+
+@dataclass
+class _Staged:
+    """Complete checkpoint directory moved next to the checkpoints, added as the best one."""
+
+    timesteps: int
+    path: str
+
+
+def snapshot(model: BaseAlgorithm, timesteps: int, best: bool = False) -> _Snapshot:
+    """
+    Copies everything `BaseAlgorithm.save` would write, to be serialized
+    later while the model continues training.
+    """
+    data = model.__dict__.copy()
+    exclude = set(model._excluded_save_params())
+    state_dicts_names, torch_variable_names = model._get_torch_save_params()
+    for torch_var in state_dicts_names + torch_variable_names:
+        exclude.add(torch_var.split(".")[0])
+    for param_name in exclude:
+        data.pop(param_name, None)
+
+    pytorch_variables = {
+        name: _copy_state(recursive_getattr(model, name))
+        for name in torch_variable_names
+    }
+
+    vec_normalize = model.get_vec_normalize_env()
+
+    return _Snapshot(
+        timesteps=timesteps,
+        algorithm=type(model).__name__,
+        data=copy.deepcopy(data),
+        params=_copy_state(model.get_parameters()),
+        pytorch_variables=pytorch_variables or None,
+        # only the statistics are pickled, not the wrapped envs
+        vec_normalize=None if vec_normalize is None else pickle.dumps(vec_normalize),
+        best=best,
+    )
+
+
+class CheckpointManager:
+    """
+    Saves checkpoints of a model in a background thread, `save` only copies
+    the state of the model in memory. Keeps the last keep_last checkpoints
+    and the best one (all if keep_last is None). The best checkpoint is
+    additionally exported to export_best_path as best_model.zip and
+    vec_normalize.pkl, where the agent is deployed and evaluated from.
+
+    If max_pending snapshots are waiting to be written, `save` blocks until
+    the writer caught up.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        keep_last: Optional[int] = 3,
+        export_best_path: Optional[str] = None,
+        max_pending: int = 2,
+    ):
+        self.path = path
+        self.keep_last = keep_last
+        self.export_best_path = export_best_path
+        os.makedirs(path, exist_ok=True)
+
+        self._queue: "queue.Queue[Union[_Snapshot, _Staged, None]]" = queue.Queue(
+            maxsize=max_pending
+        )
+        self._thread = threading.Thread(
+            target=self._run, name="checkpoint_writer", daemon=True
+        )
+        self._thread.start()
+
+    @staticmethod
+    def checkpoint_path(path: str, timesteps: int) -> str:
+        return os.path.join(path, str(timesteps))
+
+    @staticmethod
+    def checkpoints(path: str) -> List[int]:
+        """Returns: timesteps of the complete checkpoints in path in ascending order"""
+        if not path or not os.path.isdir(path):
+            return []
+        return sorted(int(name) for name in os.listdir(path) if name.isdigit())
+
+    @staticmethod
+    def newest(path: str) -> Optional[str]:
+        """Returns: directory of the newest complete checkpoint in path"""
+        checkpoints = CheckpointManager.checkpoints(path)
+        if not checkpoints:
+            return None
+        return CheckpointManager.checkpoint_path(path, checkpoints[-1])
+
+    @staticmethod
+    def algorithm(checkpoint: str) -> str:
+        """Returns: class name of the model of the checkpoint directory"""
+        with open(
+            os.path.join(checkpoint, CHECKPOINT_FILE), "r", encoding="utf-8"
+        ) as source:
+            return json.load(source)["algorithm"]
+
+    def save(self, model: BaseAlgorithm, timesteps: int, best: bool = False):
+        self._queue.put(snapshot(model, timesteps, best))
+
+    def add_best(self, checkpoint: str, timesteps: int):
+        """
+        Moves a complete checkpoint directory written elsewhere (e.g. by the
+        checkpoint manager of an `AsyncEvalCallback`) into this manager and
+        makes it the best checkpoint. Only the move, a rename on the same
+        file system, happens on the calling thread.
+        """
+        staged = CheckpointManager.checkpoint_path(self.path, timesteps) + ".staged"
+        shutil.rmtree(staged, ignore_errors=True)
+        shutil.move(checkpoint, staged)
+        self._queue.put(_Staged(timesteps=timesteps, path=staged))
+
+    def wait(self):
+        """Blocks until all saved checkpoints are written."""
+        self._queue.join()
+
+    def close(self, timeout: float = CLOSE_TIMEOUT):
+        """
+        Writes the pending checkpoints, gives up after timeout seconds.
+        """
+        try:
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            rospy.logerr(f"[{self.path}] checkpoint writer stuck, pending checkpoints are lost")
+            return
+
+        self._thread.join(timeout=timeout)
+
+        if self._thread.is_alive():
+            rospy.logerr(f"[{self.path}] checkpoint writer didn't finish within {timeout}s")
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+
+            if item is None:
+                self._queue.task_done()
+                return
+
+            try:
+                if isinstance(item, _Staged):
+                    self._add(item)
+                else:
+                    self._write(item)
+            except Exception as e:
+                rospy.logerr(f"[{self.path}] Couldn't write checkpoint {item.timesteps}: {e}")
+            finally:
+                self._queue.task_done()
+
+    def _write(self, snapshot: _Snapshot):
+        target = CheckpointManager.checkpoint_path(self.path, snapshot.timesteps)
+        tmp_target = target + ".tmp"
+        shutil.rmtree(tmp_target, ignore_errors=True)
+        os.makedirs(tmp_target)
+
+        save_to_zip_file(
+            os.path.join(tmp_target, MODEL_FILE),
+            data=snapshot.data,
+            params=snapshot.params,
+            pytorch_variables=snapshot.pytorch_variables,
+        )
+        if snapshot.vec_normalize is not None:
+            with open(os.path.join(tmp_target, VEC_NORMALIZE_FILE), "wb") as target_file:
+                target_file.write(snapshot.vec_normalize)
+        write_json_atomic(
+            os.path.join(tmp_target, CHECKPOINT_FILE),
+            {"timesteps": snapshot.timesteps, "algorithm": snapshot.algorithm},
+        )
+
+        shutil.rmtree(target, ignore_errors=True)
+        os.replace(tmp_target, target)
+
+        if snapshot.best:
+            self._set_best(target, snapshot.timesteps)
+
+        self._prune()
+
+    def _add(self, staged: _Staged):
+        target = CheckpointManager.checkpoint_path(self.path, staged.timesteps)
+        shutil.rmtree(target, ignore_errors=True)
+        os.replace(staged.path, target)
+
+        self._set_best(target, staged.timesteps)
+        self._prune()
+
+    def _set_best(self, checkpoint: str, timesteps: int):
+        write_json_atomic(os.path.join(self.path, BEST_FILE), {"timesteps": timesteps})
+        if self.export_best_path is not None:
+            self._export(checkpoint)
+
+    def _export(self, checkpoint: str):
+        # statistics first, so best_model.zip is never newer than vec_normalize.pkl
+        if os.path.isfile(os.path.join(checkpoint, VEC_NORMALIZE_FILE)):
+            copy_file_atomic(
+                os.path.join(checkpoint, VEC_NORMALIZE_FILE),
+                os.path.join(self.export_best_path, VEC_NORMALIZE_FILE),
+            )
+        copy_file_atomic(
+            os.path.join(checkpoint, MODEL_FILE),
+            os.path.join(self.export_best_path, "best_model.zip"),
+        )
+
+    def _best(self) -> Optional[int]:
+        best_file = os.path.join(self.path, BEST_FILE)
+        if not os.path.isfile(best_file):
+            return None
+        with open(best_file, "r", encoding="utf-8") as source:
+            return json.load(source)["timesteps"]
+
+    def _prune(self):
+        if self.keep_last is None:
+            return
+
+        checkpoints = CheckpointManager.checkpoints(self.path)
+        keep = set(checkpoints[-self.keep_last :] if self.keep_last > 0 else [])
+        keep.add(self._best())
+
+        for timesteps in checkpoints:
+            if timesteps not in keep:
+                shutil.rmtree(
+                    CheckpointManager.checkpoint_path(self.path, timesteps),
+                    ignore_errors=True,
+                )
+
+
+class SaveCheckpoint(BaseCallback):
+    """
+    Saves a checkpoint every save_freq steps and at the end of the training,
+    then waits for all checkpoints to be written.
+    """
+
+    def __init__(self, manager: CheckpointManager, save_freq: int, verbose: int = 0):
+        super(SaveCheckpoint, self).__init__(verbose=verbose)
+        self.manager = manager
+        self.save_freq = save_freq
+
+    def _on_step(self) -> bool:
+        if self.save_freq > 0 and self.n_calls % self.save_freq == 0:
+            self.manager.save(self.model, self.num_timesteps)
+        return True
+
+    def _on_training_end(self) -> None:
+        self.manager.save(self.model, self.num_timesteps)
+        self.manager.wait()
+
+
+class SaveBestCheckpoint(BaseCallback):
+    """
+    callback_on_new_best of an EvalCallback (with best_model_save_path None),
+    saves the new best model through the manager instead of on the training
+    thread and calls callback (e.g. `StopTrainingOnRewardThreshold`) as the
+    EvalCallback would.
+    """
+
+    def __init__(
+        self,
+        manager: CheckpointManager,
+        callback: Optional[BaseCallback] = None,
+        verbose: int = 0,
+    ):
+        super(SaveBestCheckpoint, self).__init__(verbose=verbose)
+        self.manager = manager
+        self.callback = callback
+
+    def _init_callback(self) -> None:
+        if self.callback is not None:
+            self.callback.init_callback(self.model)
+
+    def _on_step(self) -> bool:
+        self.manager.save(self.model, self.num_timesteps, best=True)
+
+        if self.callback is None:
+            return True
+        # evaluation results are read from the EvalCallback
+        self.callback.parent = self.parent
+        return self.callback.on_step()
@@ -3,6 +3,7 @@ import rospy
 import os
 
 from datetime import datetime as dt
+from typing import List
 
 
 class TRAINING_CONSTANTS(object):
@@ -25,12 +26,21 @@ class TRAINING_CONSTANTS(object):
         MODEL = lambda agent_name: os.path.join(
             rospkg.RosPack().get_path("rosnav"), "agents", agent_name
         )
+        CHECKPOINTS = lambda agent_name: os.path.join(
+            TRAINING_CONSTANTS.PATHS.MODEL(agent_name), "checkpoints"
+        )
         TENSORBOARD = lambda agent_name: os.path.join(
             TRAINING_CONSTANTS.PATHS.MAIN, "training_logs", "tensorboard", agent_name
         )
         EVAL = lambda agent_name: os.path.join(
             TRAINING_CONSTANTS.PATHS.MAIN, "training_logs", "train_eval_log", agent_name
         )
+        TRAJECTORIES = lambda agent_name: os.path.join(
+            TRAINING_CONSTANTS.PATHS.MAIN, "training_logs", "trajectories", agent_name
+        )
+        ASYNC_EVAL = lambda agent_name: os.path.join(
+            TRAINING_CONSTANTS.PATHS.MAIN, "training_logs", "async_eval", agent_name
+        )
         ROBOT_SETTING = lambda robot_model: os.path.join(
             TRAINING_CONSTANTS.PATHS.SIMULATION_SETUP,
             "robot",
@@ -58,3 +68,26 @@ class TRAINING_CONSTANTS(object):
         encoder_name = rospy.get_param("space_encoder", "RobotSpecificEncoder")
         agent_name = f"{robot_model}_{architecture_name}_{encoder_name}_{START_TIME}"
         return agent_name
+
+    @staticmethod
+    def n_eval_envs(config: dict) -> int:
+        """
+        Number of evaluation simulations, num_eval_envs of start_training.launch.
+        callbacks/periodic_eval/n_eval_envs of older training configs has to match it.
+        """
+        n_eval_envs = int(rospy.get_param("/num_eval_envs", 1))
+        configured = config["callbacks"]["periodic_eval"].get("n_eval_envs")
+        if configured is not None and int(configured) != n_eval_envs:
+            raise ValueError(
+                f"callbacks/periodic_eval/n_eval_envs is {configured} but {n_eval_envs} "
+                "eval simulations are launched (num_eval_envs of start_training.launch), "
+                "remove it from the training config"
+            )
+        return n_eval_envs
+
+    @staticmethod
+    def eval_namespaces(n_eval_envs: int) -> List[str]:
+        """Namespaces of the evaluation simulations, see start_training.launch"""
+        if n_eval_envs == 1:
+            return ["eval_sim"]
+        return [f"eval_sim_{i + 1}" for i in range(n_eval_envs)]
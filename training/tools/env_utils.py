@@ -1,4 +1,4 @@
-from typing import Union, Tuple
+from typing import Optional, Union, Tuple
 
 import gym
 import os
@@ -18,6 +18,11 @@ from stable_baselines3.common.vec_env.base_vec_env import VecEnv
 #     FlatlandEnv,
 # )
 from rl_utils.envs.flatland_gymnasium_env import FlatlandEnv
+from rl_utils.envs.flatland_vec_env import FlatlandVecEnv
+from rl_utils.envs.trajectory_recorder import TrajectoryRecorder
+
+from .checkpoint_manager import VEC_NORMALIZE_FILE, CheckpointManager
+from .constants import TRAINING_CONSTANTS
 
 
 def make_envs(
@@ -27,16 +32,18 @@ def make_envs(
     seed: int = 0,
     PATHS: dict = None,
     train: bool = True,
+    init_node: bool = True,
 ):
     """
     Utility function for multiprocessed env
 
     :param with_ns: (bool) if the system was initialized with namespaces
-    :param rank: (int) index of the subprocess
+    :param rank: (int) index of the subprocess, or of the eval simulation for eval envs
     :param config: (dict) hyperparameters of agent to be trained
     :param seed: (int) the inital seed for RNG
     :param PATHS: (dict) script relevant paths
     :param train: (bool) to differentiate between train and eval env
+    :param init_node: (bool) whether the env starts its own ros node
     :param args: (Namespace) program arguments
     :return: (Callable)
     """
@@ -44,7 +51,6 @@ def make_envs(
     def _init() -> Union[gym.Env, gym.Wrapper]:
         robot_model = rospy.get_param("model")
         train_ns = f"sim_{rank + 1}/{robot_model}" if with_ns else ""
-        eval_ns = f"eval_sim/{robot_model}" if with_ns else ""
 
         curriculum_config = config["callbacks"]["training_curriculum"]
         log_config = config["monitoring"]["cmd_line_logging"]
@@ -59,9 +65,20 @@ def make_envs(
                 log_last_n_eps=log_config["episode_statistics"]["last_n_eps"],
                 starting_stage=curriculum_config["curr_stage"],
                 curriculum_path=PATHS["curriculum"],
+                init_node=init_node,
             )
+            if PATHS.get("trajectories"):
+                env = TrajectoryRecorder(
+                    env, TrajectoryRecorder.directory(PATHS["trajectories"], train_ns)
+                )
         else:
             # eval env
+            n_eval_envs = TRAINING_CONSTANTS.n_eval_envs(config)
+            eval_ns = (
+                f"{TRAINING_CONSTANTS.eval_namespaces(n_eval_envs)[rank]}/{robot_model}"
+                if with_ns
+                else ""
+            )
             env = Monitor(
                 FlatlandEnv(
                     ns=eval_ns,
@@ -73,8 +90,12 @@ def make_envs(
                     log_last_n_eps=log_config["episode_statistics"]["last_n_eps"],
                     starting_stage=curriculum_config["curr_stage"],
                     curriculum_path=PATHS["curriculum"],
+                    init_node=init_node,
                 ),
-                PATHS["eval"],
+                # one monitor file per eval simulation
+                os.path.join(PATHS["eval"], str(rank))
+                if PATHS["eval"] and n_eval_envs > 1
+                else PATHS["eval"],
                 info_keywords=("done_reason", "is_success"),
             )
         # env.seed(seed + rank)
@@ -84,41 +105,102 @@ def make_envs(
     return _init
 
 
-def load_vec_normalize(config: dict, PATHS: dict, env: VecEnv, eval_env: VecEnv):
+def load_vec_normalize(
+    config: dict, PATHS: dict, env: VecEnv, eval_env: Optional[VecEnv]
+):
+    """eval_env is None when evaluating asynchronously (see `AsyncEvalCallback`)"""
     if config["rl_agent"]["normalize"]["enabled"]:
-        load_path = os.path.join(PATHS["model"], "vec_normalize.pkl")
+        # statistics of the newest checkpoint, the model is resumed from (see load_model)
+        checkpoint = CheckpointManager.newest(PATHS.get("checkpoints"))
+        load_path = (
+            os.path.join(checkpoint, VEC_NORMALIZE_FILE)
+            if checkpoint is not None
+            else os.path.join(PATHS["model"], "vec_normalize.pkl")
+        )
         if os.path.isfile(load_path):
             env = VecNormalize.load(load_path=load_path, venv=env)
-            eval_env = VecNormalize.load(load_path=load_path, venv=eval_env)
+            if eval_env is not None:
+                eval_env = VecNormalize.load(load_path=load_path, venv=eval_env)
             print("Succesfully loaded VecNormalize object from pickle file..")
         elif not config["rl_agent"]["resume"]:
             # New agent so init new VecNormalize object
             normalization_conf = config["rl_agent"]["normalize"]["settings"]
             env = VecNormalize(env, training=True, **normalization_conf)
-            eval_env = VecNormalize(eval_env, training=False, **normalization_conf)
+            if eval_env is not None:
+                eval_env = VecNormalize(
+                    eval_env, training=False, **normalization_conf
+                )
         else:
             raise ValueError("No VecNormalize object found..")
     return env, eval_env
 
 
-def load_vec_framestack(config: dict, env: VecEnv, eval_env: VecEnv):
+def wrap_vec_framestack(config: dict, env: VecEnv) -> VecEnv:
     fs_cfg = config["rl_agent"]["frame_stacking"]
     if fs_cfg["enabled"]:
         env = VecFrameStack(env, n_stack=fs_cfg["stack_size"], channels_order="first")
-        eval_env = VecFrameStack(
-            eval_env, n_stack=fs_cfg["stack_size"], channels_order="first"
-        )
+    return env
+
+
+def load_vec_framestack(config: dict, env: VecEnv, eval_env: Optional[VecEnv]):
+    env = wrap_vec_framestack(config, env)
+    if eval_env is not None:
+        eval_env = wrap_vec_framestack(config, eval_env)
     return env, eval_env
 
 
+def make_eval_env(
+    config: dict, paths: dict, ns_for_nodes: bool, init_node: bool
+) -> VecEnv:
+    """
+    One env per eval simulation, evaluation episodes are distributed across
+    them. Several eval simulations are stepped concurrently from this process.
+    """
+    n_eval_envs = TRAINING_CONSTANTS.n_eval_envs(config)
+    eval_env_fns = [
+        make_envs(
+            ns_for_nodes,
+            i,
+            config=config,
+            PATHS=paths,
+            train=False,
+            init_node=init_node and n_eval_envs == 1,
+        )
+        for i in range(n_eval_envs)
+    ]
+    return (
+        FlatlandVecEnv(eval_env_fns) if n_eval_envs > 1 else DummyVecEnv(eval_env_fns)
+    )
+
+
 def init_envs(
     config: dict,
     paths: dict,
     ns_for_nodes: bool,
-) -> Tuple[VecEnv, VecEnv]:
+) -> Tuple[VecEnv, Optional[VecEnv]]:
     # instantiate train environment
     # when debug run on one process only
-    if not config["debug_mode"] and ns_for_nodes:
+    # all envs share the node of the training process
+    single_process = (
+        not config["debug_mode"]
+        and ns_for_nodes
+        and config.get("vec_env", "subproc") == "flatland"
+    )
+
+    if single_process:
+        train_env = FlatlandVecEnv(
+            [
+                make_envs(
+                    ns_for_nodes,
+                    i,
+                    config=config,
+                    PATHS=paths,
+                    init_node=False,
+                )
+                for i in range(config["n_envs"])
+            ]
+        )
+    elif not config["debug_mode"] and ns_for_nodes:
         train_env = SubprocVecEnv(
             [
                 make_envs(
@@ -145,18 +227,17 @@ def init_envs(
         )
 
     # instantiate eval environment
-    # take task_manager from first sim (currently evaluation only provided for single process)
-    if ns_for_nodes:
-        eval_env = DummyVecEnv(
-            [
-                make_envs(
-                    ns_for_nodes,
-                    0,
-                    config=config,
-                    PATHS=paths,
-                    train=False,
-                )
-            ]
+    # evaluated asynchronously, the evaluator process owns the eval simulations
+    if config["callbacks"]["periodic_eval"].get("asynchronous", False):
+        if not ns_for_nodes:
+            raise ValueError(
+                "Asynchronous evaluation needs its own eval simulation, "
+                "launch the training with namespaces"
+            )
+        eval_env = None
+    elif ns_for_nodes:
+        eval_env = make_eval_env(
+            config, paths, ns_for_nodes, init_node=not single_process
         )
     else:
         eval_env = train_env
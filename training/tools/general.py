@@ -1,14 +1,12 @@
 import os
 import random
 import string
-import time
-import warnings
-from typing import Tuple
+from typing import Sequence, Tuple
 
 import numpy as np
-import rosnode
 import rospy
 import yaml
+from rl_utils.utils.readiness import wait_for_namespaces
 
 from .model_utils import check_batch_size
 from .constants import TRAINING_CONSTANTS
@@ -82,8 +80,11 @@ def get_paths(config: dict) -> dict:
     BASE_PATHS = TRAINING_CONSTANTS.PATHS
     PATHS = {
         "model": BASE_PATHS.MODEL(agent_name),
+        "checkpoints": BASE_PATHS.CHECKPOINTS(agent_name),
         "tb": BASE_PATHS.TENSORBOARD(agent_name),
         "eval": BASE_PATHS.EVAL(agent_name),
+        "trajectories": BASE_PATHS.TRAJECTORIES(agent_name),
+        "async_eval": BASE_PATHS.ASYNC_EVAL(agent_name),
         "robot_setting": BASE_PATHS.ROBOT_SETTING(rospy.get_param("robot_model")),
         "config": BASE_PATHS.AGENT_CONFIG(agent_name),
         "curriculum": BASE_PATHS.CURRICULUM(
@@ -107,6 +108,17 @@ def get_paths(config: dict) -> dict:
             os.makedirs(PATHS["eval"])
     else:
         PATHS["eval"] = None
+    # trajectory recording enabled
+    if config["monitoring"]["record_trajectories"] and not config["debug_mode"]:
+        if not os.path.exists(PATHS["trajectories"]):
+            os.makedirs(PATHS["trajectories"])
+    else:
+        PATHS["trajectories"] = None
+    # checkpoints and results of the asynchronous evaluation
+    if config["callbacks"]["periodic_eval"].get("asynchronous", False):
+        os.makedirs(PATHS["async_eval"], exist_ok=True)
+    else:
+        PATHS["async_eval"] = None
     # tensorboard log enabled
     if config["monitoring"]["use_wandb"] and not config["debug_mode"]:
         if not os.path.exists(PATHS["tb"]):
@@ -118,15 +130,20 @@ def get_paths(config: dict) -> dict:
 
 
 def wait_for_nodes(
-    with_ns: bool, n_envs: int, timeout: int = 30, nodes_per_ns: int = 3
+    with_ns: bool,
+    n_envs: int,
+    timeout: int = 30,
+    nodes_per_ns: int = 3,
+    services: Sequence[str] = (),
 ) -> None:
     """
-    Checks for timeout seconds if all nodes to corresponding namespace are online.
+    Waits in parallel until all nodes and services of every namespace are online.
 
     :param with_ns: (bool) if the system was initialized with namespaces
     :param n_envs: (int) number of virtual environments
-    :param timeout: (int) seconds to wait for each ns
+    :param timeout: (int) seconds to wait for all ns
     :param nodes_per_ns: (int) usual number of nodes per ns
+    :param services: (Sequence[str]) services every ns has to advertise, relative to the ns
     """
     if with_ns:
         assert (
@@ -137,23 +154,16 @@ def wait_for_nodes(
             not with_ns and n_envs == 1
         ), "Simulation setup isn't compatible with the given number of envs"
 
-    for i in range(n_envs):
-        for k in range(timeout):
-            ns = f"sim_{str(i + 1)}" if with_ns else ""
-            namespaces = rosnode.get_node_names(namespace=ns)
-
-            if len(namespaces) >= nodes_per_ns:
-                break
+    namespaces = [f"sim_{str(i + 1)}" if with_ns else "" for i in range(n_envs)]
 
-            warnings.warn(
-                f"Check if all simulation parts of namespace '{ns}' are running properly"
-            )
-            warnings.warn("Trying to connect again..")
-            assert (
-                k < timeout - 1
-            ), f"Timeout while trying to connect to nodes of '{ns}'"
+    results = wait_for_namespaces(
+        namespaces, timeout=timeout, services=services, min_nodes=nodes_per_ns
+    )
 
-            time.sleep(1)
+    print(
+        f"All {len(results)} namespaces ready after "
+        f"{max(result.elapsed for result in results):.1f}s"
+    )
 
 
 def load_config(config_name: str) -> dict:
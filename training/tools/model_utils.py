@@ -1,6 +1,6 @@
 import os
 import sys
-from typing import Union, Type
+from typing import Optional, Union, Type
 
 import wandb
 from sb3_contrib import RecurrentPPO
@@ -14,9 +14,20 @@ from stable_baselines3.common.vec_env.base_vec_env import VecEnv
 from stable_baselines3.common.utils import configure_logger
 
 from rosnav.model.base_agent import BaseAgent
+from tools.async_eval import AsyncEvalCallback
+from tools.checkpoint_manager import (
+    MODEL_FILE,
+    CheckpointManager,
+    SaveBestCheckpoint,
+)
+from tools.constants import TRAINING_CONSTANTS
 from tools.staged_train_callback import InitiateNewTrainStage
 
 
+# model classes by the name stored in checkpoints
+ALGORITHMS = {"PPO": PPO, "RecurrentPPO": RecurrentPPO}
+
+
 def setup_wandb(config: dict, agent: PPO) -> None:
     wandb.login(key="58b5a2040f5cc9d5c3a7d6102877515716298192")
     wandb.init(
@@ -180,8 +191,17 @@ sys.modules["rl_utils.rl_utils.utils"] = sys.modules["rosnav.utils"]
 def load_model(config: dict, train_env: VecEnv, PATHS: dict) -> PPO:
     agent_name = config["agent_name"]
     possible_agent_names = [f"{agent_name}", "best_model", "model"]
+    model = None
+
+    # resume from the newest checkpoint, its VecNormalize statistics are loaded in load_vec_normalize
+    checkpoint = CheckpointManager.newest(PATHS.get("checkpoints"))
+    if checkpoint is not None:
+        model = ALGORITHMS[CheckpointManager.algorithm(checkpoint)].load(
+            os.path.join(checkpoint, MODEL_FILE), train_env
+        )
+        print(f"Resuming from checkpoint {checkpoint}")
 
-    for name in possible_agent_names:
+    for name in possible_agent_names if model is None else []:
         if os.path.isfile(os.path.join(PATHS["model"], f"{name}.zip")):
             model = PPO.load(os.path.join(PATHS["model"], name), train_env)
             break
@@ -198,7 +218,11 @@ def load_model(config: dict, train_env: VecEnv, PATHS: dict) -> PPO:
 
 
 def init_callbacks(
-    config: dict, train_env: VecEnv, eval_env: VecEnv, paths
+    config: dict,
+    train_env: VecEnv,
+    eval_env: Optional[VecEnv],
+    paths,
+    checkpoint_manager: Optional[CheckpointManager] = None,
 ) -> EvalCallback:
     # threshold settings for training curriculum
     # type can be either 'succ' or 'rew'
@@ -212,6 +236,9 @@ def init_callbacks(
         upper_threshold=curriculum_cfg["upper_threshold"],
         lower_threshold=curriculum_cfg["lower_threshold"],
         task_mode=config["task_mode"],
+        eval_namespaces=TRAINING_CONSTANTS.eval_namespaces(
+            TRAINING_CONSTANTS.n_eval_envs(config)
+        ),
         verbose=1,
     )
 
@@ -225,16 +252,40 @@ def init_callbacks(
     # evaluation settings
     # n_eval_episodes: number of episodes to evaluate agent on
     # eval_freq: evaluate the agent every eval_freq train timesteps
+    if periodic_eval_cfg.get("asynchronous", False):
+        # checkpoints are evaluated by a separate evaluator process
+        return AsyncEvalCallback(
+            train_env=train_env,
+            async_eval_path=paths["async_eval"],
+            config=config,
+            paths=paths,
+            checkpoint_manager=checkpoint_manager,
+            n_eval_episodes=periodic_eval_cfg["n_eval_episodes"],
+            eval_freq=periodic_eval_cfg["eval_freq"],
+            log_path=paths["eval"],
+            best_model_save_path=None
+            if config["debug_mode"] or checkpoint_manager is not None
+            else paths["model"],
+            deterministic=True,
+            callback_on_eval_end=trainstage_cb,
+            callback_on_new_best=stoptraining_cb,
+        )
+
+    # the best model is saved in the background by the checkpoint manager
     eval_cb = EvalCallback(
         eval_env=eval_env,
         train_env=train_env,
         n_eval_episodes=periodic_eval_cfg["n_eval_episodes"],
         eval_freq=periodic_eval_cfg["eval_freq"],
         log_path=paths["eval"],
-        best_model_save_path=None if config["debug_mode"] else paths["model"],
+        best_model_save_path=None
+        if config["debug_mode"] or checkpoint_manager is not None
+        else paths["model"],
         deterministic=True,
         callback_on_eval_end=trainstage_cb,
-        callback_on_new_best=stoptraining_cb,
+        callback_on_new_best=stoptraining_cb
+        if checkpoint_manager is None
+        else SaveBestCheckpoint(checkpoint_manager, callback=stoptraining_cb),
     )
 
     return eval_cb
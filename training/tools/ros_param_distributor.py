@@ -41,6 +41,10 @@ def populate_laser_params(params: dict):
         rospy.set_param(
             "laser/full_range_laser", params["rl_agent"]["laser"]["full_range_laser"]
         )
+    with contextlib.suppress(KeyError):
+        rospy.set_param(
+            "laser/raw_subscription", params["rl_agent"]["laser"]["raw_subscription"]
+        )
     with contextlib.suppress(KeyError):
         rospy.set_param(
             "laser/reduced_num_laser_beams",
@@ -96,6 +100,9 @@ def determine_space_encoder(frame_stacking: bool, reduced_laser: bool):
 
 def populate_ros_configs(config):
     rospy.set_param("debug_mode", config["debug_mode"])
+    rospy.set_param(
+        "profile_steps", config["monitoring"].get("profile_steps", False)
+    )
 
 
 def set_space_encoder(config):
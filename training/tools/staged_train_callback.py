@@ -3,7 +3,7 @@ import rospy
 import numpy as np
 import time
 
-from typing import List
+from typing import List, Sequence
 from std_msgs.msg import Bool
 from stable_baselines3.common.callbacks import BaseCallback, EvalCallback
 
@@ -17,6 +17,7 @@ class InitiateNewTrainStage(BaseCallback):
     :param rew_threshold (int): mean reward threshold to trigger new stage
     :param succ_rate_threshold (float): threshold percentage of succesful episodes to trigger new stage
     :param task_mode (str): training task mode, if not 'staged' callback won't be called
+    :param eval_namespaces (Sequence[str]): namespaces of the evaluation simulations
     :param verbose:
     """
 
@@ -27,10 +28,12 @@ class InitiateNewTrainStage(BaseCallback):
         upper_threshold: float = 0,
         lower_threshold: float = 0,
         task_mode: str = "staged",
+        eval_namespaces: Sequence[str] = ("eval_sim",),
         verbose=0,
     ):
         super(InitiateNewTrainStage, self).__init__(verbose=verbose)
         self.n_envs = n_envs
+        self.eval_namespaces = eval_namespaces
         self.threshhold_type = treshhold_type
 
         assert self.threshhold_type in {
@@ -74,12 +77,13 @@ class InitiateNewTrainStage(BaseCallback):
         self._publishers_next = []
         self._publishers_previous = []
 
-        self._publishers_next.append(
-            rospy.Publisher(f"/eval_sim/next_stage", Bool, queue_size=1)
-        )
-        self._publishers_previous.append(
-            rospy.Publisher(f"/eval_sim/previous_stage", Bool, queue_size=1)
-        )
+        for eval_ns in self.eval_namespaces:
+            self._publishers_next.append(
+                rospy.Publisher(f"/{eval_ns}/next_stage", Bool, queue_size=1)
+            )
+            self._publishers_previous.append(
+                rospy.Publisher(f"/{eval_ns}/previous_stage", Bool, queue_size=1)
+            )
 
         for env_num in range(self.n_envs):
             self._publishers_next.append(
@@ -0,0 +1,27 @@
+import math
+
+from stable_baselines3.common.callbacks import BaseCallback
+
+
+class LogStepProfile(BaseCallback):
+    """
+    Logs the step phase timings `FlatlandEnv` reports in the info of the
+    last step of an episode (enabled with the "profile_steps" param).
+    Values are averaged over all episodes ending between two logger dumps
+    and written to the logger (and thereby tensorboard) as
+    "step_times/<phase>/<statistic>" in milliseconds.
+    """
+
+    def _on_step(self) -> bool:
+        for info in self.locals["infos"]:
+            step_times = info.get("step_times")
+
+            if step_times is None:
+                continue
+
+            for key, seconds in step_times.items():
+                # percentiles in the unbounded bin are reported as inf
+                if math.isfinite(seconds):
+                    self.logger.record_mean(f"step_times/{key}", seconds * 1000)
+
+        return True
@@ -41,9 +41,10 @@ def get_rosnav_configs(cfg: dict) -> dict:
 
 def delete_distance_map():
     # delete the distance map if it exists
-    distance_map_path = ROSNAV_MAP_FOLDER / MAP_FOLDER_NAME / "distance_map.png"
-    if os.path.exists(distance_map_path):
-        os.remove(distance_map_path)
+    for file_name in ("distance_map.bin", "distance_map.png"):
+        distance_map_path = ROSNAV_MAP_FOLDER / MAP_FOLDER_NAME / file_name
+        if os.path.exists(distance_map_path):
+            os.remove(distance_map_path)
 
 
 def load_map_generator_config() -> dict:
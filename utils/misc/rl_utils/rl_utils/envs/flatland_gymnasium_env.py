@@ -2,7 +2,7 @@
 import math
 import os
 import time
-from typing import Tuple
+from typing import Optional, Tuple
 
 import gymnasium
 import numpy as np
@@ -18,25 +18,14 @@ from task_generator.tasks.base_task import BaseTask
 from task_generator.utils import rosparam_get
 
 # from ..utils.old_observation_collector import ObservationCollector
+from rl_utils.utils.observation_collector.constants import MAX_WAIT
 from rl_utils.utils.observation_collector.observation_manager import ObservationManager
+from rl_utils.utils.observation_collector.sim_clock import SimClock
+from rl_utils.utils.readiness import wait_for_namespace
+from rl_utils.utils.step_profiler import StepProfiler
 from rl_utils.utils.rewards.reward_function import RewardFunction
 
 
-def delay_node_init(ns):
-    try:
-        # given every environment enough time to initialize, if we dont put sleep,
-        # the training script may crash.
-        import re
-
-        ns_int = int(re.search(r"\d+", ns)[0])
-        time.sleep((ns_int + 1) * 2)
-    except Exception:
-        rospy.logwarn(
-            "Can't not determinate the number of the environment, training script may crash!"
-        )
-        time.sleep(2)
-
-
 class FlatlandEnv(gymnasium.Env):
     """Custom Environment that follows gym interface"""
 
@@ -49,6 +38,7 @@ class FlatlandEnv(gymnasium.Env):
         max_steps_per_episode=100,
         verbose: bool = True,
         log_last_n_eps: int = 20,
+        init_node: bool = True,
         *args,
         **kwargs,
     ):
@@ -63,17 +53,25 @@ class FlatlandEnv(gymnasium.Env):
             safe_dist (float, optional): [description]. Defaults to None.
             goal_radius (float, optional): [description]. Defaults to 0.1.
             extended_eval (bool): more episode info provided, no reset when crashing
+            init_node (bool): start a ros node for this env, disable if the process already runs one (e.g. `FlatlandVecEnv`)
         """
         super(FlatlandEnv, self).__init__()
 
         self.ns = Namespace(ns)
 
-        delay_node_init(ns=self.ns.simulation_ns)
+        self._is_train_mode = rospy.get_param("/train_mode")
 
-        if not rospy.get_param("/debug_mode", True):
-            rospy.init_node("env_" + self.ns, anonymous=True)
+        # wait until the simulation of this env is up instead of guessing a delay
+        readiness = wait_for_namespace(
+            self.ns.simulation_ns,
+            timeout=rospy.get_param("/env_init_timeout", 60),
+            services=["step_world"] if self._is_train_mode else [],
+        )
+        if not readiness.ready:
+            raise TimeoutError(f"Simulation not ready: {readiness}")
 
-        self._is_train_mode = rospy.get_param("/train_mode")
+        if init_node and not rospy.get_param("/debug_mode", True):
+            rospy.init_node("env_" + self.ns, anonymous=True)
         self.model_space_encoder = RosnavSpaceManager()
 
         # observation collector
@@ -116,6 +114,16 @@ class FlatlandEnv(gymnasium.Env):
                 self._service_name_step, Empty, persistent=True
             )
 
+        # synchronous observations: wait for sensor data of the completed step
+        self._sim_clock: Optional[SimClock] = None
+        if self._is_train_mode and rospy.get_param("/sync_observations", False):
+            self._sim_clock = SimClock(self.ns.simulation_ns("clock"))
+
+        # per phase step timings, reported in the info of the last episode step
+        self._profiler: Optional[StepProfiler] = None
+        if rospy.get_param("/profile_steps", False):
+            self._profiler = StepProfiler()
+
         self._verbose = verbose
         self._log_last_n_eps = log_last_n_eps
 
@@ -124,6 +132,10 @@ class FlatlandEnv(gymnasium.Env):
         self._max_steps_per_episode = max_steps_per_episode
         self._last_action = np.array([0, 0, 0])  # linear x, linear y, angular z
 
+        # raw data of the last step, e.g. for `TrajectoryRecorder`
+        self.last_obs_dict: Optional[dict] = None
+        self.last_reward_info: Optional[dict] = None
+
         # for extended eval
         self._action_frequency = 1 / rospy.get_param("/robot_action_rate", 10)
         self._last_robot_pose = None
@@ -162,23 +174,42 @@ class FlatlandEnv(gymnasium.Env):
         """
 
         start_time = time.time()
+        profiler = self._profiler
+
+        if profiler:
+            profiler.start()
 
         decoded_action = self.model_space_encoder.decode_action(action)
+        if profiler:
+            profiler.lap("decode_action")
+
         self._pub_action(decoded_action)
+        if profiler:
+            profiler.lap("publish_action")
 
+        min_stamp = None
         if self._is_train_mode:
-            self.call_service_takeSimStep()
+            min_stamp = self.call_service_takeSimStep()
+            if profiler:
+                profiler.lap("step_world")
 
         obs_dict = self.observation_collector.get_observations(
-            last_action=self._last_action
+            last_action=self._last_action, min_stamp=min_stamp
         )
         self._last_action = decoded_action
+        if profiler:
+            profiler.lap("observations")
 
         # calculate reward
         reward, reward_info = self.reward_calculator.get_reward(
             action=decoded_action,
             **obs_dict,
         )
+        if profiler:
+            profiler.lap("reward")
+
+        self.last_obs_dict = obs_dict
+        self.last_reward_info = reward_info
 
         self.update_statistics(reward=reward)
 
@@ -197,26 +228,51 @@ class FlatlandEnv(gymnasium.Env):
             if sum(self._done_hist) >= self._log_last_n_eps:
                 self.print_statistics()
 
+        encoded_obs = self.model_space_encoder.encode_observation(
+            obs_dict, ["laser_scan", "goal_in_robot_frame", "last_action"]
+        )
+        if profiler:
+            profiler.lap("encode_observation")
+
+            if done:
+                info["step_times"] = profiler.pop_summary()
+
         self.step_time[0] += time.time() - start_time
 
         return (
-            self.model_space_encoder.encode_observation(
-                obs_dict, ["laser_scan", "goal_in_robot_frame", "last_action"]
-            ),
+            encoded_obs,
             reward,
             done,
             False,
             info,
         )
 
-    def call_service_takeSimStep(self, t=None):
+    def call_service_takeSimStep(self, t=None) -> Optional[rospy.Time]:
+        """
+        Steps the simulation.
+        Returns: simulation time of the completed step in synchronous mode, else None
+        """
         # request = StepWorld()
         # request.required_time = 0 if t == None else t
 
+        step_start = self._sim_clock.now if self._sim_clock is not None else None
+
         self._step_world_srv()
 
         # self._step_world_publisher.publish(request)
 
+        if self._sim_clock is None:
+            return None
+
+        step_time = self._sim_clock.wait_for_tick(after=step_start, timeout=MAX_WAIT)
+
+        if step_time is None:
+            rospy.logwarn(
+                f"[{self.ns}] simulation clock didn't advance, using latest observations"
+            )
+
+        return step_time
+
     def reset(self, seed=None, options=None):
         super().reset(seed=seed)
         # set task
@@ -224,7 +280,11 @@ class FlatlandEnv(gymnasium.Env):
         self._episode += 1
         self.agent_action_pub.publish(Twist())
 
-        first_map = self._episode <= 1 if "sim_1" in self.ns else False
+        first_map = (
+            self._episode <= 1
+            if "sim_1" in self.ns and not self.ns.startswith("eval_sim")
+            else False
+        )
         self.task.reset(
             callback=lambda: False,
             first_map=first_map,
@@ -234,10 +294,13 @@ class FlatlandEnv(gymnasium.Env):
         self._steps_curr_episode = 0
         self._last_action = np.array([0, 0, 0])
 
+        min_stamp = None
         if self._is_train_mode:
-            self.call_service_takeSimStep()
+            min_stamp = self.call_service_takeSimStep()
 
-        obs_dict = self.observation_collector.get_observations()
+        obs_dict = self.observation_collector.get_observations(min_stamp=min_stamp)
+        self.last_obs_dict = obs_dict
+        self.last_reward_info = None
         info_dict = {}
         return (
             self.model_space_encoder.encode_observation(
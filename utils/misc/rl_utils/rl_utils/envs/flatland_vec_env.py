@@ -0,0 +1,101 @@
+from concurrent.futures import ThreadPoolExecutor
+from copy import deepcopy
+from typing import Any, Callable, Dict, List, Tuple
+
+import gymnasium
+import numpy as np
+import rospy
+from stable_baselines3.common.vec_env import DummyVecEnv
+from stable_baselines3.common.vec_env.base_vec_env import VecEnvObs, VecEnvStepReturn
+
+from rl_utils.utils.readiness import MAX_CONCURRENCY
+
+
+class FlatlandVecEnv(DummyVecEnv):
+    """
+    Vectorized environment stepping all simulations from the training process.
+
+    Contrary to `SubprocVecEnv` all `FlatlandEnv`s share one ros node and
+    live in this process. The environments are stepped concurrently by a
+    thread pool, most of a step is spent waiting for the step_world service
+    and the sensor messages which releases the GIL. Observations are
+    gathered in the preallocated `(n_envs, ...)` buffers of `DummyVecEnv`,
+    so no observations or actions are pickled between processes.
+
+    The environments must be created without initializing their own node,
+    i.e. with `init_node=False`. They are initialized in parallel, at most
+    `MAX_CONCURRENCY` at a time.
+    """
+
+    def __init__(self, env_fns: List[Callable[[], gymnasium.Env]]):
+        if not rospy.get_param("/debug_mode", True) and not rospy.core.is_initialized():
+            rospy.init_node("vec_env", anonymous=True)
+
+        with ThreadPoolExecutor(max_workers=MAX_CONCURRENCY) as executor:
+            envs = list(executor.map(lambda env_fn: env_fn(), env_fns))
+
+        super().__init__([lambda env=env: env for env in envs])
+
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.num_envs, thread_name_prefix="flatland_vec_env"
+        )
+
+    def step_wait(self) -> VecEnvStepReturn:
+        results = list(
+            self._executor.map(self._step_env, range(self.num_envs), self.actions)
+        )
+
+        for env_idx, (obs, reward, done, info) in enumerate(results):
+            self.buf_rews[env_idx] = reward
+            self.buf_dones[env_idx] = done
+            self.buf_infos[env_idx] = info
+            self._save_obs(env_idx, obs)
+
+        return (
+            self._obs_from_buf(),
+            np.copy(self.buf_rews),
+            np.copy(self.buf_dones),
+            deepcopy(self.buf_infos),
+        )
+
+    def reset(self) -> VecEnvObs:
+        results = list(self._executor.map(self._reset_env, range(self.num_envs)))
+
+        for env_idx, (obs, reset_info) in enumerate(results):
+            self.reset_infos[env_idx] = reset_info
+            self._save_obs(env_idx, obs)
+
+        # seeds and options are only used once, as in `DummyVecEnv.reset`
+        self._reset_seeds()
+        self._reset_options()
+        return self._obs_from_buf()
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True)
+        super().close()
+
+    def _step_env(
+        self, env_idx: int, action: np.ndarray
+    ) -> Tuple[Any, float, bool, Dict[str, Any]]:
+        """
+        Steps a single environment and resets it when its episode is done,
+        like `DummyVecEnv.step_wait` does for every environment.
+        """
+        env = self.envs[env_idx]
+
+        obs, reward, terminated, truncated, info = env.step(action)
+
+        done = terminated or truncated
+        info["TimeLimit.truncated"] = truncated and not terminated
+
+        if done:
+            info["terminal_observation"] = obs
+            obs, self.reset_infos[env_idx] = env.reset()
+
+        return obs, reward, done, info
+
+    def _reset_env(self, env_idx: int) -> Tuple[Any, Dict[str, Any]]:
+        maybe_options = (
+            {"options": self._options[env_idx]} if self._options[env_idx] else {}
+        )
+        return self.envs[env_idx].reset(seed=self._seeds[env_idx], **maybe_options)
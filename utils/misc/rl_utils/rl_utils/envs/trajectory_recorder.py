@@ -0,0 +1,107 @@
+import os
+from typing import Any, Dict, Optional
+
+import gymnasium
+import numpy as np
+
+from rl_utils.envs.flatland_gymnasium_env import FlatlandEnv
+from rl_utils.utils.observation_collector.constants import OBS_DICT_KEYS
+from rl_utils.utils.trajectory_storage import OBS_PREFIX, TrajectoryWriter
+
+
+class TrajectoryRecorder(gymnasium.Wrapper):
+    """
+    Records every step of a `FlatlandEnv` into a `TrajectoryWriter`.
+
+    Each row holds the observation dict ("obs/<key>", poses as [x, y, theta]),
+    the decoded action, the reward, the reward info, the goal radius and the
+    episode and step index. The parameters of the reward function are stored
+    as metadata of the recording. The observation returned by `reset` is
+    recorded as step 0 with a NaN action, so the action of step t was taken
+    on the observation of step t - 1. Rows are converted and copied in the
+    step loop, writing them to disk happens in the writer thread. Read
+    recordings with `TrajectoryReader`.
+    """
+
+    def __init__(self, env: FlatlandEnv, path: str):
+        super().__init__(env)
+
+        reward_function = env.reward_calculator
+        self._writer = TrajectoryWriter(
+            path,
+            ragged_columns={OBS_PREFIX + OBS_DICT_KEYS.GLOBAL_PLAN: (2,)},
+            metadata={
+                "ns": str(env.ns),
+                "reward_fnc": reward_function._rew_func_name,
+                "robot_radius": reward_function.robot_radius,
+                "safe_dist": reward_function._safe_dist,
+                "max_steps_per_episode": env._max_steps_per_episode,
+            },
+        )
+        self._episode = 0
+        self._step = 0
+
+    @staticmethod
+    def directory(base_path: str, ns: str) -> str:
+        """Recording directory of the env in namespace ns."""
+        return os.path.join(base_path, ns.strip("/").replace("/", "_") or "env")
+
+    def reset(self, **kwargs):
+        obs, info = self.env.reset(**kwargs)
+
+        self._episode += 1
+        self._step = 0
+        self._record(action=None, reward=0.0, reward_info={}, done=False)
+
+        return obs, info
+
+    def step(self, action):
+        obs, reward, terminated, truncated, info = self.env.step(action)
+
+        self._step += 1
+        self._record(
+            action=self.unwrapped._last_action,
+            reward=reward,
+            reward_info=self.unwrapped.last_reward_info,
+            done=terminated or truncated,
+        )
+
+        return obs, reward, terminated, truncated, info
+
+    def close(self):
+        self._writer.close()
+        return self.env.close()
+
+    def _record(
+        self,
+        action: Optional[np.ndarray],
+        reward: float,
+        reward_info: Dict[str, Any],
+        done: bool,
+    ):
+        row = {
+            OBS_PREFIX + key: TrajectoryRecorder._to_array(value)
+            for key, value in self.unwrapped.last_obs_dict.items()
+        }
+        row.update(
+            {
+                "action": np.full(3, np.nan)
+                if action is None
+                else np.array(action, dtype=np.float64),
+                "reward": float(reward),
+                "reward_info": dict(reward_info),
+                "goal_radius": self.unwrapped.reward_calculator.goal_radius,
+                "done": done,
+                "episode": self._episode,
+                "step": self._step,
+            }
+        )
+
+        self._writer.append(row, commit=done)
+
+    @staticmethod
+    def _to_array(value: Any) -> np.ndarray:
+        # copies, the collector may reuse its buffers (e.g. raw laser scans)
+        if hasattr(value, "theta"):
+            return np.array([value.x, value.y, value.theta])
+        return np.array(value)
@@ -1,5 +1,6 @@
 MAX_WAIT = 2  # in seconds
-SLEEP = 0.2  # in seconds
+# interval for logging the wait time histograms
+WAIT_LOG_INTERVAL = 60  # in seconds
 
 
 class TOPICS:
@@ -1,5 +1,7 @@
-from time import sleep
-from typing import Any, Dict
+import logging
+import threading
+import time
+from typing import Any, Dict, Optional
 
 import numpy as np
 import rospy
@@ -8,10 +10,19 @@ from nav_msgs.msg import Odometry
 from sensor_msgs.msg import LaserScan
 from task_generator.shared import Namespace
 
-from ..constants import OBS_DICT_KEYS, TOPICS, MAX_WAIT, SLEEP
-from ..utils import false_params, get_goal_pose_in_robot_frame, pose3d_to_pose2d
+from ..constants import OBS_DICT_KEYS, TOPICS, MAX_WAIT, WAIT_LOG_INTERVAL
+from ..raw_laser import RawLaserScanBuffer
+from ..utils import (
+    WaitTimeHistogram,
+    false_params,
+    get_goal_pose_in_robot_frame,
+    pose3d_to_pose2d,
+)
 from .collector_unit import CollectorUnit
 
+# logger of rospy.logdebug, checked before the wait times are formatted
+_ROSOUT_LOGGER = logging.getLogger("rosout")
+
 
 class BaseCollectorUnit(CollectorUnit):
     _robot_state: Odometry
@@ -20,10 +31,28 @@ class BaseCollectorUnit(CollectorUnit):
     _full_range_laser: np.ndarray
     _subgoal: Pose2D
 
+    # signalled by the subscriber callbacks whenever a message arrived
+    _received: threading.Condition
+    # monotonic arrival time of the last message per topic
+    _arrival: Dict[str, float]
+    # header stamp of the last message per topic
+    _stamps: Dict[str, rospy.Time]
+    # stamp difference of the last two messages per topic
+    _periods: Dict[str, rospy.Duration]
+    # time `wait` spent waiting for each topic
+    _wait_times: Dict[str, WaitTimeHistogram]
+    # monotonic time the wait times were logged last
+    _last_wait_log: float
+
+    # topics required to be current in synchronous mode, see `wait`
+    SYNC_TOPICS = (TOPICS.LASER, TOPICS.ROBOT_STATE)
+
     def __init__(self, ns: Namespace, observation_manager) -> None:
         super().__init__(ns, observation_manager)
         self._laser_num_beams = rospy.get_param("laser/num_beams")
         self._enable_full_range_laser = rospy.get_param("laser/full_range_laser", False)
+        # read the scan ranges directly from the serialized messages
+        self._raw_laser_subscription = rospy.get_param("laser/raw_subscription", False)
 
         self._robot_state = Odometry()
         self._robot_pose = Pose2D()
@@ -31,6 +60,9 @@ class BaseCollectorUnit(CollectorUnit):
         self._full_range_laser = np.array([])
         self._subgoal = Pose2D()
 
+        self._raw_laser = RawLaserScanBuffer(self._laser_num_beams)
+        self._raw_full_range_laser = RawLaserScanBuffer(self._laser_num_beams)
+
         self._scan_sub: rospy.Subscriber = None
         self._full_scan_sub: rospy.Subscriber = None
         self._robot_state_sub: rospy.Subscriber = None
@@ -40,20 +72,47 @@ class BaseCollectorUnit(CollectorUnit):
         self._received_scan = False
         self._received_subgoal = False
 
+        self._received = threading.Condition()
+        self._arrival = {}
+        self._stamps = {}
+        self._periods = {}
+        self._wait_times = {
+            topic: WaitTimeHistogram()
+            for topic in (TOPICS.LASER, TOPICS.ROBOT_STATE, TOPICS.GOAL)
+        }
+        self._last_wait_log = float("-inf")
+
         self._first_reset = True
 
+    @property
+    def wait_times(self) -> Dict[str, WaitTimeHistogram]:
+        return self._wait_times
+
     def init_subs(self):
+        if self._raw_laser_subscription:
+            laser_type, cb_laser, cb_full_range_laser = (
+                rospy.AnyMsg,
+                self._cb_raw_laser,
+                self._cb_raw_full_range_laser,
+            )
+        else:
+            laser_type, cb_laser, cb_full_range_laser = (
+                LaserScan,
+                self._cb_laser,
+                self._cb_full_range_laser,
+            )
+
         self._scan_sub = rospy.Subscriber(
             self._ns(TOPICS.LASER),
-            LaserScan,
-            self._cb_laser,
+            laser_type,
+            cb_laser,
             tcp_nodelay=True,
         )
         if self._enable_full_range_laser:
             self._full_scan_sub = rospy.Subscriber(
                 self._ns(TOPICS.FULL_RANGE_LASER),
-                LaserScan,
-                self._cb_full_range_laser,
+                laser_type,
+                cb_full_range_laser,
                 tcp_nodelay=True,
             )
         self._robot_state_sub = rospy.Subscriber(
@@ -69,34 +128,120 @@ class BaseCollectorUnit(CollectorUnit):
             tcp_nodelay=True,
         )
 
-    def wait(self):
-        for _ in range(int(MAX_WAIT / SLEEP)):
-            if self._received_odom and self._received_scan and self._received_subgoal:
-                return
+    def wait(self, min_stamp: Optional[rospy.Time] = None):
+        """
+        Blocks until odometry, laser scan and subgoal have been received.
+        @min_stamp: if given, additionally waits until the messages of all
+            `SYNC_TOPICS` are current at min_stamp, e.g. the simulation time
+            of the last completed step, see `_is_current`
+        """
+        start = time.monotonic()
+
+        def ready() -> bool:
+            if not (
+                self._received_odom and self._received_scan and self._received_subgoal
+            ):
+                return False
+
+            return min_stamp is None or all(
+                self._is_current(topic, min_stamp)
+                for topic in BaseCollectorUnit.SYNC_TOPICS
+            )
+
+        with self._received:
+            received = self._received.wait_for(ready, timeout=MAX_WAIT)
+
+        end = time.monotonic()
+
+        for topic, histogram in self._wait_times.items():
+            # messages that arrived before the wait started cost nothing
+            histogram.add(
+                min(max(self._arrival.get(topic, end) - start, 0.0), end - start)
+            )
+
+        # formatted only when it is logged, wait runs on every step
+        if end - self._last_wait_log >= WAIT_LOG_INTERVAL and _ROSOUT_LOGGER.isEnabledFor(
+            logging.DEBUG
+        ):
+            self._last_wait_log = end
+            rospy.logdebug(
+                f"[{self._ns}] observation wait times: "
+                + ", ".join(
+                    f"{topic}: {histogram}"
+                    for topic, histogram in self._wait_times.items()
+                )
+            )
 
-            sleep(SLEEP)
+        if received:
+            return
 
         if self._first_reset:
             self._first_reset = False
             return
 
+        if min_stamp is not None:
+            stale = [
+                topic
+                for topic in BaseCollectorUnit.SYNC_TOPICS
+                if not self._is_current(topic, min_stamp)
+            ]
+            if stale:
+                raise TimeoutError(
+                    f"Couldn't retrieve data current at {min_stamp.to_sec()} for: {stale}"
+                )
+
         raise TimeoutError(
             f"Couldn't retrieve data for: {false_params(odom=self._received_odom, laser=self._received_scan, subgoal=self._received_subgoal)}"
         )
 
+    def _is_current(self, topic: str, min_stamp: rospy.Time) -> bool:
+        """
+        The last message of a topic is current if it is stamped at or after
+        min_stamp or if the next one isn't due yet at the rate the topic was
+        last published with. Topics published at a lower rate than the
+        simulation is stepped are only waited for on the steps they are due.
+        """
+        stamp = self._stamps.get(topic)
+
+        if stamp is None:
+            return False
+
+        if stamp >= min_stamp:
+            return True
+
+        period = self._periods.get(topic)
+
+        return period is not None and stamp + period > min_stamp
+
+    def _notify(self, topic: str, stamp: rospy.Time):
+        with self._received:
+            self._arrival[topic] = time.monotonic()
+
+            previous = self._stamps.get(topic)
+            if previous is not None and stamp > previous:
+                self._periods[topic] = stamp - previous
+
+            self._stamps[topic] = stamp
+            self._received.notify_all()
+
     def get_observations(
-        self, obs_dict: Dict[str, Any], *args, **kwargs
+        self,
+        obs_dict: Dict[str, Any],
+        *args,
+        min_stamp: Optional[rospy.Time] = None,
+        **kwargs,
     ) -> Dict[str, Any]:
         if not obs_dict:
             obs_dict = {}
 
-        self.wait()
+        self.wait(min_stamp=min_stamp)
 
         dist_to_goal, angle_to_goal = self._process_observations()
 
         obs_dict.update(
             {
-                OBS_DICT_KEYS.LASER: self._laser,
+                # the raw subscription reuses its buffers, see `RawLaserScanBuffer`
+                OBS_DICT_KEYS.LASER: self._laser.copy(),
                 OBS_DICT_KEYS.ROBOT_POSE: self._robot_pose,
                 OBS_DICT_KEYS.GOAL: (dist_to_goal, angle_to_goal),
                 OBS_DICT_KEYS.DISTANCE_TO_GOAL: dist_to_goal,
@@ -107,7 +252,7 @@ class BaseCollectorUnit(CollectorUnit):
         )
 
         if self._enable_full_range_laser:
-            obs_dict.update({"full_laser_scan": self._full_range_laser})
+            obs_dict.update({"full_laser_scan": self._full_range_laser.copy()})
 
         return obs_dict
 
@@ -121,10 +266,11 @@ class BaseCollectorUnit(CollectorUnit):
         )
 
     def _cb_laser(self, laser_msg: LaserScan):
-        self._received_scan = True
         self._laser = BaseCollectorUnit.process_laser_msg(
             laser_msg=laser_msg, laser_num_beams=self._laser_num_beams
         )
+        self._received_scan = True
+        self._notify(TOPICS.LASER, laser_msg.header.stamp)
 
     def _cb_full_range_laser(self, laser_msg: LaserScan):
         self._full_range_laser = BaseCollectorUnit.process_laser_msg(
@@ -132,14 +278,26 @@ class BaseCollectorUnit(CollectorUnit):
             laser_num_beams=self._laser_num_beams,
         )
 
+    def _cb_raw_laser(self, laser_msg: rospy.AnyMsg):
+        self._laser, secs, nsecs = self._raw_laser.read(laser_msg._buff)
+        self._received_scan = True
+        self._notify(TOPICS.LASER, rospy.Time(secs, nsecs))
+
+    def _cb_raw_full_range_laser(self, laser_msg: rospy.AnyMsg):
+        self._full_range_laser, _, _ = self._raw_full_range_laser.read(
+            laser_msg._buff
+        )
+
     def _cb_robot_state(self, robot_state_msg: Odometry):
-        self._received_odom = True
         self._robot_state = robot_state_msg
         self._robot_pose = pose3d_to_pose2d(self._robot_state.pose.pose)
+        self._received_odom = True
+        self._notify(TOPICS.ROBOT_STATE, robot_state_msg.header.stamp)
 
     def _cb_subgoal(self, subgoal_msg: PoseStamped):
-        self._received_subgoal = True
         self._subgoal = pose3d_to_pose2d(subgoal_msg.pose)
+        self._received_subgoal = True
+        self._notify(TOPICS.GOAL, subgoal_msg.header.stamp)
 
     @staticmethod
     def process_laser_msg(laser_msg: LaserScan, laser_num_beams: int) -> np.ndarray:
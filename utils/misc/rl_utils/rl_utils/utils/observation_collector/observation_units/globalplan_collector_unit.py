@@ -6,7 +6,7 @@ from nav_msgs.msg import Path
 from task_generator.shared import Namespace
 
 from ..constants import OBS_DICT_KEYS, TOPICS
-from ..utils import pose3d_to_pose2d
+from ..utils import downsample_by_arc_length
 from .collector_unit import CollectorUnit
 
 
@@ -19,6 +19,10 @@ class GlobalplanCollectorUnit(CollectorUnit):
         super().__init__(ns, observation_manager)
         self._globalplan = np.array([])
         self._globalplan_sub: rospy.Subscriber = None
+        # arc length between kept plan points in m, 0 keeps every point
+        self._downsample_distance = rospy.get_param(
+            "global_plan/downsample_distance", 0.0
+        )
 
     def init_subs(self):
         self._globalplan_sub = rospy.Subscriber(
@@ -33,15 +37,36 @@ class GlobalplanCollectorUnit(CollectorUnit):
 
     def _cb_globalplan(self, globalplan_msg: Path):
         self._globalplan = GlobalplanCollectorUnit.process_global_plan_msg(
-            globalplan_msg
+            globalplan_msg, downsample_distance=self._downsample_distance
         )
 
     @staticmethod
-    def process_global_plan_msg(globalplan_msg: Path) -> np.ndarray:
-        global_plan_2d = list(
-            map(
-                lambda p: pose3d_to_pose2d(p.pose),
-                globalplan_msg.poses,
-            )
-        )
-        return np.array(list(map(lambda p2d: [p2d.x, p2d.y], global_plan_2d)))
+    def process_global_plan_msg(
+        globalplan_msg: Path, downsample_distance: float = 0.0
+    ) -> np.ndarray:
+        """
+        Converts the poses of a path into an (n, 2) array of x and y,
+        orientations are skipped.
+        @downsample_distance: if > 0, only keeps points about this arc length apart
+        """
+        num_poses = len(globalplan_msg.poses)
+        if num_poses == 0:
+            return np.array([])
+
+        global_plan = np.fromiter(
+            (
+                coordinate
+                for pose_stamped in globalplan_msg.poses
+                for coordinate in (
+                    pose_stamped.pose.position.x,
+                    pose_stamped.pose.position.y,
+                )
+            ),
+            dtype=float,
+            count=2 * num_poses,
+        ).reshape(num_poses, 2)
+
+        if downsample_distance > 0:
+            global_plan = downsample_by_arc_length(global_plan, downsample_distance)
+
+        return global_plan
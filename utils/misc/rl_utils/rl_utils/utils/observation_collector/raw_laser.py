@@ -0,0 +1,78 @@
+import struct
+from typing import Tuple
+
+import numpy as np
+
+# seq, stamp.secs, stamp.nsecs, len(frame_id)
+_HEADER = struct.Struct("<IIII")
+# angle_min, angle_max, angle_increment, time_increment, scan_time, range_min, range_max, len(ranges)
+_SCAN = struct.Struct("<7fI")
+
+
+class RawLaserScanBuffer:
+    """
+    Reads the ranges of serialized `sensor_msgs/LaserScan` messages (e.g.
+    the `_buff` of a `rospy.AnyMsg`) without deserializing them into python
+    floats.
+
+    The ranges are viewed in the wire buffer with `np.frombuffer` and copied
+    into one of two preallocated arrays, NaNs are replaced by range_max in
+    place. The two arrays are used alternately, so the array returned by
+    `read` stays valid until the next but one call.
+    """
+
+    _buffers: Tuple[np.ndarray, np.ndarray]
+    _nan_mask: np.ndarray
+    _front: int
+
+    def __init__(self, num_beams: int):
+        """
+        @num_beams: expected number of beams, scans of a different size reallocate the buffers
+        """
+        self._num_beams = num_beams
+        self._allocate(num_beams)
+
+    def read(self, buff: bytes) -> Tuple[np.ndarray, int, int]:
+        """
+        Reads the ranges of a serialized laser scan.
+        Returns: ranges with NaNs replaced by range_max, stamp secs and nsecs
+        """
+        _, secs, nsecs, frame_id_length = _HEADER.unpack_from(buff, 0)
+
+        offset = _HEADER.size + frame_id_length
+        *_, range_max, num_ranges = _SCAN.unpack_from(buff, offset)
+        offset += _SCAN.size
+
+        if num_ranges == 0:
+            # same as the deserializing path, an empty scan is all zeros
+            if len(self._buffers[0]) != self._num_beams:
+                self._allocate(self._num_beams)
+
+            ranges = self._next_buffer()
+            ranges[:] = 0
+            return ranges, secs, nsecs
+
+        if num_ranges != len(self._buffers[0]):
+            self._allocate(num_ranges)
+
+        ranges = self._next_buffer()
+
+        np.copyto(
+            ranges, np.frombuffer(buff, dtype="<f4", count=num_ranges, offset=offset)
+        )
+        np.isnan(ranges, out=self._nan_mask)
+        np.copyto(ranges, np.float32(range_max), where=self._nan_mask)
+
+        return ranges, secs, nsecs
+
+    def _next_buffer(self) -> np.ndarray:
+        self._front ^= 1
+        return self._buffers[self._front]
+
+    def _allocate(self, num_beams: int):
+        self._buffers = (
+            np.zeros(num_beams, dtype=np.float32),
+            np.zeros(num_beams, dtype=np.float32),
+        )
+        self._nan_mask = np.zeros(num_beams, dtype=bool)
+        self._front = 0
@@ -0,0 +1,51 @@
+import threading
+from typing import Optional
+
+import rospy
+from rosgraph_msgs.msg import Clock
+
+
+class SimClock:
+    """
+    Latest time published on a simulation clock topic.
+
+    Used to find out the simulation time of a completed simulation step, so
+    that observations can be required to be at least as recent as the step.
+    """
+
+    _now: Optional[rospy.Time]
+    _ticked: threading.Condition
+
+    def __init__(self, topic: str):
+        self._now = None
+        self._ticked = threading.Condition()
+
+        self._clock_sub = rospy.Subscriber(
+            topic, Clock, self._cb_clock, tcp_nodelay=True
+        )
+
+    @property
+    def now(self) -> Optional[rospy.Time]:
+        return self._now
+
+    def wait_for_tick(
+        self, after: Optional[rospy.Time], timeout: float
+    ) -> Optional[rospy.Time]:
+        """
+        Blocks until the clock advanced past the given time.
+        @after: time the clock has to exceed, any time if None
+        @timeout: maximum wait time in seconds
+        Returns: the new time or None on timeout
+        """
+        with self._ticked:
+            ticked = self._ticked.wait_for(
+                lambda: self._now is not None and (after is None or self._now > after),
+                timeout=timeout,
+            )
+
+            return self._now if ticked else None
+
+    def _cb_clock(self, clock_msg: Clock):
+        with self._ticked:
+            self._now = clock_msg.clock
+            self._ticked.notify_all()
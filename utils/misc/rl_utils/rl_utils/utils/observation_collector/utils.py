@@ -36,9 +36,84 @@ def pose3d_to_pose2d(pose3d) -> Pose2D:
     return pose2d
 
 
+def downsample_by_arc_length(path: np.ndarray, distance: float) -> np.ndarray:
+    """
+    Keeps the first point of a (n, 2) path after every `distance` m of arc
+    length, the first and the last point are always kept.
+    """
+    if len(path) < 3:
+        return path
+
+    arc_length = np.concatenate(
+        ([0.0], np.cumsum(np.linalg.norm(np.diff(path, axis=0), axis=1)))
+    )
+    # index of the first point at or beyond each multiple of distance
+    keep = np.union1d(
+        np.searchsorted(arc_length, np.arange(0.0, arc_length[-1], distance)),
+        [0, len(path) - 1],
+    )
+
+    return path[keep]
+
+
 def false_params(**kwargs):
     false_params = []
     for key, val in kwargs.items():
         if not val:
             false_params.append(key)
     return false_params
+
+
+class WaitTimeHistogram:
+    """
+    Histogram of wait times with logarithmically spaced bins.
+    """
+
+    # upper bin edges in seconds, the last bin is unbounded
+    BIN_EDGES = np.array([0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1.0, 2.0])
+
+    def __init__(self, bin_edges: np.ndarray = None):
+        """
+        @bin_edges: ascending upper bin edges in seconds, defaults to BIN_EDGES
+        """
+        self.bin_edges = WaitTimeHistogram.BIN_EDGES if bin_edges is None else bin_edges
+        self.counts = np.zeros(len(self.bin_edges) + 1, dtype=np.int64)
+        self.total = 0.0
+
+    @property
+    def count(self) -> int:
+        return int(self.counts.sum())
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def add(self, seconds: float):
+        self.counts[np.searchsorted(self.bin_edges, seconds)] += 1
+        self.total += seconds
+
+    def percentile(self, q: float) -> float:
+        """
+        Upper bin edge of the q-th percentile (0 <= q <= 100),
+        inf if it lies in the unbounded bin.
+        """
+        if not self.count:
+            return 0.0
+
+        index = int(np.searchsorted(np.cumsum(self.counts), q / 100 * self.count))
+
+        return (
+            float(self.bin_edges[index])
+            if index < len(self.bin_edges)
+            else float("inf")
+        )
+
+    def reset(self):
+        self.counts[:] = 0
+        self.total = 0.0
+
+    def __str__(self) -> str:
+        return (
+            f"n={self.count} mean={self.mean * 1000:.1f}ms "
+            f"p50<={self.percentile(50) * 1000:.0f}ms p95<={self.percentile(95) * 1000:.0f}ms"
+        )
@@ -0,0 +1,114 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import List, Sequence
+
+import rosnode
+import rospy
+
+POLL_INTERVAL = 0.1  # in seconds
+# namespaces checked (or environments initialized) at the same time
+MAX_CONCURRENCY = 8
+
+
+@dataclass
+class NamespaceReadiness:
+    """
+    Result of waiting for a simulation namespace.
+    """
+
+    ns: str
+    # what wasn't available when the wait ended
+    missing: List[str] = field(default_factory=list)
+    elapsed: float = 0.0
+
+    @property
+    def ready(self) -> bool:
+        return not self.missing
+
+    def __str__(self) -> str:
+        status = "ready" if self.ready else "missing " + ", ".join(self.missing)
+        return f"'{self.ns}': {status} after {self.elapsed:.1f}s"
+
+
+def _join(ns: str, name: str) -> str:
+    return f"{ns}/{name}" if ns else name
+
+
+def check_namespace(
+    ns: str, services: Sequence[str] = (), min_nodes: int = 0
+) -> List[str]:
+    """
+    Checks once which parts of a namespace aren't available yet.
+    @ns: namespace, e.g. "sim_1"
+    @services: services relative to ns that have to be advertised
+    @min_nodes: number of nodes that have to run in ns
+    Returns: descriptions of the missing parts, empty if the namespace is ready
+    """
+    missing = []
+
+    num_nodes = len(rosnode.get_node_names(namespace=ns))
+    if num_nodes < min_nodes:
+        missing.append(f"nodes ({num_nodes}/{min_nodes} running)")
+
+    for service in services:
+        try:
+            rospy.wait_for_service(_join(ns, service), timeout=POLL_INTERVAL)
+        except rospy.ROSException:
+            missing.append(f"service {_join(ns, service)}")
+
+    return missing
+
+
+def wait_for_namespace(
+    ns: str, timeout: float, services: Sequence[str] = (), min_nodes: int = 0
+) -> NamespaceReadiness:
+    """
+    Polls a namespace until it is ready or timeout seconds passed.
+    """
+    start = time.monotonic()
+
+    while True:
+        missing = check_namespace(ns, services=services, min_nodes=min_nodes)
+        elapsed = time.monotonic() - start
+
+        if not missing or elapsed >= timeout:
+            return NamespaceReadiness(ns, missing, elapsed)
+
+        time.sleep(POLL_INTERVAL)
+
+
+def wait_for_namespaces(
+    namespaces: Sequence[str],
+    timeout: float,
+    services: Sequence[str] = (),
+    min_nodes: int = 0,
+    max_concurrency: int = MAX_CONCURRENCY,
+) -> List[NamespaceReadiness]:
+    """
+    Waits for all namespaces in parallel, at most max_concurrency at a time.
+    Raises a TimeoutError listing every namespace that isn't ready after
+    timeout seconds.
+    """
+    deadline = time.monotonic() + timeout
+
+    def wait(ns: str) -> NamespaceReadiness:
+        return wait_for_namespace(
+            ns,
+            timeout=max(deadline - time.monotonic(), 0.0),
+            services=services,
+            min_nodes=min_nodes,
+        )
+
+    with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+        results = list(executor.map(wait, namespaces))
+
+    not_ready = [result for result in results if not result.ready]
+
+    if not_ready:
+        raise TimeoutError(
+            f"{len(not_ready)}/{len(results)} namespaces not ready:\n"
+            + "\n".join(f"  {result}" for result in not_ready)
+        )
+
+    return results
@@ -1,2 +1,3 @@
-from .reward_unit_factory import RewardUnitFactory
+from .reward_unit_factory import BatchedRewardUnitFactory, RewardUnitFactory
 from .reward_units import *
+from .batched_reward_units import *
@@ -2,8 +2,8 @@ from abc import ABC, abstractmethod
 from typing import Any
 
 import numpy as np
-from scipy.spatial import cKDTree
 
+from .batched_reward_function import BatchedRewardFunction, RewardBatch
 from .reward_function import RewardFunction
 
 
@@ -44,16 +44,6 @@ class RewardUnit(ABC):
 
 
 class GlobalplanRewardUnit(RewardUnit, ABC):
-    def __init__(
-        self,
-        reward_function: "RewardFunction",
-        _on_safe_dist_violation: bool = True,
-        *args,
-        **kwargs
-    ) -> None:
-        super().__init__(reward_function, _on_safe_dist_violation, *args, **kwargs)
-        self._kdtree = None
-
     @property
     def curr_dist_to_path(self) -> float:
         return self._reward_function.curr_dist_to_path
@@ -69,8 +59,9 @@ class GlobalplanRewardUnit(RewardUnit, ABC):
     def __call__(
         self, global_plan: np.ndarray, robot_pose, *args: Any, **kwargs: Any
     ) -> Any:
+        # the distance is computed once per step and shared by all units
         if (
-            not self.curr_dist_to_path
+            self.curr_dist_to_path is None
             and isinstance(global_plan, np.ndarray)
             and len(global_plan) > 0
         ):
@@ -78,13 +69,71 @@ class GlobalplanRewardUnit(RewardUnit, ABC):
                 global_plan, robot_pose
             )
 
-    def get_dist_to_globalplan(self, global_plan: np.ndarray, robot_pose):
-        if self._kdtree is None:
-            self._kdtree = cKDTree(global_plan)
-
-        dist, _ = self._kdtree.query([robot_pose.x, robot_pose.y])
-        return dist
+    def get_dist_to_globalplan(self, global_plan: np.ndarray, robot_pose) -> float:
+        path_index = self._reward_function.path_index
+        path_index.update(global_plan)
+        return path_index.distance(robot_pose.x, robot_pose.y)
 
     def reset(self):
-        self._kdtree = None
         self.curr_dist_to_path = None
+
+
+class BatchedRewardUnit(ABC):
+    """
+    Vectorized counterpart of a `RewardUnit`, registered under the same name.
+    Units are called with the stacked observations and the mask of envs the
+    unit is evaluated for, state kept between steps is stored per env.
+    """
+
+    def __init__(
+        self,
+        reward_function: BatchedRewardFunction,
+        _on_safe_dist_violation: bool = True,
+        *args,
+        **kwargs,
+    ) -> None:
+        self._reward_function = reward_function
+        self._on_safe_dist_violation = _on_safe_dist_violation
+
+    @property
+    def on_safe_dist_violation(self):
+        return self._on_safe_dist_violation
+
+    @property
+    def num_envs(self) -> int:
+        return self._reward_function.num_envs
+
+    def add_reward(self, value, mask: np.ndarray):
+        self._reward_function.add_reward(value=value, mask=mask)
+
+    def add_info(self, info: dict, mask: np.ndarray):
+        self._reward_function.add_info(info=info, mask=mask)
+
+    def reset(self, mask: np.ndarray):
+        pass
+
+    @property
+    def robot_radius(self):
+        return self._reward_function.robot_radius
+
+    @abstractmethod
+    def __call__(self, batch: RewardBatch, active: np.ndarray) -> None:
+        raise NotImplementedError()
+
+
+class BatchedGlobalplanRewardUnit(BatchedRewardUnit, ABC):
+    @property
+    def curr_dist_to_path(self) -> np.ndarray:
+        return self._reward_function.curr_dist_to_path
+
+    def __call__(self, batch: RewardBatch, active: np.ndarray) -> None:
+        if batch.distance_to_path is None:
+            return
+
+        # like the per env unit, the distance is taken once per step
+        curr = self.curr_dist_to_path
+        update = active & np.isnan(curr)
+        curr[update] = batch.distance_to_path[update]
+
+    def reset(self, mask: np.ndarray):
+        self.curr_dist_to_path[mask] = np.nan
@@ -0,0 +1,247 @@
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import rospy
+
+from .constants import REWARD_CONSTANTS
+from .utils import load_rew_fnc
+
+
+@dataclass
+class RewardBatch:
+    """
+    Observations of N environments stacked along the first axis.
+
+    laser_scan: (N, beams)
+    distance_to_goal: (N,)
+    action: (N, action_dims)
+    distance_to_path: (N,) distance of the robot to its global plan, NaN if an env has no plan
+    full_laser_scan: (N, beams) or None
+    """
+
+    laser_scan: np.ndarray
+    distance_to_goal: np.ndarray
+    action: np.ndarray
+    distance_to_path: Optional[np.ndarray] = None
+    full_laser_scan: Optional[np.ndarray] = None
+
+    # derived values shared by several units
+    laser_min: np.ndarray = field(init=False)
+    full_laser_min: Optional[np.ndarray] = field(init=False)
+
+    def __post_init__(self):
+        self.laser_min = self.laser_scan.min(axis=1)
+        self.full_laser_min = (
+            self.full_laser_scan.min(axis=1)
+            if self.full_laser_scan is not None
+            else None
+        )
+
+    @property
+    def num_envs(self) -> int:
+        return len(self.laser_scan)
+
+
+class BatchedRewardFunction:
+    """
+    Batched counterpart of `RewardFunction`: computes the rewards of N
+    environments at once with every unit of the reward function yaml being a
+    vectorized NumPy operation over all environments.
+
+    Rewards and infos match N independent `RewardFunction`s fed with the same
+    observations, including the per-unit state between steps.
+    """
+
+    _rew_func_name: str
+    _num_envs: int
+    _robot_radius: float
+    _safe_dist: float
+    _goal_radius: float
+
+    # per env, NaN if not yet known in this step
+    _curr_dist_to_path: np.ndarray
+    _safe_dist_breached: np.ndarray
+
+    _curr_reward: np.ndarray
+    # per info key: values and mask of the envs the key was set for
+    _info: Dict[str, Tuple[np.ndarray, np.ndarray]]
+
+    _rew_fnc_dict: Dict[str, Dict[str, Any]]
+    _reward_units: List["BatchedRewardUnit"]
+
+    def __init__(
+        self,
+        rew_func_name: str,
+        num_envs: int,
+        robot_radius: float,
+        goal_radius: float,
+        safe_dist: float,
+        *args,
+        **kwargs,
+    ):
+        """
+        Args:
+            rew_func_name (str): Name of the yaml file that contains the reward function specifications.
+            num_envs (int): Number of environments computed at once.
+            robot_radius (float): Radius of the robot.
+            goal_radius (float): Radius of the goal.
+            safe_dist (float): Safe distance of the agent.
+        """
+        self._rew_func_name = rew_func_name
+        self._num_envs = num_envs
+        self._robot_radius = robot_radius
+        self._safe_dist = safe_dist
+        self._goal_radius = goal_radius
+
+        self._curr_dist_to_path = np.full(num_envs, np.nan)
+        self._safe_dist_breached = np.zeros(num_envs, dtype=bool)
+
+        self._curr_reward = np.zeros(num_envs)
+        self._info = {}
+
+        self._rew_fnc_dict = load_rew_fnc(self._rew_func_name)
+        self._reward_units: List["BatchedRewardUnit"] = self._setup_reward_function()
+
+    def _setup_reward_function(self) -> List["BatchedRewardUnit"]:
+        """Sets up the batched units of the reward function yaml.
+
+        Returns:
+            List[BatchedRewardUnit]: List of batched reward units in yaml order.
+        """
+        import rl_utils.utils.rewards as rew_pkg
+
+        return [
+            rew_pkg.BatchedRewardUnitFactory.instantiate(unit_name)(
+                reward_function=self, **kwargs
+            )
+            for unit_name, kwargs in self._rew_fnc_dict.items()
+        ]
+
+    def add_reward(self, value: np.ndarray, mask: np.ndarray):
+        """Adds value to the current reward of the envs in mask.
+
+        Args:
+            value (np.ndarray): Reward per env, or a scalar for all envs.
+            mask (np.ndarray): Boolean mask of the envs the reward applies to.
+        """
+        self._curr_reward += np.where(mask, value, 0.0)
+
+    def add_info(self, info: Dict[str, Any], mask: np.ndarray):
+        """Sets the info entries for the envs in mask, like `dict.update` per env.
+
+        Args:
+            info (Dict[str, Any]): Scalar info values.
+            mask (np.ndarray): Boolean mask of the envs the info applies to.
+        """
+        for key, value in info.items():
+            if key not in self._info:
+                self._info[key] = (
+                    np.zeros(self._num_envs, dtype=type(value)),
+                    np.zeros(self._num_envs, dtype=bool),
+                )
+
+            values, is_set = self._info[key]
+            values[mask] = value
+            is_set |= mask
+
+    def _reset(self):
+        """Reset on every environment step."""
+        self._curr_reward = np.zeros(self._num_envs)
+        self._info = {}
+        self._curr_dist_to_path[:] = np.nan
+
+    def reset(self, env_indices: Sequence[int] = None):
+        """Reset before each episode.
+
+        Args:
+            env_indices (Sequence[int], optional): Envs starting a new episode. Defaults to all.
+        """
+        mask = np.zeros(self._num_envs, dtype=bool)
+        mask[slice(None) if env_indices is None else list(env_indices)] = True
+
+        self.goal_radius = rospy.get_param("/goal_radius", 0.3)
+        self._curr_dist_to_path[mask] = np.nan
+
+        for reward_unit in self._reward_units:
+            reward_unit.reset(mask)
+
+    def calculate_reward(self, batch: RewardBatch) -> None:
+        """Calculates the rewards of all envs.
+
+        Args:
+            batch (RewardBatch): Stacked observations of all envs.
+        """
+        assert (
+            batch.num_envs == self._num_envs
+        ), f"Expected {self._num_envs} envs, got {batch.num_envs}"
+
+        self._reset()
+        self._safe_dist_breached = batch.laser_min <= self._safe_dist
+
+        for reward_unit in self._reward_units:
+            active = (
+                np.ones(self._num_envs, dtype=bool)
+                if reward_unit.on_safe_dist_violation
+                else ~self._safe_dist_breached
+            )
+            if active.any():
+                reward_unit(batch, active)
+
+    def get_reward(
+        self, batch: RewardBatch
+    ) -> Tuple[np.ndarray, List[Dict[str, Any]]]:
+        """Retrieves the rewards and info dictionaries of all envs.
+
+        Returns:
+            Tuple[np.ndarray, List[Dict[str, Any]]]: Rewards (N,) and one info dict per env.
+        """
+        self.calculate_reward(batch)
+        return self._curr_reward, self._infos()
+
+    def _infos(self) -> List[Dict[str, Any]]:
+        infos = [{} for _ in range(self._num_envs)]
+
+        for key, (values, is_set) in self._info.items():
+            # python scalars like the per env infos
+            values = values.tolist()
+            for env_idx in np.flatnonzero(is_set).tolist():
+                infos[env_idx][key] = values[env_idx]
+
+        return infos
+
+    @property
+    def num_envs(self) -> int:
+        return self._num_envs
+
+    @property
+    def robot_radius(self) -> float:
+        return self._robot_radius
+
+    @property
+    def goal_radius(self) -> float:
+        return self._goal_radius
+
+    @goal_radius.setter
+    def goal_radius(self, value) -> None:
+        if value < REWARD_CONSTANTS.MIN_GOAL_RADIUS:
+            raise ValueError(
+                f"Goal radius smaller than {REWARD_CONSTANTS.MIN_GOAL_RADIUS}"
+            )
+        self._goal_radius = value
+
+    @property
+    def curr_dist_to_path(self) -> np.ndarray:
+        return self._curr_dist_to_path
+
+    @property
+    def safe_dist_breached(self) -> np.ndarray:
+        return self._safe_dist_breached
+
+    def __repr__(self) -> str:
+        format_string = f"{self.__class__.__name__}[{self._num_envs}]("
+        for name, params in self._rew_fnc_dict.items():
+            format_string += "\n"
+            format_string += f"{name}: {params}"
+        format_string += "\n)"
+        return format_string
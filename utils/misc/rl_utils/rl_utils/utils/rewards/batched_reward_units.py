@@ -0,0 +1,270 @@
+from typing import Dict
+
+import numpy as np
+
+from .base_reward_units import BatchedGlobalplanRewardUnit, BatchedRewardUnit
+from .batched_reward_function import BatchedRewardFunction, RewardBatch
+from .constants import DEFAULTS, REWARD_CONSTANTS
+from .reward_unit_factory import BatchedRewardUnitFactory
+from .reward_units import RewardCollision, RewardGoalReached
+
+# UPDATE WHEN ADDING A NEW UNIT
+__all__ = [
+    "BatchedRewardGoalReached",
+    "BatchedRewardSafeDistance",
+    "BatchedRewardNoMovement",
+    "BatchedRewardApproachGoal",
+    "BatchedRewardCollision",
+    "BatchedRewardDistanceTravelled",
+    "BatchedRewardApproachGlobalplan",
+    "BatchedRewardFollowGlobalplan",
+    "BatchedRewardReverseDrive",
+    "BatchedRewardAbruptVelocityChange",
+]
+
+
+@BatchedRewardUnitFactory.register("goal_reached")
+class BatchedRewardGoalReached(BatchedRewardUnit):
+    def __init__(
+        self,
+        reward_function: BatchedRewardFunction,
+        reward: float = DEFAULTS.GOAL_REACHED.REWARD,
+        _on_safe_dist_violation: bool = DEFAULTS.GOAL_REACHED._ON_SAFE_DIST_VIOLATION,
+        *args,
+        **kwargs,
+    ):
+        super().__init__(reward_function, _on_safe_dist_violation, *args, **kwargs)
+        self._reward = reward
+
+    def __call__(self, batch: RewardBatch, active: np.ndarray) -> None:
+        reached = active & (
+            batch.distance_to_goal < self._reward_function.goal_radius
+        )
+
+        self.add_reward(self._reward, reached)
+        self.add_info(RewardGoalReached.DONE_INFO, reached)
+        self.add_info(RewardGoalReached.NOT_DONE_INFO, active & ~reached)
+
+
+@BatchedRewardUnitFactory.register("safe_distance")
+class BatchedRewardSafeDistance(BatchedRewardUnit):
+    def __init__(
+        self,
+        reward_function: BatchedRewardFunction,
+        reward: float = DEFAULTS.SAFE_DISTANCE.REWARD,
+        *args,
+        **kwargs,
+    ):
+        super().__init__(reward_function, True, *args, **kwargs)
+        self._reward = reward
+        self._safe_dist = self._reward_function._safe_dist
+
+    def __call__(self, batch: RewardBatch, active: np.ndarray) -> None:
+        violation = batch.laser_min < self._safe_dist
+        if batch.full_laser_min is not None:
+            violation |= batch.full_laser_min <= self._safe_dist
+        violation &= active
+
+        self.add_reward(self._reward, violation)
+        self.add_info({"safe_dist_violation": True}, violation)
+
+
+@BatchedRewardUnitFactory.register("no_movement")
+class BatchedRewardNoMovement(BatchedRewardUnit):
+    def __init__(
+        self,
+        reward_function: BatchedRewardFunction,
+        reward: float = DEFAULTS.NO_MOVEMENT.REWARD,
+        _on_safe_dist_violation: bool = DEFAULTS.NO_MOVEMENT._ON_SAFE_DIST_VIOLATION,
+        *args,
+        **kwargs,
+    ):
+        super().__init__(reward_function, _on_safe_dist_violation, *args, **kwargs)
+        self._reward = reward
+
+    def __call__(self, batch: RewardBatch, active: np.ndarray) -> None:
+        self.add_reward(
+            self._reward,
+            active
+            & (np.abs(batch.action[:, 0]) <= REWARD_CONSTANTS.NO_MOVEMENT_TOLERANCE),
+        )
+
+
+@BatchedRewardUnitFactory.register("approach_goal")
+class BatchedRewardApproachGoal(BatchedRewardUnit):
+    def __init__(
+        self,
+        reward_function: BatchedRewardFunction,
+        pos_factor: float = DEFAULTS.APPROACH_GOAL.POS_FACTOR,
+        neg_factor: float = DEFAULTS.APPROACH_GOAL.NEG_FACTOR,
+        _on_safe_dist_violation: bool = DEFAULTS.APPROACH_GOAL._ON_SAFE_DIST_VIOLATION,
+        *args,
+        **kwargs,
+    ):
+        super().__init__(reward_function, _on_safe_dist_violation, *args, **kwargs)
+        self._pos_factor = pos_factor
+        self._neg_factor = neg_factor
+        self.last_goal_dist = np.full(self.num_envs, np.nan)
+
+    def __call__(self, batch: RewardBatch, active: np.ndarray) -> None:
+        diff = self.last_goal_dist - batch.distance_to_goal
+        w = np.where(diff > 0, self._pos_factor, self._neg_factor)
+
+        self.add_reward(w * diff, active & ~np.isnan(self.last_goal_dist))
+        self.last_goal_dist[active] = batch.distance_to_goal[active]
+
+    def reset(self, mask: np.ndarray):
+        self.last_goal_dist[mask] = np.nan
+
+
+@BatchedRewardUnitFactory.register("collision")
+class BatchedRewardCollision(BatchedRewardUnit):
+    def __init__(
+        self,
+        reward_function: BatchedRewardFunction,
+        reward: float = DEFAULTS.COLLISION.REWARD,
+        *args,
+        **kwargs,
+    ):
+        super().__init__(reward_function, True, *args, **kwargs)
+        self._reward = reward
+
+    def __call__(self, batch: RewardBatch, active: np.ndarray) -> None:
+        collision = batch.laser_min <= self.robot_radius
+        if batch.full_laser_min is not None:
+            collision |= batch.full_laser_min <= self.robot_radius
+        collision &= active
+
+        self.add_reward(self._reward, collision)
+        self.add_info(RewardCollision.DONE_INFO, collision)
+
+
+@BatchedRewardUnitFactory.register("distance_travelled")
+class BatchedRewardDistanceTravelled(BatchedRewardUnit):
+    def __init__(
+        self,
+        reward_function: BatchedRewardFunction,
+        consumption_factor: float = DEFAULTS.DISTANCE_TRAVELLED.CONSUMPTION_FACTOR,
+        lin_vel_scalar: float = DEFAULTS.DISTANCE_TRAVELLED.LIN_VEL_SCALAR,
+        ang_vel_scalar: float = DEFAULTS.DISTANCE_TRAVELLED.ANG_VEL_SCALAR,
+        _on_safe_dist_violation: bool = DEFAULTS.DISTANCE_TRAVELLED._ON_SAFE_DIST_VIOLATION,
+        *args,
+        **kwargs,
+    ):
+        super().__init__(reward_function, _on_safe_dist_violation, *args, **kwargs)
+        self._factor = consumption_factor
+        self._lin_vel_scalar = lin_vel_scalar
+        self._ang_vel_scalar = ang_vel_scalar
+
+    def __call__(self, batch: RewardBatch, active: np.ndarray) -> None:
+        lin_vel, ang_vel = batch.action[:, 0], batch.action[:, -1]
+        reward = (
+            (lin_vel * self._lin_vel_scalar) + (ang_vel * self._ang_vel_scalar)
+        ) * -self._factor
+        self.add_reward(reward, active)
+
+
+@BatchedRewardUnitFactory.register("approach_globalplan")
+class BatchedRewardApproachGlobalplan(BatchedGlobalplanRewardUnit):
+    def __init__(
+        self,
+        reward_function: BatchedRewardFunction,
+        pos_factor: float = DEFAULTS.APPROACH_GLOBALPLAN.POS_FACTOR,
+        neg_factor: float = DEFAULTS.APPROACH_GLOBALPLAN.NEG_FACTOR,
+        _on_safe_dist_violation: bool = DEFAULTS.APPROACH_GLOBALPLAN._ON_SAFE_DIST_VIOLATION,
+        *args,
+        **kwargs,
+    ):
+        super().__init__(reward_function, _on_safe_dist_violation, *args, **kwargs)
+        self._pos_factor = pos_factor
+        self._neg_factor = neg_factor
+        self.last_dist_to_path = np.full(self.num_envs, np.nan)
+
+    def __call__(self, batch: RewardBatch, active: np.ndarray) -> None:
+        super().__call__(batch, active)
+
+        curr, last = self.curr_dist_to_path, self.last_dist_to_path
+        w = np.where(curr < last, self._pos_factor, self._neg_factor)
+
+        self.add_reward(w * (last - curr), active & ~np.isnan(curr) & ~np.isnan(last))
+        last[active] = curr[active]
+
+    def reset(self, mask: np.ndarray):
+        super().reset(mask)
+        self.last_dist_to_path[mask] = np.nan
+
+
+@BatchedRewardUnitFactory.register("follow_globalplan")
+class BatchedRewardFollowGlobalplan(BatchedGlobalplanRewardUnit):
+    def __init__(
+        self,
+        reward_function: BatchedRewardFunction,
+        min_dist_to_path: float = DEFAULTS.FOLLOW_GLOBALPLAN.MIN_DIST_TO_PATH,
+        reward_factor: float = DEFAULTS.FOLLOW_GLOBALPLAN.REWARD_FACTOR,
+        _on_safe_dist_violation: bool = DEFAULTS.FOLLOW_GLOBALPLAN._ON_SAFE_DIST_VIOLATION,
+        *args,
+        **kwargs,
+    ) -> None:
+        super().__init__(reward_function, _on_safe_dist_violation, *args, **kwargs)
+        self._min_dist_to_path = min_dist_to_path
+        self._reward_factor = reward_factor
+
+    def __call__(self, batch: RewardBatch, active: np.ndarray) -> None:
+        super().__call__(batch, active)
+
+        curr = self.curr_dist_to_path
+        self.add_reward(
+            self._reward_factor * batch.action[:, 0],
+            active & ~np.isnan(curr) & (curr <= self._min_dist_to_path),
+        )
+
+
+@BatchedRewardUnitFactory.register("reverse_drive")
+class BatchedRewardReverseDrive(BatchedRewardUnit):
+    def __init__(
+        self,
+        reward_function: BatchedRewardFunction,
+        reward: float = DEFAULTS.REVERSE_DRIVE.REWARD,
+        _on_safe_dist_violation: bool = DEFAULTS.REVERSE_DRIVE._ON_SAFE_DIST_VIOLATION,
+        *args,
+        **kwargs,
+    ) -> None:
+        super().__init__(reward_function, _on_safe_dist_violation, *args, **kwargs)
+        self._reward = reward
+
+    def __call__(self, batch: RewardBatch, active: np.ndarray) -> None:
+        self.add_reward(self._reward, active & (batch.action[:, 0] < 0))
+
+
+@BatchedRewardUnitFactory.register("abrupt_velocity_change")
+class BatchedRewardAbruptVelocityChange(BatchedRewardUnit):
+    def __init__(
+        self,
+        reward_function: BatchedRewardFunction,
+        vel_factors: Dict[str, float] = DEFAULTS.ABRUPT_VEL_CHANGE.VEL_FACTORS,
+        _on_safe_dist_violation: bool = DEFAULTS.ABRUPT_VEL_CHANGE._ON_SAFE_DIST_VIOLATION,
+        *args,
+        **kwargs,
+    ) -> None:
+        super().__init__(reward_function, _on_safe_dist_violation, *args, **kwargs)
+        self._vel_factors = [
+            (int(idx), factor) for idx, factor in vel_factors.items()
+        ]
+        # actions are only read where has_last_action is set
+        self.last_action = None
+        self.has_last_action = np.zeros(self.num_envs, dtype=bool)
+
+    def __call__(self, batch: RewardBatch, active: np.ndarray) -> None:
+        if self.last_action is None:
+            self.last_action = np.zeros_like(batch.action)
+
+        mask = active & self.has_last_action
+        for idx, factor in self._vel_factors:
+            vel_diff = np.abs(batch.action[:, idx] - self.last_action[:, idx])
+            self.add_reward(-((vel_diff**4 / 100) * factor), mask)
+
+        self.last_action[active] = batch.action[active]
+        self.has_last_action |= active
+
+    def reset(self, mask: np.ndarray):
+        self.has_last_action[mask] = False
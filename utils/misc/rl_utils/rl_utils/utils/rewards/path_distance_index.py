@@ -0,0 +1,116 @@
+from typing import Optional
+
+import numpy as np
+from scipy.spatial import cKDTree
+
+
+class PathDistanceIndex:
+    """
+    Distance of points to a global plan polyline.
+
+    The segment midpoints of the plan are indexed in a KD-tree which is only
+    rebuilt when a different plan is passed to `update`. A query looks up the
+    nearest midpoint, whose distance bounds the distance to the path, and
+    projects the point onto all segments whose midpoint is close enough to
+    possibly be nearer. For plans with evenly spaced points (e.g. from
+    move_base) that are only a few segments, i.e. O(log n) per query.
+    """
+
+    _plan: Optional[np.ndarray]
+    _version: int
+
+    def __init__(self):
+        self._plan = None
+        self._version = 0
+
+        self._tree: Optional[cKDTree] = None
+        self._starts: np.ndarray = np.empty((0, 2))
+        self._directions: np.ndarray = np.empty((0, 2))
+        self._squared_lengths: np.ndarray = np.empty(0)
+        self._max_half_length = 0.0
+
+    @property
+    def version(self) -> int:
+        """Increments whenever the index is rebuilt for a new plan."""
+        return self._version
+
+    @property
+    def empty(self) -> bool:
+        return self._plan is None or len(self._plan) == 0
+
+    def update(self, plan: np.ndarray) -> bool:
+        """
+        Sets the plan the distances are measured to.
+        @plan: (n, 2) points of the path
+        Returns: True if the index was rebuilt
+        """
+        if plan is self._plan or (
+            self._plan is not None
+            and plan.shape == self._plan.shape
+            and np.array_equal(plan, self._plan)
+        ):
+            return False
+
+        self._plan = plan
+        self._version += 1
+
+        if len(plan) == 0:
+            self._tree = None
+            return True
+
+        if len(plan) == 1:
+            # a single point is a segment of length 0
+            plan = np.concatenate((plan, plan))
+
+        self._starts = plan[:-1]
+        self._directions = np.diff(plan, axis=0)
+        self._squared_lengths = np.einsum(
+            "ij,ij->i", self._directions, self._directions
+        )
+        self._max_half_length = float(np.sqrt(self._squared_lengths.max())) / 2
+        self._tree = cKDTree(self._starts + self._directions / 2)
+
+        return True
+
+    def distance(self, x: float, y: float) -> float:
+        """
+        Distance of (x, y) to the closest point on the path.
+        """
+        assert not self.empty, "No plan to measure the distance to"
+
+        point = np.array([x, y])
+        upper_bound, nearest = self._tree.query(point)
+
+        # a segment closer than upper_bound has its midpoint within
+        # upper_bound + half its length. The nearest segment is always a
+        # candidate, rounding may exclude it from the ball, e.g. for plans
+        # without any length
+        candidates = self._tree.query_ball_point(
+            point, upper_bound + self._max_half_length
+        )
+        candidates.append(nearest)
+
+        return min(upper_bound, self._distance_to_segments(point, candidates))
+
+    def _distance_to_segments(self, point: np.ndarray, segments) -> float:
+        starts = self._starts[segments]
+        directions = self._directions[segments]
+        squared_lengths = self._squared_lengths[segments]
+
+        offsets = point - starts
+        # projection onto the segments, clamped to their end points
+        t = np.divide(
+            np.einsum("ij,ij->i", offsets, directions),
+            squared_lengths,
+            out=np.zeros(len(segments)),
+            where=squared_lengths > 0,
+        )
+        np.clip(t, 0.0, 1.0, out=t)
+
+        nearest = starts + t[:, None] * directions
+        return float(np.sqrt(np.min(np.sum((nearest - point) ** 2, axis=1))))
+
+    def reset(self):
+        """Forgets the plan, e.g. at the end of an episode."""
+        self._plan = None
+        self._tree = None
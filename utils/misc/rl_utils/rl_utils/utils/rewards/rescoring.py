@@ -0,0 +1,257 @@
+import os
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+from geometry_msgs.msg import Pose2D
+
+from ..observation_collector.constants import OBS_DICT_KEYS
+from ..trajectory_storage import OBS_PREFIX, Episode, TrajectoryReader
+from .reward_function import RewardFunction
+
+"""
+Offline re-scoring of recorded trajectories (see `TrajectoryRecorder`) with
+other reward functions, without a simulator or ROS master.
+"""
+
+# as in FlatlandEnv, None if an episode didn't terminate
+DONE_REASONS = {None: "None", 0: "Timeout", 1: "Crash", 2: "Success"}
+
+
+class ScoringRewardFunction(RewardFunction):
+    """
+    RewardFunction that additionally keeps the reward of every unit of the
+    last step in `unit_rewards`.
+    """
+
+    unit_rewards: Dict[str, float]
+
+    def calculate_reward(self, laser_scan: np.ndarray, *args, **kwargs) -> None:
+        self._reset()
+        self.set_safe_dist_breached(laser_scan)
+        self.unit_rewards = {}
+
+        for unit_name, reward_unit in zip(self._rew_fnc_dict, self._reward_units):
+            if self.safe_dist_breached and not reward_unit.on_safe_dist_violation:
+                continue
+
+            reward_before = self._curr_reward
+            reward_unit(laser_scan=laser_scan, **kwargs)
+            self.unit_rewards[unit_name] = self._curr_reward - reward_before
+
+
+@dataclass
+class EpisodeScore:
+    """
+    Rewards of one recorded episode under one reward function. Rewards are
+    summed up to the step the reward function terminates the episode.
+    """
+
+    reward_fnc: str
+    steps: int
+    reward: float = 0.0
+    unit_rewards: Dict[str, float] = field(default_factory=dict)
+    done_reason: Optional[int] = None
+    done_step: Optional[int] = None
+
+    recorded_reward: float = 0.0
+    recorded_done_reason: Optional[int] = None
+
+
+@dataclass
+class ScoringConfig:
+    reward_fncs: Sequence[str]
+    robot_radius: float
+    safe_dist: float
+    max_steps_per_episode: int
+    # for recordings without goal radius column
+    goal_radius: float = 0.3
+
+
+# reward functions of a worker process
+_reward_functions: Dict[str, ScoringRewardFunction] = {}
+_config: Optional[ScoringConfig] = None
+
+
+def _init_worker(config: ScoringConfig):
+    global _config
+    _config = config
+    _reward_functions.clear()
+
+    for reward_fnc in config.reward_fncs:
+        _reward_functions[reward_fnc] = ScoringRewardFunction(
+            rew_func_name=reward_fnc,
+            robot_radius=config.robot_radius,
+            goal_radius=config.goal_radius,
+            safe_dist=config.safe_dist,
+        )
+
+
+def episode_steps(episode: Episode) -> Iterator[Tuple[Dict[str, Any], np.ndarray]]:
+    """
+    Observation dicts as returned by the observation collector and the
+    decoded actions of the steps of a recorded episode.
+    """
+    observations = {
+        column[len(OBS_PREFIX) :]: episode[column]
+        for column in episode.columns
+        if column.startswith(OBS_PREFIX)
+    }
+    actions = episode["action"]
+    steps = episode["step"]
+
+    for idx in range(len(episode)):
+        # the row of the reset observation has no action
+        if steps[idx] == 0:
+            continue
+
+        obs_dict = {key: values[idx] for key, values in observations.items()}
+        x, y, theta = obs_dict[OBS_DICT_KEYS.ROBOT_POSE]
+        obs_dict[OBS_DICT_KEYS.ROBOT_POSE] = Pose2D(x=x, y=y, theta=theta)
+        obs_dict[OBS_DICT_KEYS.GOAL] = tuple(obs_dict[OBS_DICT_KEYS.GOAL])
+        obs_dict[OBS_DICT_KEYS.DISTANCE_TO_GOAL] = float(
+            obs_dict[OBS_DICT_KEYS.DISTANCE_TO_GOAL]
+        )
+
+        yield obs_dict, actions[idx]
+
+
+def _done_reason(reward_info: Dict[str, Any], steps: int) -> Optional[int]:
+    # the timeout overrides the reward function, see `FlatlandEnv.determine_termination`
+    if steps >= _config.max_steps_per_episode:
+        return 0
+    if reward_info and reward_info.get("is_done"):
+        return int(reward_info["done_reason"])
+    return None
+
+
+def score_episode(episode: Episode) -> List[EpisodeScore]:
+    """
+    Scores an episode with every reward function of the worker.
+    """
+    reward_infos = episode["reward_info"]
+    steps = int(episode["step"][-1])
+    goal_radius = (
+        float(episode["goal_radius"][-1])
+        if "goal_radius" in episode.columns
+        else _config.goal_radius
+    )
+
+    scores = {
+        reward_fnc: EpisodeScore(
+            reward_fnc=reward_fnc,
+            steps=steps,
+            unit_rewards=dict.fromkeys(reward_function._rew_fnc_dict, 0.0),
+            recorded_reward=float(np.sum(episode["reward"])),
+            recorded_done_reason=_done_reason(reward_infos[-1], steps),
+        )
+        for reward_fnc, reward_function in _reward_functions.items()
+    }
+    for reward_function in _reward_functions.values():
+        reward_function.reset(goal_radius=goal_radius)
+
+    for step, (obs_dict, action) in enumerate(episode_steps(episode), start=1):
+        for reward_fnc, reward_function in _reward_functions.items():
+            score = scores[reward_fnc]
+            if score.done_step is not None:
+                continue
+
+            reward, reward_info = reward_function.get_reward(action=action, **obs_dict)
+            score.reward += reward
+            for unit_name, unit_reward in reward_function.unit_rewards.items():
+                score.unit_rewards[unit_name] += unit_reward
+
+            done_reason = _done_reason(reward_info, step)
+            if done_reason is not None:
+                score.done_reason = done_reason
+                score.done_step = step
+
+    return list(scores.values())
+
+
+def recordings(path: str) -> List[str]:
+    """
+    Recording directories in path, i.e. path itself or its subdirectories
+    (e.g. one per namespace).
+    """
+    if TrajectoryReader.chunk_paths(path):
+        return [path]
+
+    return [
+        recording
+        for recording in sorted(
+            os.path.join(path, name) for name in os.listdir(path)
+        )
+        if TrajectoryReader.chunk_paths(recording)
+    ]
+
+
+def rescore(
+    recording_paths: Sequence[str],
+    config: ScoringConfig,
+    processes: int = None,
+) -> List[EpisodeScore]:
+    """
+    Scores all complete episodes of the recordings with every reward
+    function of the config in a process pool.
+    """
+    episodes = [
+        episode
+        for path in recording_paths
+        for episode in TrajectoryReader(path).episodes()
+        # incomplete episodes, e.g. the last one of an aborted training
+        if episode["done"][-1]
+    ]
+
+    with ProcessPoolExecutor(
+        max_workers=processes, initializer=_init_worker, initargs=(config,)
+    ) as executor:
+        results = executor.map(
+            score_episode,
+            episodes,
+            chunksize=max(1, len(episodes) // (4 * (processes or os.cpu_count()))),
+        )
+        return [score for episode_scores in results for score in episode_scores]
+
+
+def summarize(scores: List[EpisodeScore]) -> Dict[str, Dict[str, Any]]:
+    """
+    Summary statistics per reward function: episode rewards, mean reward of
+    every unit per episode, done reasons and how they changed compared to
+    the recording.
+    """
+    summary = {}
+
+    for reward_fnc in dict.fromkeys(score.reward_fnc for score in scores):
+        fnc_scores = [score for score in scores if score.reward_fnc == reward_fnc]
+        rewards = np.array([score.reward for score in fnc_scores])
+        recorded_rewards = np.array([score.recorded_reward for score in fnc_scores])
+
+        changed = Counter(
+            f"{DONE_REASONS[score.recorded_done_reason]} -> {DONE_REASONS[score.done_reason]}"
+            for score in fnc_scores
+            if score.done_reason != score.recorded_done_reason
+        )
+
+        summary[reward_fnc] = {
+            "episodes": len(fnc_scores),
+            "reward_mean": float(rewards.mean()),
+            "reward_std": float(rewards.std()),
+            "reward_min": float(rewards.min()),
+            "reward_max": float(rewards.max()),
+            "recorded_reward_mean": float(recorded_rewards.mean()),
+            "unit_reward_means": {
+                unit_name: float(
+                    np.mean([score.unit_rewards[unit_name] for score in fnc_scores])
+                )
+                for unit_name in fnc_scores[0].unit_rewards
+            },
+            "done_reasons": dict(
+                Counter(DONE_REASONS[score.done_reason] for score in fnc_scores)
+            ),
+            "done_reason_changes": dict(changed),
+        }
+
+    return summary
@@ -4,6 +4,7 @@ import numpy as np
 import rospy
 
 from .constants import REWARD_CONSTANTS
+from .path_distance_index import PathDistanceIndex
 from .utils import load_rew_fnc
 
 
@@ -15,6 +16,7 @@ class RewardFunction:
 
     _curr_dist_to_path: float
     _safe_dist_breached: bool
+    _path_index: PathDistanceIndex
 
     _curr_reward: float
     _info: Dict[str, Any]
@@ -47,6 +49,7 @@ class RewardFunction:
         # globally accessible and required information for RewardUnits
         self._curr_dist_to_path: float = None
         self._safe_dist_breached: bool = None
+        self._path_index = PathDistanceIndex()
 
         self._curr_reward = 0
         self._info = {}
@@ -89,11 +92,19 @@ class RewardFunction:
         """Reset on every environment step."""
         self._curr_reward = 0
         self._info = {}
+        self._curr_dist_to_path = None
+
+    def reset(self, goal_radius: float = None):
+        """Reset before each episode.
 
-    def reset(self):
-        """Reset before each episode."""
-        self.goal_radius = rospy.get_param("/goal_radius", 0.3)
+        Args:
+            goal_radius (float, optional): Goal radius of the new episode. Defaults to the /goal_radius parameter.
+        """
+        self.goal_radius = (
+            rospy.get_param("/goal_radius", 0.3) if goal_radius is None else goal_radius
+        )
         self._curr_dist_to_path = None
+        self._path_index.reset()
 
         for reward_unit in self._reward_units:
             reward_unit.reset()
@@ -145,6 +156,10 @@ class RewardFunction:
     def curr_dist_to_path(self, value: float) -> None:
         self._curr_dist_to_path = value
 
+    @property
+    def path_index(self) -> PathDistanceIndex:
+        return self._path_index
+
     @property
     def safe_dist_breached(self) -> bool:
         return self._safe_dist_breached
@@ -1,6 +1,6 @@
 from typing import Dict, Type
 
-from .base_reward_units import RewardUnit
+from .base_reward_units import BatchedRewardUnit, RewardUnit
 
 
 class RewardUnitFactory:
@@ -21,3 +21,27 @@ class RewardUnitFactory:
     def instantiate(cls, name: str) -> Type[RewardUnit]:
         assert name in cls.registry, f"RewardUnit '{name}' is not registered!"
         return cls.registry[name]
+
+
+class BatchedRewardUnitFactory:
+    registry: Dict[str, Type[BatchedRewardUnit]] = {}
+
+    @classmethod
+    def register(cls, name: str):
+        def inner_wrapper(wrapped_class: BatchedRewardUnit):
+            assert (
+                name not in cls.registry
+            ), f"BatchedRewardUnit '{name}' already exists!"
+            assert issubclass(wrapped_class, BatchedRewardUnit)
+
+            cls.registry[name] = wrapped_class
+            return wrapped_class
+
+        return inner_wrapper
+
+    @classmethod
+    def instantiate(cls, name: str) -> Type[BatchedRewardUnit]:
+        assert (
+            name in cls.registry
+        ), f"RewardUnit '{name}' has no batched implementation!"
+        return cls.registry[name]
@@ -306,7 +306,6 @@ class RewardApproachGlobalplan(GlobalplanRewardUnit):
         self._neg_factor = neg_factor
 
         self.last_dist_to_path = None
-        self._kdtree = None
 
     def check_parameters(self, *args, **kwargs):
         if self._pos_factor < 0 or self._neg_factor < 0:
@@ -327,7 +326,10 @@ class RewardApproachGlobalplan(GlobalplanRewardUnit):
     ) -> Any:
         super().__call__(global_plan=global_plan, robot_pose=robot_pose)
 
-        if self.curr_dist_to_path and self.last_dist_to_path:
+        if (
+            self.curr_dist_to_path is not None
+            and self.last_dist_to_path is not None
+        ):
             self.add_reward(self._calc_reward())
 
         self.last_dist_to_path = self.curr_dist_to_path
@@ -380,7 +382,7 @@ class RewardFollowGlobalplan(GlobalplanRewardUnit):
         super().__call__(global_plan=global_plan, robot_pose=robot_pose)
 
         if (
-            self.curr_dist_to_path
+            self.curr_dist_to_path is not None
             and action is not None
             and self.curr_dist_to_path <= self._min_dist_to_path
         ):
@@ -0,0 +1,55 @@
+import time
+from typing import Dict
+
+import numpy as np
+
+from .observation_collector.utils import WaitTimeHistogram
+
+
+class StepProfiler:
+    """
+    Times the phases of environment steps.
+
+    `start` marks the beginning of a step, every `lap` attributes the time
+    since the previous mark to a phase. The durations are collected in one
+    histogram per phase until `pop_summary` reports and resets them, e.g.
+    once per episode.
+    """
+
+    # upper bin edges in seconds, log spaced from 1us to 2s (~26% per bin)
+    BIN_EDGES = np.geomspace(1e-6, 2.0, 64)
+    PERCENTILES = (50, 95, 99)
+
+    def __init__(self):
+        self._histograms: Dict[str, WaitTimeHistogram] = {}
+        self._last = time.perf_counter()
+
+    def start(self):
+        self._last = time.perf_counter()
+
+    def lap(self, phase: str):
+        now = time.perf_counter()
+
+        histogram = self._histograms.get(phase)
+        if histogram is None:
+            histogram = self._histograms[phase] = WaitTimeHistogram(
+                StepProfiler.BIN_EDGES
+            )
+
+        histogram.add(now - self._last)
+        self._last = now
+
+    def pop_summary(self) -> Dict[str, float]:
+        """
+        Returns: flat "<phase>/p<q>" and "<phase>/mean" entries in seconds
+        and resets all histograms
+        """
+        summary = {}
+
+        for phase, histogram in self._histograms.items():
+            for q in StepProfiler.PERCENTILES:
+                summary[f"{phase}/p{q}"] = histogram.percentile(q)
+            summary[f"{phase}/mean"] = histogram.mean
+            histogram.reset()
+
+        return summary
@@ -0,0 +1,474 @@
+import json
+import os
+import queue
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import rospy
+
+from .utils import write_json_atomic
+
+"""
+Chunked columnar storage of recorded environment steps.
+
+A recording is a directory of chunks, each a directory holding one file per
+column and a meta.json. Fixed shape columns are `.npy` files preallocated
+for CHUNK_SIZE rows and written through memory maps. Ragged columns (e.g.
+global plans, json encoded reward infos) append their values to a raw
+`.data` file and keep `.offsets.npy` into it. Only the first `rows` rows of
+a chunk listed in its meta.json are valid, meta.json is replaced atomically
+whenever rows are committed.
+"""
+
+CHUNK_SIZE = 4096  # rows per chunk
+# seconds `TrajectoryWriter.close` waits for the pending rows to be written
+CLOSE_TIMEOUT = 60
+META_FILE = "meta.json"
+RECORDING_FILE = "recording.json"
+# column prefix of the entries of recorded observation dicts
+OBS_PREFIX = "obs/"
+
+FIXED = "fixed"
+RAGGED = "ragged"
+JSON = "json"
+
+
+@dataclass
+class Column:
+    name: str
+    kind: str
+    dtype: str
+    # shape of a row for fixed columns, trailing shape of the values for ragged ones
+    shape: Tuple[int, ...]
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "kind": self.kind,
+            "dtype": self.dtype,
+            "shape": list(self.shape),
+        }
+
+    @staticmethod
+    def from_dict(d: dict) -> "Column":
+        return Column(d["name"], d["kind"], d["dtype"], tuple(d["shape"]))
+
+
+def _file_name(column: str) -> str:
+    return column.replace("/", "__")
+
+
+def _to_builtin(value: Any) -> Any:
+    # numpy scalars in e.g. reward infos
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+class _ChunkWriter:
+    """
+    Writes rows into one chunk directory.
+    """
+
+    def __init__(self, path: str, columns: Dict[str, Column]):
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.columns = columns
+        self.rows = 0
+
+        self._fixed: Dict[str, np.ndarray] = {}
+        self._offsets: Dict[str, np.ndarray] = {}
+        self._data_files = {}
+
+        for name, column in columns.items():
+            file_path = os.path.join(path, _file_name(name))
+
+            if column.kind == FIXED:
+                self._fixed[name] = np.lib.format.open_memmap(
+                    file_path + ".npy",
+                    mode="w+",
+                    dtype=column.dtype,
+                    shape=(CHUNK_SIZE, *column.shape),
+                )
+            else:
+                self._offsets[name] = np.lib.format.open_memmap(
+                    file_path + ".offsets.npy",
+                    mode="w+",
+                    dtype=np.int64,
+                    shape=(CHUNK_SIZE + 1,),
+                )
+                self._data_files[name] = open(file_path + ".data", "wb")
+
+    @property
+    def full(self) -> bool:
+        return self.rows >= CHUNK_SIZE
+
+    def append(self, row: Dict[str, np.ndarray]):
+        """
+        All values are converted before any of them is written, so a row
+        that can't be converted leaves the chunk unchanged.
+        """
+        fixed: Dict[str, np.ndarray] = {}
+        ragged: Dict[str, Tuple[bytes, int]] = {}
+
+        for name, column in self.columns.items():
+            value = row.get(name)
+
+            if column.kind == FIXED:
+                fixed[name] = np.broadcast_to(
+                    np.asarray(np.nan if value is None else value, dtype=column.dtype),
+                    column.shape,
+                )
+            elif value is None:
+                ragged[name] = (b"", 0)
+            else:
+                value = np.ascontiguousarray(value, dtype=column.dtype)
+                ragged[name] = (value.tobytes(), len(value))
+
+        for name, value in fixed.items():
+            self._fixed[name][self.rows] = value
+
+        for name, (data, length) in ragged.items():
+            offsets = self._offsets[name]
+            self._data_files[name].write(data)
+            offsets[self.rows + 1] = offsets[self.rows] + length
+
+        self.rows += 1
+
+    def commit(self):
+        """Makes the written rows visible to readers."""
+        for data_file in self._data_files.values():
+            data_file.flush()
+        for array in (*self._fixed.values(), *self._offsets.values()):
+            array.flush()
+
+        write_json_atomic(
+            os.path.join(self.path, META_FILE),
+            {
+                "rows": self.rows,
+                "columns": [column.to_dict() for column in self.columns.values()],
+            },
+        )
+
+    def close(self):
+        self.commit()
+        for data_file in self._data_files.values():
+            data_file.close()
+        self._fixed.clear()
+        self._offsets.clear()
+
+
+class TrajectoryWriter:
+    """
+    Writes rows (dicts of column name to value) of a recording in a
+    background thread, `append` only enqueues. Columns are defined by the
+    first row: ndarrays and scalars become fixed shape columns, dicts json
+    columns and names in `ragged_columns` numeric columns with a varying
+    number of values of the given trailing shape per row. Missing values are
+    stored as NaN (fixed) or empty (ragged).
+
+    If the writer falls behind by more than max_queue_size rows, new rows
+    are dropped instead of blocking the caller. Rows that can't be written
+    are logged and skipped.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        ragged_columns: Dict[str, Tuple[int, ...]] = None,
+        metadata: Dict[str, Any] = None,
+        max_queue_size: int = 10000,
+    ):
+        """
+        @metadata: json serializable description of the recording, see `TrajectoryReader.metadata`
+        """
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        if metadata is not None:
+            write_json_atomic(os.path.join(path, RECORDING_FILE), metadata)
+
+        self._ragged_columns = ragged_columns or {}
+
+        self._columns: Optional[Dict[str, Column]] = None
+        self._chunk: Optional[_ChunkWriter] = None
+        self._num_chunks = len(TrajectoryReader.chunk_paths(path))
+        self._dropped = 0
+        self._failed = 0
+
+        self._queue: "queue.Queue[Optional[Tuple[Dict[str, Any], bool]]]" = (
+            queue.Queue(maxsize=max_queue_size)
+        )
+        self._thread = threading.Thread(
+            target=self._run, name="trajectory_writer", daemon=True
+        )
+        self._thread.start()
+
+    @property
+    def dropped(self) -> int:
+        return self._dropped
+
+    @property
+    def failed(self) -> int:
+        """Number of rows that couldn't be written."""
+        return self._failed
+
+    def append(self, row: Dict[str, Any], commit: bool = False):
+        """
+        @row: values must not be modified after appending
+        @commit: make all rows up to this one visible to readers, e.g. at the end of an episode
+        """
+        try:
+            self._queue.put_nowait((row, commit))
+        except queue.Full:
+            self._dropped += 1
+            rospy.logwarn_throttle(
+                60, f"[{self.path}] trajectory writer behind, dropped {self._dropped} rows"
+            )
+
+    def close(self, timeout: float = CLOSE_TIMEOUT):
+        """
+        Writes the pending rows and closes the current chunk, gives up after timeout seconds.
+        """
+        try:
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            rospy.logerr(f"[{self.path}] trajectory writer stuck, pending rows are lost")
+            return
+
+        self._thread.join(timeout=timeout)
+
+        if self._thread.is_alive():
+            rospy.logerr(f"[{self.path}] trajectory writer didn't finish within {timeout}s")
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+
+            if item is None:
+                if self._chunk is not None:
+                    self._chunk.close()
+                return
+
+            row, commit = item
+
+            try:
+                self._write(row)
+            except Exception as e:
+                self._failed += 1
+                rospy.logerr_throttle(
+                    60, f"[{self.path}] Couldn't write row, {self._failed} rows failed: {e}"
+                )
+
+            if commit and self._chunk is not None:
+                try:
+                    self._chunk.commit()
+                except Exception as e:
+                    rospy.logerr(f"[{self.path}] Couldn't commit rows: {e}")
+
+    def _write(self, row: Dict[str, Any]):
+        if self._columns is None:
+            self._columns = self._define_columns(row)
+
+        if self._chunk is None or self._chunk.full:
+            if self._chunk is not None:
+                self._chunk.close()
+            self._chunk = _ChunkWriter(
+                os.path.join(self.path, f"chunk_{self._num_chunks:05d}"),
+                self._columns,
+            )
+            self._num_chunks += 1
+
+        self._chunk.append(
+            {
+                name: self._encode(self._columns[name], value)
+                for name, value in row.items()
+                if name in self._columns
+            }
+        )
+
+    def _define_columns(self, row: Dict[str, Any]) -> Dict[str, Column]:
+        columns = {}
+
+        for name, value in row.items():
+            if isinstance(value, dict):
+                columns[name] = Column(name, JSON, "uint8", ())
+                continue
+
+            if name in self._ragged_columns:
+                columns[name] = Column(
+                    name, RAGGED, "float64", tuple(self._ragged_columns[name])
+                )
+                continue
+
+            value = np.asarray(value)
+            dtype = "float32" if value.dtype == np.float32 else "float64"
+            columns[name] = Column(name, FIXED, dtype, value.shape)
+
+        return columns
+
+    @staticmethod
+    def _encode(column: Column, value: Any) -> Optional[np.ndarray]:
+        if value is None:
+            return None
+
+        if column.kind == JSON:
+            return np.frombuffer(
+                json.dumps(value, default=_to_builtin).encode("utf-8"), dtype=np.uint8
+            )
+
+        value = np.asarray(value, dtype=column.dtype)
+        if column.kind == RAGGED:
+            return value.reshape(-1, *column.shape)
+
+        return value
+
+
+class Episode:
+    """
+    Lazily loaded rows of one episode. Columns are memory mapped views as
+    long as the episode lies in a single chunk.
+    """
+
+    def __init__(self, parts: List[Tuple["_ChunkReader", int, int]]):
+        self._parts = parts
+
+    def __reduce__(self):
+        # pickled as chunk paths, e.g. to be read in worker processes
+        return (
+            Episode._open,
+            ([(chunk.path, start, stop) for chunk, start, stop in self._parts],),
+        )
+
+    @staticmethod
+    def _open(parts: List[Tuple[str, int, int]]) -> "Episode":
+        return Episode([(_ChunkReader(path), start, stop) for path, start, stop in parts])
+
+    def __len__(self) -> int:
+        return sum(stop - start for _, start, stop in self._parts)
+
+    @property
+    def columns(self) -> List[str]:
+        return list(self._parts[0][0].columns)
+
+    def __getitem__(self, column: str) -> Any:
+        """
+        Returns: an array (fixed columns) or a list of per row arrays (ragged) or dicts (json)
+        """
+        values = [chunk.read(column, start, stop) for chunk, start, stop in self._parts]
+
+        if isinstance(values[0], list):
+            return [row for part in values for row in part]
+
+        return values[0] if len(values) == 1 else np.concatenate(values)
+
+
+class _ChunkReader:
+    def __init__(self, path: str):
+        self.path = path
+
+        with open(os.path.join(path, META_FILE), "r", encoding="utf-8") as source:
+            meta = json.load(source)
+
+        self.rows: int = meta["rows"]
+        self.columns: Dict[str, Column] = {
+            column["name"]: Column.from_dict(column) for column in meta["columns"]
+        }
+        self._cache: Dict[str, Any] = {}
+
+    def _open(self, name: str):
+        if name not in self._cache:
+            column = self.columns[name]
+            file_path = os.path.join(self.path, _file_name(name))
+
+            if column.kind == FIXED:
+                self._cache[name] = np.load(file_path + ".npy", mmap_mode="r")
+            else:
+                offsets = np.load(file_path + ".offsets.npy", mmap_mode="r")
+                data = (
+                    np.memmap(file_path + ".data", dtype=column.dtype, mode="r")
+                    if offsets[self.rows] > 0
+                    else np.empty(0, dtype=column.dtype)
+                )
+                self._cache[name] = (offsets, data)
+
+        return self._cache[name]
+
+    def read(self, name: str, start: int, stop: int) -> Any:
+        column = self.columns[name]
+
+        if column.kind == FIXED:
+            return self._open(name)[start:stop]
+
+        offsets, data = self._open(name)
+        item_size = int(np.prod(column.shape, dtype=np.int64))
+        rows = [
+            data[offsets[i] * item_size : offsets[i + 1] * item_size].reshape(
+                -1, *column.shape
+            )
+            for i in range(start, stop)
+        ]
+
+        if column.kind == JSON:
+            return [json.loads(row.tobytes()) if len(row) else None for row in rows]
+
+        return rows
+
+
+class TrajectoryReader:
+    """
+    Iterates the episodes of a recording chunk by chunk. An episode starts
+    at every row whose "step" column is 0 and may span several chunks.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+    @property
+    def metadata(self) -> Dict[str, Any]:
+        """Metadata passed to the `TrajectoryWriter`, empty if there was none."""
+        recording_file = os.path.join(self.path, RECORDING_FILE)
+        if not os.path.isfile(recording_file):
+            return {}
+
+        with open(recording_file, "r", encoding="utf-8") as source:
+            return json.load(source)
+
+    @staticmethod
+    def chunk_paths(path: str) -> List[str]:
+        if not os.path.isdir(path):
+            return []
+
+        return sorted(
+            os.path.join(path, name)
+            for name in os.listdir(path)
+            if name.startswith("chunk_")
+        )
+
+    def chunks(self) -> Iterator[_ChunkReader]:
+        for chunk_path in TrajectoryReader.chunk_paths(self.path):
+            # chunks are only readable once their first rows are committed
+            if os.path.isfile(os.path.join(chunk_path, META_FILE)):
+                yield _ChunkReader(chunk_path)
+
+    def episodes(self) -> Iterator[Episode]:
+        parts: List[Tuple[_ChunkReader, int, int]] = []
+
+        for chunk in self.chunks():
+            if chunk.rows == 0:
+                continue
+
+            steps = chunk.read("step", 0, chunk.rows)
+            # rows before the first start continue the episode of the previous chunk
+            bounds = sorted({0, *np.flatnonzero(steps == 0).tolist(), chunk.rows})
+
+            for start, stop in zip(bounds, bounds[1:]):
+                if steps[start] == 0 and parts:
+                    yield Episode(parts)
+                    parts = []
+
+                parts.append((chunk, start, stop))
+
+        if parts:
+            yield Episode(parts)
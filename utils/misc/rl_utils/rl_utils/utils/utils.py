@@ -1,6 +1,8 @@
+import json
 import rospy
 import rospkg
 import os
+import shutil
 import yaml
 from gym import spaces
 import numpy as np
@@ -21,4 +23,18 @@ def get_trained_models_path():
     )
     
 def remove_double_slash(string: str) -> str:
-    return string.replace("//", "/")
\ No newline at end of file
+    return string.replace("//", "/")
+
+
+def write_json_atomic(path: str, content: dict):
+    """Writes content to a temporary file replacing path, so readers never see a partial file."""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as target:
+        json.dump(content, target)
+    os.replace(tmp_path, path)
+
+
+def copy_file_atomic(source: str, target: str):
+    """Copies source to a temporary file replacing target."""
+    shutil.copyfile(source, target + ".tmp")
+    os.replace(target + ".tmp", target)
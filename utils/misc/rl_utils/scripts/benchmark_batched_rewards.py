@@ -0,0 +1,158 @@
+#! /usr/bin/env python3
+"""
+Compares the speed of the batched reward backend with the per env reward
+functions, tests/test_batched_rewards.py checks that they match. Requires a
+running roscore, the reward functions read /goal_radius on reset.
+"""
+
+import argparse
+import time
+from typing import List
+
+import numpy as np
+from geometry_msgs.msg import Pose2D
+from rl_utils.utils.rewards.batched_reward_function import (
+    BatchedRewardFunction,
+    RewardBatch,
+)
+from rl_utils.utils.rewards.path_distance_index import PathDistanceIndex
+from rl_utils.utils.rewards.reward_function import RewardFunction
+
+ROBOT_RADIUS = 0.3
+GOAL_RADIUS = 0.3
+SAFE_DIST = 0.5
+
+
+class RandomEpisodes:
+    """
+    Random observations of N envs: laser scans occasionally violating the
+    safe distance or colliding, a robot moving along a random global plan
+    and random actions.
+    """
+
+    def __init__(self, num_envs: int, num_beams: int, seed: int):
+        self.rng = np.random.default_rng(seed)
+        self.num_envs = num_envs
+        self.num_beams = num_beams
+        self.plans = [None] * num_envs
+        self.distance_to_goal = np.zeros(num_envs)
+        self.new_episodes(np.arange(num_envs))
+
+    def new_episodes(self, env_indices: np.ndarray):
+        for env_idx in env_indices:
+            # some envs have no global plan
+            self.plans[env_idx] = (
+                np.cumsum(self.rng.normal(0, 0.2, (50, 2)), axis=0)
+                if self.rng.random() > 0.2
+                else np.array([])
+            )
+            self.distance_to_goal[env_idx] = self.rng.uniform(1, 10)
+
+    def step(self):
+        laser_scan = self.rng.uniform(0.6, 5.0, (self.num_envs, self.num_beams))
+        # close obstacles in some envs
+        close = self.rng.random(self.num_envs) < 0.2
+        laser_scan[close, 0] = self.rng.uniform(0.2, 0.6, close.sum())
+        action = self.rng.uniform(-1, 1, (self.num_envs, 3))
+        # repeated actions keep the velocity change reward at 0 sometimes
+        action[self.rng.random(self.num_envs) < 0.1] = 0
+        self.distance_to_goal = np.maximum(
+            self.distance_to_goal + self.rng.normal(-0.1, 0.1, self.num_envs), 0
+        )
+        robot_poses = self.rng.normal(0, 2, (self.num_envs, 2))
+        return laser_scan, action, self.distance_to_goal.copy(), robot_poses
+
+
+def distance_to_path(
+    path_indices: List[PathDistanceIndex],
+    plans: List[np.ndarray],
+    robot_poses: np.ndarray,
+) -> np.ndarray:
+    distances = np.full(len(plans), np.nan)
+
+    for i, (path_index, plan, (x, y)) in enumerate(
+        zip(path_indices, plans, robot_poses)
+    ):
+        if len(plan) > 0:
+            path_index.update(plan)
+            distances[i] = path_index.distance(x, y)
+
+    return distances
+
+
+def to_pose(xy: np.ndarray) -> Pose2D:
+    pose = Pose2D()
+    pose.x, pose.y = xy
+    return pose
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--reward_fnc", type=str, default="rule_13")
+    parser.add_argument("--n_envs", type=int, nargs="+", default=[8, 32, 128])
+    parser.add_argument("--num_beams", type=int, default=360)
+    parser.add_argument("--steps", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"{'envs':>6} {'per env [ms]':>13} {'batched [ms]':>13} {'speedup':>10}")
+
+    for num_envs in args.n_envs:
+        episodes = RandomEpisodes(num_envs, args.num_beams, args.seed)
+
+        reward_functions = [
+            RewardFunction(args.reward_fnc, ROBOT_RADIUS, GOAL_RADIUS, SAFE_DIST)
+            for _ in range(num_envs)
+        ]
+        batched = BatchedRewardFunction(
+            args.reward_fnc, num_envs, ROBOT_RADIUS, GOAL_RADIUS, SAFE_DIST
+        )
+
+        path_indices = [PathDistanceIndex() for _ in range(num_envs)]
+
+        per_env_time = batched_time = 0.0
+
+        for _ in range(args.steps):
+            laser_scan, action, distance_to_goal, robot_poses = episodes.step()
+
+            start = time.perf_counter()
+            for i, reward_function in enumerate(reward_functions):
+                reward_function.get_reward(
+                    laser_scan=laser_scan[i],
+                    action=action[i],
+                    distance_to_goal=distance_to_goal[i],
+                    global_plan=episodes.plans[i],
+                    robot_pose=to_pose(robot_poses[i]),
+                )
+            per_env_time += time.perf_counter() - start
+
+            # an input of the batched backend, not part of the reward computation
+            batch_distance_to_path = distance_to_path(
+                path_indices, episodes.plans, robot_poses
+            )
+
+            start = time.perf_counter()
+            batch = RewardBatch(
+                laser_scan=laser_scan,
+                distance_to_goal=distance_to_goal,
+                action=action,
+                distance_to_path=batch_distance_to_path,
+            )
+            _, infos = batched.get_reward(batch)
+            batched_time += time.perf_counter() - start
+
+            done = np.flatnonzero([info.get("is_done", False) for info in infos])
+            if len(done) > 0:
+                for i in done:
+                    reward_functions[i].reset()
+                batched.reset(done)
+                episodes.new_episodes(done)
+
+        print(
+            f"{num_envs:>6} {per_env_time / args.steps * 1000:>13.3f} "
+            f"{batched_time / args.steps * 1000:>13.3f} {per_env_time / batched_time:>10.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
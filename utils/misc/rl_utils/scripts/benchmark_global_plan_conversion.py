@@ -0,0 +1,93 @@
+#! /usr/bin/env python3
+"""
+Compares the conversion of global plan messages into (n, 2) arrays before
+and after skipping the orientations, with and without arc length
+downsampling.
+"""
+
+import argparse
+import time
+
+import numpy as np
+from geometry_msgs.msg import PoseStamped
+from nav_msgs.msg import Path
+from rl_utils.utils.observation_collector.observation_units.globalplan_collector_unit import (
+    GlobalplanCollectorUnit,
+)
+from rl_utils.utils.observation_collector.utils import pose3d_to_pose2d
+
+
+def legacy_process_global_plan_msg(globalplan_msg: Path) -> np.ndarray:
+    # conversion before the orientation was skipped
+    global_plan_2d = list(
+        map(
+            lambda p: pose3d_to_pose2d(p.pose),
+            globalplan_msg.poses,
+        )
+    )
+    return np.array(list(map(lambda p2d: [p2d.x, p2d.y], global_plan_2d)))
+
+
+def generate_plan(num_poses: int, seed: int) -> Path:
+    """
+    Generates a smooth random walk with move_base like spacing of ~2.5cm.
+    """
+    rng = np.random.default_rng(seed)
+    heading = np.cumsum(rng.normal(0, 0.05, num_poses))
+    points = np.cumsum(0.025 * np.stack([np.cos(heading), np.sin(heading)], 1), 0)
+
+    msg = Path()
+    for (x, y), theta in zip(points, heading):
+        pose_stamped = PoseStamped()
+        pose_stamped.pose.position.x, pose_stamped.pose.position.y = x, y
+        pose_stamped.pose.orientation.z = np.sin(theta / 2)
+        pose_stamped.pose.orientation.w = np.cos(theta / 2)
+        msg.poses.append(pose_stamped)
+
+    return msg
+
+
+def benchmark(convert, msg: Path, repetitions: int) -> float:
+    start = time.perf_counter()
+
+    for _ in range(repetitions):
+        convert(msg)
+
+    return (time.perf_counter() - start) / repetitions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--poses", type=int, nargs="+", default=[1000, 5000])
+    parser.add_argument("--downsample_distance", type=float, default=0.2)
+    parser.add_argument("--repetitions", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print(
+        f"{'poses':>6} {'legacy [ms]':>12} {'direct [ms]':>12} {'speedup':>8} "
+        f"{'downsampled [ms]':>17} {'kept poses':>11}"
+    )
+
+    for num_poses in args.poses:
+        msg = generate_plan(num_poses, args.seed)
+
+        assert np.array_equal(
+            legacy_process_global_plan_msg(msg),
+            GlobalplanCollectorUnit.process_global_plan_msg(msg),
+        ), "direct conversion differs from the legacy conversion"
+
+        downsample = lambda m: GlobalplanCollectorUnit.process_global_plan_msg(
+            m, downsample_distance=args.downsample_distance
+        )
+
+        legacy = benchmark(legacy_process_global_plan_msg, msg, args.repetitions)
+        direct = benchmark(
+            GlobalplanCollectorUnit.process_global_plan_msg, msg, args.repetitions
+        )
+        downsampled = benchmark(downsample, msg, args.repetitions)
+
+        print(
+            f"{num_poses:>6} {legacy * 1000:>12.3f} {direct * 1000:>12.3f} "
+            f"{legacy / direct:>8.1f} {downsampled * 1000:>17.3f} {len(downsample(msg)):>11}"
+        )
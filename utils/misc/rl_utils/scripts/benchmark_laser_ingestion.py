@@ -0,0 +1,78 @@
+#! /usr/bin/env python3
+
+import argparse
+import time
+from io import BytesIO
+
+import numpy as np
+from rl_utils.utils.observation_collector.observation_units.base_collector_unit import (
+    BaseCollectorUnit,
+)
+from rl_utils.utils.observation_collector.raw_laser import RawLaserScanBuffer
+from sensor_msgs.msg import LaserScan
+
+
+def serialized_scan(num_beams: int, nan_ratio: float, seed: int) -> bytes:
+    """
+    Serializes a laser scan with random ranges, nan_ratio of them being NaN.
+    """
+    rng = np.random.default_rng(seed)
+
+    ranges = rng.uniform(0.1, 8.0, num_beams)
+    ranges[rng.random(num_beams) < nan_ratio] = np.nan
+
+    scan = LaserScan()
+    scan.header.frame_id = "laser"
+    scan.angle_min, scan.angle_max = -np.pi, np.pi
+    scan.angle_increment = 2 * np.pi / num_beams
+    scan.range_min, scan.range_max = 0.1, 8.0
+    scan.ranges = ranges.tolist()
+
+    buff = BytesIO()
+    scan.serialize(buff)
+    return buff.getvalue()
+
+
+def deserializing_path(buff: bytes, num_beams: int) -> np.ndarray:
+    # what rospy does for a typed subscriber followed by the collector callback
+    laser_msg = LaserScan().deserialize(buff)
+    return BaseCollectorUnit.process_laser_msg(laser_msg, num_beams)
+
+
+def benchmark(ingest, repetitions: int) -> float:
+    start = time.perf_counter()
+
+    for _ in range(repetitions):
+        ingest()
+
+    return (time.perf_counter() - start) / repetitions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Compares the laser ingestion of the deserializing and the raw subscription path."
+    )
+    parser.add_argument("--beams", type=int, nargs="+", default=[360, 1080])
+    parser.add_argument("--nan-ratio", type=float, default=0.1)
+    parser.add_argument("--repetitions", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"{'beams':>6} {'deserialize [us]':>17} {'raw [us]':>10} {'speedup':>10}")
+
+    for num_beams in args.beams:
+        buff = serialized_scan(num_beams, args.nan_ratio, args.seed)
+        raw_laser = RawLaserScanBuffer(num_beams)
+
+        assert np.array_equal(
+            deserializing_path(buff, num_beams), raw_laser.read(buff)[0]
+        ), "raw path differs from the deserializing path"
+
+        deserializing = benchmark(
+            lambda: deserializing_path(buff, num_beams), args.repetitions
+        )
+        raw = benchmark(lambda: raw_laser.read(buff), args.repetitions)
+
+        print(
+            f"{num_beams:>6} {deserializing * 1e6:>17.2f} {raw * 1e6:>10.2f} {deserializing / raw:>10.1f}"
+        )
@@ -0,0 +1,372 @@
+#! /usr/bin/env python3
+"""
+Per call latency and memory allocation of the reward units and the
+observation processing, built from synthetic laser scans, plans and poses.
+Runs without a ROS master, the ros parameters are served from PARAMS.
+
+Save a baseline to the --baseline file with --save_baseline and compare
+later runs against it, cases whose fastest round is slower or that allocate
+more than --tolerance are reported as regressions (exit code 1 with
+--fail_on_regression). Baselines are machine specific, keep them outside of
+the package, e.g. with the CI artifacts.
+"""
+
+import argparse
+import itertools
+import json
+import os
+import time
+import tracemalloc
+import warnings
+from typing import Any, Callable, Dict, List
+from unittest import mock
+
+import numpy as np
+import rospy
+
+# served instead of the parameter server, e.g. for tools.constants
+PARAMS = {
+    "robot_model": "jackal",
+    "goal_radius": 0.3,
+    "laser/num_beams": 360,
+}
+_MISSING = object()
+
+
+def _get_param(name: str, default: Any = _MISSING) -> Any:
+    key = name.lstrip("/")
+    if key in PARAMS:
+        return PARAMS[key]
+    if default is _MISSING:
+        raise KeyError(name)
+    return default
+
+
+rospy.get_param = _get_param
+
+from geometry_msgs.msg import Pose2D  # noqa: E402
+from rl_utils.utils.observation_collector.observation_units.base_collector_unit import (  # noqa: E402
+    BaseCollectorUnit,
+)
+from rl_utils.utils.observation_collector.utils import (  # noqa: E402
+    get_goal_pose_in_robot_frame,
+)
+from rl_utils.utils.rewards import reward_function as reward_function_module  # noqa: E402
+from rl_utils.utils.rewards.reward_function import RewardFunction  # noqa: E402
+from sensor_msgs.msg import LaserScan  # noqa: E402
+
+ROBOT_RADIUS = 0.3
+SAFE_DIST = 0.5
+NUM_BEAMS = PARAMS["laser/num_beams"]
+# synthetic inputs each case cycles through
+NUM_SAMPLES = 64
+
+BENCHMARKS: Dict[str, Callable[[np.random.Generator], Callable[[], Any]]] = {}
+
+
+def benchmark(name: str):
+    """Registers a setup function returning the callable to measure."""
+
+    def register(setup):
+        BENCHMARKS[name] = setup
+        return setup
+
+    return register
+
+
+def laser_scans(rng: np.random.Generator) -> List[np.ndarray]:
+    scans = rng.uniform(0.6, 5.0, (NUM_SAMPLES, NUM_BEAMS)).astype(np.float32)
+    # some scans violate the safe distance or collide
+    close = rng.random(NUM_SAMPLES) < 0.2
+    scans[close, rng.integers(0, NUM_BEAMS, close.sum())] = rng.uniform(
+        0.1, 0.6, close.sum()
+    )
+    return list(scans)
+
+
+def poses(rng: np.random.Generator, scale: float = 10.0) -> List[Pose2D]:
+    return [
+        Pose2D(x=x, y=y, theta=theta)
+        for x, y, theta in zip(
+            rng.uniform(-scale, scale, NUM_SAMPLES),
+            rng.uniform(-scale, scale, NUM_SAMPLES),
+            rng.uniform(-np.pi, np.pi, NUM_SAMPLES),
+        )
+    ]
+
+
+def global_plan(rng: np.random.Generator, length: int = 500) -> np.ndarray:
+    # evenly spaced points like move_base plans
+    headings = np.cumsum(rng.normal(0, 0.05, length))
+    steps = 0.05 * np.stack((np.cos(headings), np.sin(headings)), axis=1)
+    return np.cumsum(steps, axis=0)
+
+
+def reward_function(units: Dict[str, dict]) -> RewardFunction:
+    """RewardFunction of the given units instead of a reward function yaml."""
+    with mock.patch.object(reward_function_module, "load_rew_fnc", return_value=units):
+        reward_function = RewardFunction(
+            rew_func_name="benchmark",
+            robot_radius=ROBOT_RADIUS,
+            goal_radius=PARAMS["goal_radius"],
+            safe_dist=SAFE_DIST,
+        )
+    reward_function.reset(goal_radius=PARAMS["goal_radius"])
+    return reward_function
+
+
+def unit_call(unit_name: str, rng: np.random.Generator, **unit_kwargs):
+    """
+    Calls a single unit like `RewardFunction.calculate_reward` does, i.e.
+    with the per step state of the reward function reset.
+    """
+    function = reward_function({unit_name: unit_kwargs})
+    unit = function._reward_units[0]
+
+    plan = global_plan(rng)
+    # robot poses close to the plan
+    on_plan = plan[rng.integers(0, len(plan), NUM_SAMPLES)]
+    offsets = rng.normal(0, 0.3, (NUM_SAMPLES, 2))
+    robot_poses = [Pose2D(x=x, y=y, theta=0.0) for x, y in on_plan + offsets]
+    samples = itertools.cycle(
+        [
+            {
+                "laser_scan": laser_scan,
+                "action": action,
+                "distance_to_goal": distance_to_goal,
+                "global_plan": plan,
+                "robot_pose": robot_pose,
+            }
+            for laser_scan, action, distance_to_goal, robot_pose in zip(
+                laser_scans(rng),
+                rng.uniform(-1, 1, (NUM_SAMPLES, 3)),
+                rng.uniform(0, 10, NUM_SAMPLES),
+                robot_poses,
+            )
+        ]
+    )
+
+    def call():
+        function._reset()
+        unit(**next(samples))
+
+    return call
+
+
+@benchmark("reward/collision")
+def collision(rng):
+    return unit_call("collision", rng)
+
+
+@benchmark("reward/safe_distance")
+def safe_distance(rng):
+    return unit_call("safe_distance", rng)
+
+
+@benchmark("reward/abrupt_velocity_change")
+def abrupt_velocity_change(rng):
+    return unit_call("abrupt_velocity_change", rng)
+
+
+@benchmark("reward/approach_globalplan")
+def approach_globalplan(rng):
+    return unit_call("approach_globalplan", rng)
+
+
+@benchmark("reward/follow_globalplan")
+def follow_globalplan(rng):
+    return unit_call("follow_globalplan", rng)
+
+
+@benchmark("reward/all_units")
+def all_units(rng):
+    import rl_utils.utils.rewards as rew_pkg
+
+    with warnings.catch_warnings():
+        # parameter checks of the default values
+        warnings.simplefilter("ignore")
+        function = reward_function(
+            {unit_name: {} for unit_name in rew_pkg.RewardUnitFactory.registry}
+        )
+    plan = global_plan(rng)
+    samples = itertools.cycle(
+        [
+            {
+                "laser_scan": laser_scan,
+                "action": action,
+                "distance_to_goal": distance_to_goal,
+                "global_plan": plan,
+                "robot_pose": robot_pose,
+            }
+            for laser_scan, action, distance_to_goal, robot_pose in zip(
+                laser_scans(rng),
+                rng.uniform(-1, 1, (NUM_SAMPLES, 3)),
+                rng.uniform(0.5, 10, NUM_SAMPLES),
+                poses(rng, scale=1.0),
+            )
+        ]
+    )
+
+    return lambda: function.get_reward(**next(samples))
+
+
+@benchmark("observation/goal_pose_in_robot_frame")
+def goal_pose_in_robot_frame(rng):
+    samples = itertools.cycle(list(zip(poses(rng), poses(rng))))
+
+    def call():
+        goal_pos, robot_pos = next(samples)
+        return get_goal_pose_in_robot_frame(goal_pos=goal_pos, robot_pos=robot_pos)
+
+    return call
+
+
+@benchmark("observation/process_laser_msg")
+def process_laser_msg(rng):
+    messages = []
+    for laser_scan in laser_scans(rng):
+        # out of range beams are NaN
+        laser_scan[rng.random(NUM_BEAMS) < 0.1] = np.nan
+        msg = LaserScan()
+        msg.range_max = 5.0
+        # deserialized messages hold tuples of python floats
+        msg.ranges = tuple(laser_scan.tolist())
+        messages.append(msg)
+    samples = itertools.cycle(messages)
+
+    return lambda: BaseCollectorUnit.process_laser_msg(
+        laser_msg=next(samples), laser_num_beams=NUM_BEAMS
+    )
+
+
+def measure(
+    call: Callable[[], Any], repeat: int, min_time: float, alloc_calls: int
+) -> Dict[str, float]:
+    """
+    Returns: median and min time per call of `repeat` rounds of at least
+    min_time seconds and the median peak of memory allocated during a call
+    """
+    for _ in range(NUM_SAMPLES):
+        call()
+
+    # calls per round to take about min_time
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            call()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time / 10:
+            break
+        number *= 2
+    number = max(1, round(number * min_time / elapsed))
+
+    rounds = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            call()
+        rounds.append((time.perf_counter() - start) / number)
+
+    peaks = []
+    for _ in range(alloc_calls):
+        # restarted instead of tracemalloc.reset_peak, which needs python 3.9
+        tracemalloc.start()
+        call()
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+
+    return {
+        "median_us": float(np.median(rounds)) * 1e6,
+        "min_us": float(np.min(rounds)) * 1e6,
+        "alloc_peak_bytes": float(np.median(peaks)),
+        "calls_per_round": number,
+    }
+
+
+def compare(
+    results: Dict[str, Dict[str, float]],
+    baseline: Dict[str, Dict[str, float]],
+    tolerance: float,
+) -> List[str]:
+    """Returns: names of the cases regressed against the baseline"""
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        # the fastest round is the least disturbed by other processes
+        slower = result["min_us"] > baseline[name]["min_us"] * (1 + tolerance)
+        # small absolute differences are noise of the interpreter
+        more_memory = result["alloc_peak_bytes"] > max(
+            baseline[name]["alloc_peak_bytes"] * (1 + tolerance),
+            baseline[name]["alloc_peak_bytes"] + 256,
+        )
+        if slower or more_memory:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--filter", type=str, default="", help="run cases containing this")
+    parser.add_argument("--repeat", type=int, default=7)
+    parser.add_argument("--min_time", type=float, default=0.2, help="seconds per round")
+    parser.add_argument("--alloc_calls", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--baseline", type=str, required=True, help="baseline json file to compare with or save to"
+    )
+    parser.add_argument("--save_baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    parser.add_argument("--fail_on_regression", action="store_true")
+    args = parser.parse_args()
+
+    baseline = {}
+    if os.path.isfile(args.baseline) and not args.save_baseline:
+        with open(args.baseline, "r", encoding="utf-8") as source:
+            baseline = json.load(source)["results"]
+
+    print(
+        f"{'case':40s} {'median [us]':>12} {'min [us]':>10} {'alloc [B]':>10} {'vs. baseline':>13}"
+    )
+
+    results = {}
+    for name, setup in BENCHMARKS.items():
+        if args.filter not in name:
+            continue
+
+        result = measure(
+            setup(np.random.default_rng(args.seed)),
+            args.repeat,
+            args.min_time,
+            args.alloc_calls,
+        )
+        results[name] = result
+
+        change = (
+            f"{(result['min_us'] / baseline[name]['min_us'] - 1) * 100:+12.1f}%"
+            if name in baseline
+            else f"{'-':>13}"
+        )
+        print(
+            f"{name:40s} {result['median_us']:>12.2f} {result['min_us']:>10.2f} "
+            f"{result['alloc_peak_bytes']:>10.0f} {change}"
+        )
+
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as target:
+            json.dump(
+                {"numpy": np.__version__, "results": results}, target, indent=2
+            )
+        print(f"Saved baseline to {args.baseline}")
+        return
+
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        print(f"Regressions (> {args.tolerance:.0%}): {', '.join(regressions)}")
+        if args.fail_on_regression:
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+#! /usr/bin/env python3
+"""
+Re-scores recorded training trajectories (monitoring.record_trajectories)
+with one or more reward functions and prints per reward function the
+episode rewards, the mean reward of every unit and how the done reasons
+change compared to the recording. Runs without a simulator or roscore.
+"""
+
+import argparse
+import json
+import time
+from dataclasses import asdict
+
+from rl_utils.utils.rewards.rescoring import (
+    ScoringConfig,
+    recordings,
+    rescore,
+    summarize,
+)
+from rl_utils.utils.trajectory_storage import TrajectoryReader
+
+
+def print_summary(summary: dict):
+    for reward_fnc, stats in summary.items():
+        print(f"\n{reward_fnc} ({stats['episodes']} episodes)")
+        print(
+            f"  reward: {stats['reward_mean']:.3f} +- {stats['reward_std']:.3f} "
+            f"[{stats['reward_min']:.3f}, {stats['reward_max']:.3f}], "
+            f"recorded: {stats['recorded_reward_mean']:.3f}"
+        )
+        for unit_name, unit_reward in stats["unit_reward_means"].items():
+            print(f"  {unit_name:30s}{unit_reward:>10.3f}")
+        print(f"  done reasons: {stats['done_reasons']}")
+        print(f"  changed: {stats['done_reason_changes'] or 'none'}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "recordings",
+        type=str,
+        nargs="+",
+        help="recording directories or directories containing recordings",
+    )
+    parser.add_argument("--reward_fnc", type=str, nargs="+", required=True)
+    parser.add_argument("--processes", type=int, default=None)
+    parser.add_argument(
+        "--robot_radius",
+        type=float,
+        default=None,
+        help="defaults to the value stored in the recording",
+    )
+    parser.add_argument(
+        "--safe_dist",
+        type=float,
+        default=None,
+        help="defaults to the value stored in the recording",
+    )
+    parser.add_argument(
+        "--max_steps",
+        type=int,
+        default=None,
+        help="defaults to the value stored in the recording",
+    )
+    parser.add_argument("--output", type=str, default=None, help="json file for all scores")
+    args = parser.parse_args()
+
+    recording_paths = [
+        recording for path in args.recordings for recording in recordings(path)
+    ]
+    if not recording_paths:
+        raise FileNotFoundError(f"No recordings found in {args.recordings}")
+
+    metadata = TrajectoryReader(recording_paths[0]).metadata
+    config = ScoringConfig(
+        reward_fncs=args.reward_fnc,
+        robot_radius=args.robot_radius or metadata["robot_radius"],
+        safe_dist=args.safe_dist or metadata["safe_dist"],
+        max_steps_per_episode=args.max_steps or metadata["max_steps_per_episode"],
+    )
+
+    start = time.perf_counter()
+    scores = rescore(recording_paths, config, processes=args.processes)
+    print(
+        f"Scored {len(scores) // len(args.reward_fnc)} episodes of "
+        f"{len(recording_paths)} recordings in {time.perf_counter() - start:.1f}s"
+    )
+
+    summary = summarize(scores)
+    print_summary(summary)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as target:
+            json.dump(
+                {"summary": summary, "episodes": [asdict(score) for score in scores]},
+                target,
+                indent=2,
+            )
+
+
+if __name__ == "__main__":
+    main()
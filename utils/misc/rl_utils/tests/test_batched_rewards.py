@@ -0,0 +1,168 @@
+import copy
+
+import numpy as np
+import pytest
+
+rospy = pytest.importorskip("rospy")
+pytest.importorskip("geometry_msgs")
+
+from geometry_msgs.msg import Pose2D
+from rl_utils.utils.rewards import batched_reward_function, reward_function
+from rl_utils.utils.rewards.batched_reward_function import (
+    BatchedRewardFunction,
+    RewardBatch,
+)
+from rl_utils.utils.rewards.path_distance_index import PathDistanceIndex
+from rl_utils.utils.rewards.reward_function import RewardFunction
+from rl_utils.utils.rewards.utils import load_rew_fnc
+
+ROBOT_RADIUS = 0.3
+GOAL_RADIUS = 0.3
+SAFE_DIST = 0.5
+
+NUM_ENVS = 16
+NUM_BEAMS = 36
+STEPS = 200
+
+# units whose flag is fixed, they always run on safe distance violations
+ALWAYS_ACTIVE_UNITS = {"safe_distance", "collision"}
+
+
+def rule_13() -> dict:
+    return load_rew_fnc("rule_13")
+
+
+def flipped_flags() -> dict:
+    config = rule_13()
+    units = RewardFunction("rule_13", ROBOT_RADIUS, GOAL_RADIUS, SAFE_DIST)._reward_units
+
+    for (unit_name, kwargs), unit in zip(config.items(), units):
+        if unit_name not in ALWAYS_ACTIVE_UNITS:
+            kwargs["_on_safe_dist_violation"] = not unit.on_safe_dist_violation
+    return config
+
+
+def reordered_subset() -> dict:
+    config = rule_13()
+    return {
+        unit_name: config[unit_name]
+        for unit_name in [
+            "follow_globalplan",
+            "abrupt_velocity_change",
+            "collision",
+            "approach_globalplan",
+            "safe_distance",
+            "goal_reached",
+            "no_movement",
+        ]
+    }
+
+
+class RandomEpisodes:
+    """
+    Random observations of N envs: laser scans occasionally violating the
+    safe distance or colliding, a robot moving along a random global plan
+    and random actions.
+    """
+
+    def __init__(self, num_envs: int, num_beams: int, seed: int):
+        self.rng = np.random.default_rng(seed)
+        self.num_envs = num_envs
+        self.num_beams = num_beams
+        self.plans = [None] * num_envs
+        self.distance_to_goal = np.zeros(num_envs)
+        self.new_episodes(np.arange(num_envs))
+
+    def new_episodes(self, env_indices: np.ndarray):
+        for env_idx in env_indices:
+            # some envs have no global plan
+            self.plans[env_idx] = (
+                np.cumsum(self.rng.normal(0, 0.2, (50, 2)), axis=0)
+                if self.rng.random() > 0.2
+                else np.array([])
+            )
+            self.distance_to_goal[env_idx] = self.rng.uniform(1, 10)
+
+    def step(self):
+        laser_scan = self.rng.uniform(0.6, 5.0, (self.num_envs, self.num_beams))
+        # close obstacles in some envs
+        close = self.rng.random(self.num_envs) < 0.2
+        laser_scan[close, 0] = self.rng.uniform(0.2, 0.6, close.sum())
+        action = self.rng.uniform(-1, 1, (self.num_envs, 3))
+        # repeated actions keep the velocity change reward at 0 sometimes
+        action[self.rng.random(self.num_envs) < 0.1] = 0
+        self.distance_to_goal = np.maximum(
+            self.distance_to_goal + self.rng.normal(-0.1, 0.1, self.num_envs), 0
+        )
+        robot_poses = self.rng.normal(0, 2, (self.num_envs, 2))
+        return laser_scan, action, self.distance_to_goal.copy(), robot_poses
+
+
+@pytest.fixture(autouse=True)
+def params(monkeypatch):
+    params = {"/goal_radius": GOAL_RADIUS}
+    monkeypatch.setattr(
+        rospy, "get_param", lambda param_name, default=None: params.get(param_name, default)
+    )
+
+
+@pytest.mark.parametrize(
+    "make_config",
+    [rule_13, flipped_flags, reordered_subset],
+    ids=["rule_13", "flipped_flags", "reordered_subset"],
+)
+def test_matches_per_env_reward_functions(monkeypatch, make_config):
+    config = make_config()
+    load = lambda config_name: copy.deepcopy(config)
+    monkeypatch.setattr(reward_function, "load_rew_fnc", load)
+    monkeypatch.setattr(batched_reward_function, "load_rew_fnc", load)
+
+    episodes = RandomEpisodes(NUM_ENVS, NUM_BEAMS, seed=0)
+    reward_functions = [
+        RewardFunction("test", ROBOT_RADIUS, GOAL_RADIUS, SAFE_DIST)
+        for _ in range(NUM_ENVS)
+    ]
+    batched = BatchedRewardFunction("test", NUM_ENVS, ROBOT_RADIUS, GOAL_RADIUS, SAFE_DIST)
+    path_indices = [PathDistanceIndex() for _ in range(NUM_ENVS)]
+
+    for _ in range(STEPS):
+        laser_scan, action, distance_to_goal, robot_poses = episodes.step()
+
+        expected = [
+            reward_function.get_reward(
+                laser_scan=laser_scan[i],
+                action=action[i],
+                distance_to_goal=distance_to_goal[i],
+                global_plan=episodes.plans[i],
+                robot_pose=Pose2D(x=robot_poses[i, 0], y=robot_poses[i, 1]),
+            )
+            for i, reward_function in enumerate(reward_functions)
+        ]
+
+        distance_to_path = np.full(NUM_ENVS, np.nan)
+        for i, (path_index, plan, (x, y)) in enumerate(
+            zip(path_indices, episodes.plans, robot_poses)
+        ):
+            if len(plan) > 0:
+                path_index.update(plan)
+                distance_to_path[i] = path_index.distance(x, y)
+
+        rewards, infos = batched.get_reward(
+            RewardBatch(
+                laser_scan=laser_scan,
+                distance_to_goal=distance_to_goal,
+                action=action,
+                distance_to_path=distance_to_path,
+            )
+        )
+
+        for i, (reward, info) in enumerate(expected):
+            assert rewards[i] == pytest.approx(reward, rel=0, abs=1e-9), f"env {i}"
+            assert infos[i] == info, f"env {i}"
+
+        done = np.flatnonzero([info.get("is_done", False) for info in infos])
+        if len(done) > 0:
+            for i in done:
+                reward_functions[i].reset()
+            batched.reset(done)
+            episodes.new_episodes(done)
@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+
+from rl_utils.utils.rewards.path_distance_index import PathDistanceIndex
+
+
+def brute_force_distance(plan: np.ndarray, x: float, y: float) -> float:
+    point = np.array([x, y])
+    if len(plan) == 1:
+        return float(np.linalg.norm(point - plan[0]))
+
+    distances = []
+    for start, end in zip(plan[:-1], plan[1:]):
+        direction = end - start
+        squared_length = direction @ direction
+        t = 0.0
+        if squared_length > 0:
+            t = np.clip((point - start) @ direction / squared_length, 0, 1)
+        distances.append(np.linalg.norm(start + t * direction - point))
+    return float(min(distances))
+
+
+@pytest.mark.parametrize(
+    "plan",
+    [
+        np.array([[1.0, 2.0]]),
+        np.array([[1.0, 2.0], [1.0, 2.0], [1.0, 2.0]]),
+        np.array([[0.0, 0.0], [0.0, 0.0], [1.0, 0.0], [1.0, 0.0], [1.0, 1.0]]),
+    ],
+    ids=["single_point", "duplicate_points", "duplicate_segments"],
+)
+def test_degenerate_plans(plan):
+    index = PathDistanceIndex()
+    index.update(plan)
+
+    for x, y in [(1.0, 2.0), (0.3, -0.7), (5.0, 5.0)]:
+        assert index.distance(x, y) == pytest.approx(brute_force_distance(plan, x, y))
+
+
+def test_random_plans():
+    rng = np.random.default_rng(0)
+    index = PathDistanceIndex()
+
+    for _ in range(20):
+        plan = np.cumsum(rng.normal(size=(rng.integers(2, 50), 2)), axis=0)
+        index.update(plan)
+
+        for x, y in rng.normal(scale=5, size=(20, 2)):
+            assert index.distance(x, y) == pytest.approx(brute_force_distance(plan, x, y))
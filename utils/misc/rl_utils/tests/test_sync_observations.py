@@ -0,0 +1,137 @@
+import multiprocessing
+import threading
+import time
+
+import pytest
+
+rospy = pytest.importorskip("rospy")
+rosgraph = pytest.importorskip("rosgraph")
+
+from rl_utils.utils.observation_collector.constants import TOPICS
+from rl_utils.utils.observation_collector.observation_units.base_collector_unit import (
+    BaseCollectorUnit,
+)
+from task_generator.shared import Namespace
+
+NS = Namespace("/sync_observations_test")
+
+pytestmark = pytest.mark.skipif(
+    not rosgraph.is_master_online(), reason="integration test, needs a ROS master"
+)
+
+
+def _fake_sensor_node(commands: multiprocessing.Queue, ready: multiprocessing.Event):
+    """
+    Publishes the sensor topics of a robot with the stamps sent through
+    commands as (topic, secs), until None is sent.
+    """
+    from geometry_msgs.msg import PoseStamped
+    from nav_msgs.msg import Odometry
+    from sensor_msgs.msg import LaserScan
+
+    rospy.init_node("fake_sensors", anonymous=True)
+
+    publishers = {
+        TOPICS.LASER: (rospy.Publisher(NS(TOPICS.LASER), LaserScan, queue_size=10), LaserScan),
+        TOPICS.ROBOT_STATE: (rospy.Publisher(NS(TOPICS.ROBOT_STATE), Odometry, queue_size=10), Odometry),
+        TOPICS.GOAL: (rospy.Publisher(NS(TOPICS.GOAL), PoseStamped, queue_size=10), PoseStamped),
+    }
+
+    while not all(pub.get_num_connections() > 0 for pub, _ in publishers.values()):
+        time.sleep(0.01)
+    ready.set()
+
+    for command in iter(commands.get, None):
+        topic, secs = command
+        pub, msg_type = publishers[topic]
+
+        msg = msg_type()
+        msg.header.stamp = rospy.Time.from_sec(secs)
+        if msg_type is LaserScan:
+            msg.ranges = [1.0] * 4
+            msg.range_max = 10.0
+        elif msg_type is Odometry:
+            msg.pose.pose.orientation.w = 1.0
+        else:
+            msg.pose.orientation.w = 1.0
+        pub.publish(msg)
+
+
+@pytest.fixture(scope="module")
+def collector():
+    rospy.init_node("test_sync_observations", anonymous=True)
+    rospy.set_param("laser/num_beams", 4)
+
+    unit = BaseCollectorUnit(NS, None)
+    unit.init_subs()
+    unit._first_reset = False
+
+    return unit
+
+
+@pytest.fixture(scope="module")
+def publish(collector):
+    context = multiprocessing.get_context("spawn")
+    commands, ready = context.Queue(), context.Event()
+
+    node = context.Process(target=_fake_sensor_node, args=(commands, ready), daemon=True)
+    node.start()
+    assert ready.wait(timeout=30), "fake sensor node didn't connect"
+
+    def publish(topic: str, secs: float):
+        commands.put((topic, secs))
+
+    publish(TOPICS.GOAL, 0.0)
+
+    yield publish
+
+    commands.put(None)
+    node.join(timeout=10)
+
+
+def test_waits_for_messages_of_the_step(collector, publish):
+    publish(TOPICS.LASER, 1.0)
+    publish(TOPICS.ROBOT_STATE, 1.0)
+    collector.wait(min_stamp=rospy.Time.from_sec(1.0))
+
+    errors = []
+
+    def step():
+        try:
+            collector.wait(min_stamp=rospy.Time.from_sec(1.1))
+        except TimeoutError as e:
+            errors.append(e)
+
+    waiting = threading.Thread(target=step)
+    waiting.start()
+
+    time.sleep(0.2)
+    assert waiting.is_alive()
+
+    publish(TOPICS.LASER, 1.1)
+    publish(TOPICS.ROBOT_STATE, 1.1)
+    waiting.join(timeout=5)
+
+    assert not waiting.is_alive()
+    assert errors == []
+
+
+def test_slow_laser_is_only_required_when_due(collector, publish):
+    # laser at 2 Hz, odometry on every 0.1s step
+    publish(TOPICS.LASER, 2.0)
+    publish(TOPICS.LASER, 2.5)
+    for step in range(5):
+        publish(TOPICS.ROBOT_STATE, 2.5 + step / 10)
+        collector.wait(min_stamp=rospy.Time.from_sec(2.5 + step / 10))
+
+    # the next scan is due
+    publish(TOPICS.ROBOT_STATE, 3.0)
+    with pytest.raises(TimeoutError, match=TOPICS.LASER):
+        collector.wait(min_stamp=rospy.Time.from_sec(3.0))
+
+
+def test_reports_stale_topics(collector, publish):
+    publish(TOPICS.LASER, 4.0)
+
+    with pytest.raises(TimeoutError, match=TOPICS.ROBOT_STATE):
+        collector.wait(min_stamp=rospy.Time.from_sec(4.0))
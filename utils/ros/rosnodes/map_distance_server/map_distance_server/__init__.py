@@ -0,0 +1,8 @@
+from .distance_engine import (
+    OCCUPIED,
+    BaseDistanceEngine,
+    DistanceEngineFactory,
+)
+from .distance_map_cache import DistanceMapCache
+from .distance_map_query import DistanceMapQuery
+from .shared_distance_map import SharedDistanceMap
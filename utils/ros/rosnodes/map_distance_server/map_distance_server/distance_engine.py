@@ -0,0 +1,251 @@
+from typing import Dict, Tuple, Type
+
+import numpy as np
+from scipy import ndimage
+
+# value of occupied and unknown cells in the distance map
+OCCUPIED = -1
+
+
+class BaseDistanceEngine:
+    """
+    A distance engine converts an occupancy grid into a distance map.
+
+    For every free cell the distance map holds the distance in cells to the
+    nearest occupied (or unknown) cell minus one, i.e. free cells adjacent to
+    an obstacle have a distance of 0. Occupied and unknown cells are set to
+    `OCCUPIED`. Cells outside of the map are not treated as obstacles.
+    """
+
+    def compute(self, map_2d: np.ndarray) -> np.ndarray:
+        """
+        Computes the distance map.
+        @map_2d: occupancy grid data in shape (height, width)
+        Returns: integer distance map in shape (height, width)
+        """
+        raise NotImplementedError()
+
+    def update(
+        self,
+        distance_map: np.ndarray,
+        old_map_2d: np.ndarray,
+        new_map_2d: np.ndarray,
+        full_update_ratio: float = 0.5,
+    ) -> Tuple[np.ndarray, int]:
+        """
+        Incrementally updates a distance map after the occupancy grid changed.
+
+        Only cells within the current maximum distance of a changed cell can
+        change their distance, so only the bounding box of the changed cells
+        grown by that distance is recomputed. The recomputation window is
+        grown once more so that obstacles next to the updated region are
+        considered. Falls back to a full recomputation if most of the cells
+        changed or if an obstacle outside of the window could be closer than
+        the recomputed distance (e.g. after large areas were cleared).
+        @distance_map: distance map of the old occupancy grid
+        @old_map_2d: old occupancy grid data in shape (height, width)
+        @new_map_2d: new occupancy grid data in shape (height, width)
+        @full_update_ratio: ratio of changed cells above which the whole map is recomputed
+        Returns: updated distance map and number of recomputed cells
+        """
+        if old_map_2d.shape != new_map_2d.shape:
+            return self.compute(new_map_2d), new_map_2d.size
+
+        changed = old_map_2d != new_map_2d
+        n_changed = np.count_nonzero(changed)
+
+        if n_changed == 0:
+            return np.array(distance_map, copy=True), 0
+
+        if n_changed > full_update_ratio * changed.size:
+            return self.compute(new_map_2d), new_map_2d.size
+
+        height, width = new_map_2d.shape
+        radius = max(int(distance_map.max()), 0) + 1
+
+        rows = np.flatnonzero(changed.any(axis=1))
+        cols = np.flatnonzero(changed.any(axis=0))
+
+        # region whose distances are written back
+        top, bottom = max(rows[0] - radius, 0), min(rows[-1] + radius + 1, height)
+        left, right = max(cols[0] - radius, 0), min(cols[-1] + radius + 1, width)
+
+        # region whose distances are recomputed
+        w_top, w_bottom = max(top - radius, 0), min(bottom + radius, height)
+        w_left, w_right = max(left - radius, 0), min(right + radius, width)
+
+        window_distances = self.compute(new_map_2d[w_top:w_bottom, w_left:w_right])
+        region_distances = window_distances[
+            top - w_top : bottom - w_top, left - w_left : right - w_left
+        ]
+
+        # obstacles outside of the window are at least as far away as the
+        # window border, sides touching the map border are not limiting
+        row_idx, col_idx = np.arange(top, bottom), np.arange(left, right)
+        row_border = np.full(row_idx.shape, height + width)
+        col_border = np.full(col_idx.shape, height + width)
+        if w_top > 0:
+            row_border = np.minimum(row_border, row_idx - w_top + 1)
+        if w_bottom < height:
+            row_border = np.minimum(row_border, w_bottom - row_idx)
+        if w_left > 0:
+            col_border = np.minimum(col_border, col_idx - w_left + 1)
+        if w_right < width:
+            col_border = np.minimum(col_border, w_right - col_idx)
+        border = np.minimum(row_border[:, np.newaxis], col_border[np.newaxis, :])
+
+        if np.any(region_distances > border - 1):
+            return self.compute(new_map_2d), new_map_2d.size
+
+        updated = np.array(distance_map, copy=True)
+        updated[top:bottom, left:right] = region_distances
+
+        return updated, window_distances.size
+
+    @staticmethod
+    def _finalize(free: np.ndarray, distances: np.ndarray) -> np.ndarray:
+        # a map without any obstacle has no finite distances, every free
+        # cell is as far away from obstacles as the map is large
+        if not np.any(~free):
+            distances = np.full(free.shape, max(free.shape))
+
+        return np.where(free, distances - 1, OCCUPIED).astype(np.int32)
+
+
+class DistanceEngineFactory:
+    registry: Dict[str, Type[BaseDistanceEngine]] = {}
+
+    @classmethod
+    def register(cls, name: str):
+        def inner_wrapper(wrapped_class):
+            assert name not in cls.registry, f"DistanceEngine '{name}' already exists!"
+            assert issubclass(wrapped_class, BaseDistanceEngine)
+
+            cls.registry[name] = wrapped_class
+            return wrapped_class
+
+        return inner_wrapper
+
+    @classmethod
+    def instantiate(cls, name: str) -> Type[BaseDistanceEngine]:
+        assert name in cls.registry, f"DistanceEngine '{name}' is not registered!"
+
+        return cls.registry[name]
+
+
+@DistanceEngineFactory.register("chessboard")
+class ChessboardDistanceEngine(BaseDistanceEngine):
+    """
+    Chessboard (8-connected) distance transform. Produces the same output
+    as the legacy engine in a single vectorized pass.
+    """
+
+    def compute(self, map_2d: np.ndarray) -> np.ndarray:
+        free = map_2d == 0
+
+        distances = ndimage.distance_transform_cdt(free, metric="chessboard")
+
+        return self._finalize(free, distances)
+
+
+@DistanceEngineFactory.register("euclidean")
+class EuclideanDistanceEngine(BaseDistanceEngine):
+    """
+    Exact euclidean distance transform. Distances are floored to whole cells,
+    so they are never smaller than the chessboard distances.
+    """
+
+    def compute(self, map_2d: np.ndarray) -> np.ndarray:
+        free = map_2d == 0
+
+        distances = np.floor(ndimage.distance_transform_edt(free)).astype(np.int64)
+
+        return self._finalize(free, distances)
+
+
+@DistanceEngineFactory.register("legacy")
+class LegacyDistanceEngine(BaseDistanceEngine):
+    """
+    Original pure python implementation. Kept as reference for the
+    vectorized engines, it is too slow for large maps.
+    """
+
+    def compute(self, map_2d: np.ndarray) -> np.ndarray:
+        height_in_cell, width_in_cell = map_2d.shape
+
+        def get_index(x, y):
+            return x * width_in_cell + y
+
+        free_space_indices = np.where(map_2d == 0)
+        free_space_coordinates = np.array(free_space_indices).transpose()
+
+        coordinates_with_length = np.full(
+            height_in_cell * width_in_cell, OCCUPIED
+        )  ## Hier wird die Länge gespeichert
+        coordinates_length_dict = (
+            {}
+        )  # Für schnellen Zugriff dict mit key = Länge und value = Array[(x, y)]
+
+        # Loop over all free spaces and all neighbors and set distance of current
+        # cell to 0 if neighbors have no distance (are obstacles) or to
+        # nearest distance + 1 (cell is one more step away from obstacle than
+        # neighbor)
+        for x, y in free_space_coordinates:
+            dist = float("inf")
+
+            for j in range(-1, 2):
+                for i in range(-1, 2):
+                    if (i == 0 and j == 0) or x + j < 0 or y + i < 0:
+                        continue
+
+                    try:
+                        val = map_2d[x + j, y + i]
+                    except:
+                        continue
+
+                    if val != 0:
+                        dist = 0
+                        continue
+
+                    index = get_index(x + j, y + i)
+
+                    if coordinates_with_length[index] >= 0:
+                        dist = min(coordinates_with_length[index] + 1, dist)
+
+            coordinates_length_dict.setdefault(dist, []).append((x, y))
+            coordinates_with_length[get_index(x, y)] = dist
+
+        if not coordinates_length_dict:
+            return np.reshape(coordinates_with_length, map_2d.shape).astype(np.int32)
+
+        min_key, max_key = min(coordinates_length_dict.keys()), max(
+            coordinates_length_dict.keys()
+        )
+
+        # Loop again over all cells from lowest to highest distance and update
+        # all direct neighbors -> Set all distance to max current_dist + 1
+        for key in range(min_key, max_key + 1):
+            if not coordinates_length_dict.get(key):
+                continue
+
+            for x, y in coordinates_length_dict[key]:
+                for j in range(-1, 2):
+                    for i in range(-1, 2):
+                        if (i == 0 and j == 0) or x + j < 0 or y + i < 0:
+                            continue
+
+                        try:
+                            val = map_2d[x + j, y + i]
+                        except:
+                            ## Out of bounds
+                            continue
+
+                        index = get_index(x + j, y + i)
+
+                        if coordinates_with_length[index] > key + 1:
+                            coordinates_with_length[index] = key + 1
+                            coordinates_length_dict.setdefault(key + 1, []).append(
+                                (x + j, y + i)
+                            )
+
+        return np.reshape(coordinates_with_length, map_2d.shape).astype(np.int32)
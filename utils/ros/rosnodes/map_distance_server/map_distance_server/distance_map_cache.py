@@ -0,0 +1,121 @@
+import hashlib
+import os
+import struct
+from typing import Optional
+
+import numpy as np
+from nav_msgs.msg import OccupancyGrid
+
+
+class DistanceMapCache:
+    """
+    Binary on-disk cache for distance maps.
+
+    The file consists of a fixed size header followed by the raw int32
+    distance map in row-major order, so loading it is a single memory map
+    instead of decoding every cell. The header holds the content hash of
+    the occupancy grid the distance map was computed from, which is used to
+    detect and discard stale caches (e.g. after the map was edited).
+    """
+
+    FILE_NAME = "distance_map.bin"
+
+    MAGIC = b"ARNDMAP1"
+    # magic, sha256 digest of the map, resolution, width, height
+    HEADER = struct.Struct("<8s32sdII")
+    DTYPE = np.dtype("<i4")
+
+    _path: str
+
+    def __init__(self, path: str):
+        """
+        @path: path of the cache file
+        """
+        self._path = path
+
+    @property
+    def path(self) -> str:
+        return self._path
+
+    @staticmethod
+    def map_hash(occupancy_grid: OccupancyGrid, engine: str = "") -> bytes:
+        """
+        Content hash of an occupancy grid.
+        @occupancy_grid: map the distance map is computed from
+        @engine: name of the distance engine, distance maps of different engines are not interchangeable
+        """
+        info = occupancy_grid.info
+
+        digest = hashlib.sha256()
+        digest.update(engine.encode("utf-8"))
+        digest.update(
+            struct.pack(
+                "<IIddd",
+                info.width,
+                info.height,
+                info.resolution,
+                info.origin.position.x,
+                info.origin.position.y,
+            )
+        )
+        digest.update(np.asarray(occupancy_grid.data, dtype=np.int8).tobytes())
+
+        return digest.digest()
+
+    def load(self, map_hash: bytes) -> Optional[np.ndarray]:
+        """
+        Memory maps the cached distance map.
+        @map_hash: expected content hash, see `map_hash`
+        Returns: read-only distance map in shape (height, width) or None if the cache is missing, stale or corrupt
+        """
+        try:
+            with open(self._path, "rb") as file:
+                header = file.read(DistanceMapCache.HEADER.size)
+        except OSError:
+            return None
+
+        if len(header) != DistanceMapCache.HEADER.size:
+            return None
+
+        magic, cached_hash, _, width, height = DistanceMapCache.HEADER.unpack(header)
+
+        if magic != DistanceMapCache.MAGIC or cached_hash != map_hash:
+            return None
+
+        expected_size = (
+            DistanceMapCache.HEADER.size
+            + width * height * DistanceMapCache.DTYPE.itemsize
+        )
+        if os.path.getsize(self._path) != expected_size:
+            return None
+
+        return np.memmap(
+            self._path,
+            dtype=DistanceMapCache.DTYPE,
+            mode="r",
+            offset=DistanceMapCache.HEADER.size,
+            shape=(height, width),
+        )
+
+    def save(self, map_hash: bytes, distance_map: np.ndarray, resolution: float):
+        """
+        Writes the distance map to the cache. The file is replaced atomically.
+        @map_hash: content hash of the map, see `map_hash`
+        @distance_map: distance map in shape (height, width)
+        @resolution: map resolution in m / cell
+        """
+        height, width = distance_map.shape
+
+        tmp_path = f"{self._path}.{os.getpid()}.tmp"
+
+        with open(tmp_path, "wb") as file:
+            file.write(
+                DistanceMapCache.HEADER.pack(
+                    DistanceMapCache.MAGIC, map_hash, resolution, width, height
+                )
+            )
+            file.write(
+                np.ascontiguousarray(distance_map, dtype=DistanceMapCache.DTYPE).tobytes()
+            )
+
+        os.replace(tmp_path, self._path)
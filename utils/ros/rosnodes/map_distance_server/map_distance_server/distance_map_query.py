@@ -0,0 +1,120 @@
+from typing import Optional, Tuple
+
+import numpy as np
+
+from .distance_engine import OCCUPIED
+
+
+class DistanceMapQuery:
+    """
+    Point, window and sampling queries on a distance map.
+
+    Cell (row, col) of the distance map is located at
+    origin + (col, row) * resolution in the map frame.
+    """
+
+    _distance_map: np.ndarray
+    _resolution: float
+    _origin: Tuple[float, float]
+
+    _cells_by_distance: Optional[np.ndarray]
+    _sorted_distances: Optional[np.ndarray]
+
+    def __init__(
+        self,
+        distance_map: np.ndarray,
+        resolution: float,
+        origin: Tuple[float, float],
+    ):
+        """
+        @distance_map: distance map in shape (height, width)
+        @resolution: map resolution in m / cell
+        @origin: (x, y) position of cell (0, 0) in the map frame
+        """
+        self._distance_map = distance_map
+        self._resolution = resolution
+        self._origin = origin
+
+        self._cells_by_distance = None
+        self._sorted_distances = None
+
+    @property
+    def distance_map(self) -> np.ndarray:
+        return self._distance_map
+
+    def to_cells(self, x: np.ndarray, y: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Converts positions in the map frame to (row, col) cell indices.
+        """
+        col = np.rint((np.asarray(x) - self._origin[0]) / self._resolution)
+        row = np.rint((np.asarray(y) - self._origin[1]) / self._resolution)
+
+        return row.astype(np.int64), col.astype(np.int64)
+
+    def distances(self, x: np.ndarray, y: np.ndarray) -> np.ndarray:
+        """
+        Batched point lookup.
+        @x, y: positions in the map frame in meters
+        Returns: distance in cells of every point, `OCCUPIED` for points outside of the map
+        """
+        row, col = self.to_cells(x, y)
+        height, width = self._distance_map.shape
+
+        inside = (row >= 0) & (row < height) & (col >= 0) & (col < width)
+
+        result = np.full(row.shape, OCCUPIED, dtype=np.int32)
+        result[inside] = self._distance_map[row[inside], col[inside]]
+
+        return result
+
+    def window(
+        self, x: int, y: int, width: int, height: int
+    ) -> Tuple[np.ndarray, Tuple[float, float]]:
+        """
+        Rectangular window lookup, clipped to the map.
+        @x, y: column and row of the upper left cell of the window
+        @width, height: size of the window in cells
+        Returns: distances in the window in shape (height, width) and the origin of the window in the map frame
+        """
+        map_height, map_width = self._distance_map.shape
+
+        x, y = min(x, map_width), min(y, map_height)
+        window = self._distance_map[
+            y : min(y + height, map_height), x : min(x + width, map_width)
+        ]
+
+        origin = (
+            self._origin[0] + x * self._resolution,
+            self._origin[1] + y * self._resolution,
+        )
+
+        return window, origin
+
+    def sample_free_cells(
+        self, n: int, min_distance: int, rng: Optional[np.random.Generator] = None
+    ) -> Tuple[np.ndarray, np.ndarray, int]:
+        """
+        Samples cells with a distance greater than min_distance without replacement.
+        @n: number of cells to sample, less cells are returned if not enough are available
+        @min_distance: exclusive lower bound of the distance in cells
+        Returns: rows and cols of the sampled cells and the number of available cells
+        """
+        if rng is None:
+            rng = np.random.default_rng()
+
+        if self._cells_by_distance is None:
+            # sorted by distance, cells above a threshold form a suffix
+            flat = self._distance_map.ravel()
+            order = np.argsort(flat, kind="stable")
+            self._cells_by_distance = order
+            self._sorted_distances = flat[order]
+
+        start = np.searchsorted(self._sorted_distances, min_distance, side="right")
+        available = len(self._cells_by_distance) - start
+
+        picks = start + rng.choice(available, size=min(n, available), replace=False)
+        row, col = np.unravel_index(
+            self._cells_by_distance[picks], self._distance_map.shape
+        )
+
+        return row, col, int(available)
@@ -0,0 +1,205 @@
+import os
+import struct
+import zlib
+from typing import Optional
+
+import numpy as np
+from nav_msgs.msg import MapMetaData
+
+
+class SharedDistanceMap:
+    """
+    Distance map shared between all processes of a host.
+
+    The map distance server writes the distance map into a memory mapped file
+    (by default in /dev/shm, i.e. POSIX shared memory) and every client maps
+    the same pages read-only instead of keeping a private copy. Every publish
+    writes a new file and atomically replaces the old one, so clients never
+    see a partially written map and keep a consistent view of the old map
+    until they refresh. The header holds a generation counter which is
+    incremented on every publish and used by clients to detect new maps.
+    """
+
+    SHM_DIR = "/dev/shm"
+    FILE_PREFIX = "arena_distance_map"
+
+    MAGIC = b"ARNDSHM1"
+    # magic, generation, resolution, width, height, origin x, origin y
+    HEADER = struct.Struct("<8sQdIIdd")
+    DTYPE = np.dtype("<i4")
+
+    _path: str
+    _generation: int
+    _distance_map: Optional[np.ndarray]
+    _info: Optional[MapMetaData]
+
+    def __init__(self, path: str):
+        """
+        @path: path of the shared file, see `default_path`
+        """
+        self._path = path
+        self._generation = 0
+        self._distance_map = None
+        self._info = None
+
+    @staticmethod
+    def default_path(master_uri: Optional[str] = None) -> str:
+        """
+        Path of the shared file, unique per ROS master so that multiple
+        simulations on the same host do not share their distance maps.
+        @master_uri: ROS master uri, defaults to $ROS_MASTER_URI
+        """
+        if master_uri is None:
+            master_uri = os.environ.get("ROS_MASTER_URI", "")
+
+        directory = (
+            SharedDistanceMap.SHM_DIR
+            if os.path.isdir(SharedDistanceMap.SHM_DIR)
+            else os.environ.get("TMPDIR", "/tmp")
+        )
+
+        return os.path.join(
+            directory,
+            f"{SharedDistanceMap.FILE_PREFIX}_{zlib.crc32(master_uri.encode('utf-8')):08x}",
+        )
+
+    @property
+    def path(self) -> str:
+        return self._path
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    @property
+    def distance_map(self) -> Optional[np.ndarray]:
+        return self._distance_map
+
+    @property
+    def info(self) -> Optional[MapMetaData]:
+        return self._info
+
+    def read_generation(self) -> int:
+        """
+        Reads the generation of the currently published distance map.
+        Returns: generation or 0 if nothing was published yet
+        """
+        try:
+            with open(self._path, "rb") as file:
+                header = file.read(SharedDistanceMap.HEADER.size)
+        except OSError:
+            return 0
+
+        if len(header) != SharedDistanceMap.HEADER.size:
+            return 0
+
+        magic, generation, *_ = SharedDistanceMap.HEADER.unpack(header)
+
+        return generation if magic == SharedDistanceMap.MAGIC else 0
+
+    def publish(self, distance_map: np.ndarray, info: MapMetaData) -> int:
+        """
+        Publishes a new distance map.
+        @distance_map: distance map in shape (height, width)
+        @info: metadata of the map the distance map was computed from
+        Returns: generation of the published distance map
+        """
+        height, width = distance_map.shape
+
+        generation = max(self._generation, self.read_generation()) + 1
+
+        tmp_path = f"{self._path}.{os.getpid()}.tmp"
+
+        with open(tmp_path, "wb") as file:
+            file.write(
+                SharedDistanceMap.HEADER.pack(
+                    SharedDistanceMap.MAGIC,
+                    generation,
+                    info.resolution,
+                    width,
+                    height,
+                    info.origin.position.x,
+                    info.origin.position.y,
+                )
+            )
+            file.write(
+                np.ascontiguousarray(distance_map, dtype=SharedDistanceMap.DTYPE).tobytes()
+            )
+
+        os.replace(tmp_path, self._path)
+
+        self._generation = generation
+
+        return generation
+
+    def attach(self) -> bool:
+        """
+        Maps the currently published distance map read-only.
+        Returns: True if a distance map is attached
+        """
+        try:
+            file = open(self._path, "rb")
+        except OSError:
+            return False
+
+        # header and data are read through the same file object, a
+        # concurrent publish replaces the path but not the opened file
+        with file:
+            header = file.read(SharedDistanceMap.HEADER.size)
+
+            if len(header) != SharedDistanceMap.HEADER.size:
+                return False
+
+            (
+                magic,
+                generation,
+                resolution,
+                width,
+                height,
+                origin_x,
+                origin_y,
+            ) = SharedDistanceMap.HEADER.unpack(header)
+
+            if magic != SharedDistanceMap.MAGIC:
+                return False
+
+            distance_map = np.memmap(
+                file,
+                dtype=SharedDistanceMap.DTYPE,
+                mode="r",
+                offset=SharedDistanceMap.HEADER.size,
+                shape=(height, width),
+            )
+
+        info = MapMetaData()
+        info.resolution = resolution
+        info.width = width
+        info.height = height
+        info.origin.position.x = origin_x
+        info.origin.position.y = origin_y
+        info.origin.orientation.w = 1
+
+        self._distance_map = distance_map
+        self._info = info
+        self._generation = generation
+
+        return True
+
+    def refresh(self) -> bool:
+        """
+        Attaches to the published distance map if its generation changed.
+        Returns: True if a new distance map was attached
+        """
+        if self._distance_map is not None and self.read_generation() == self._generation:
+            return False
+
+        return self.attach()
+
+    def unlink(self):
+        """
+        Removes the shared file. Attached clients keep their mapping.
+        """
+        try:
+            os.remove(self._path)
+        except FileNotFoundError:
+            pass
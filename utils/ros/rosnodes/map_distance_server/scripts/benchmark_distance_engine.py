@@ -0,0 +1,85 @@
+#! /usr/bin/env python3
+
+import argparse
+import time
+
+import numpy as np
+from map_distance_server.distance_engine import DistanceEngineFactory
+
+# maps larger than this are not checked against the legacy engine
+LEGACY_MAX_SIZE = 200
+
+
+def generate_map(size: int, obstacle_ratio: float, seed: int) -> np.ndarray:
+    """
+    Generates a square occupancy grid with a closed border, randomly placed
+    rectangular obstacles and some unknown cells.
+    """
+    rng = np.random.default_rng(seed)
+
+    map_2d = np.zeros((size, size), dtype=np.int8)
+    map_2d[0, :] = map_2d[-1, :] = map_2d[:, 0] = map_2d[:, -1] = 100
+
+    n_obstacles = int(size * size * obstacle_ratio / 16)
+    for _ in range(n_obstacles):
+        x, y = rng.integers(0, size, 2)
+        w, h = rng.integers(1, 8, 2)
+        map_2d[y : y + h, x : x + w] = 100
+
+    map_2d[rng.random((size, size)) < 0.001] = -1
+
+    return map_2d
+
+
+def benchmark(engine_name: str, map_2d: np.ndarray, repeats: int) -> float:
+    engine = DistanceEngineFactory.instantiate(engine_name)()
+
+    start = time.perf_counter()
+    for _ in range(repeats):
+        engine.compute(map_2d)
+
+    return (time.perf_counter() - start) / repeats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Compares the distance engines of the map distance server."
+    )
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[50, 100, 200, 400, 800]
+    )
+    parser.add_argument("--obstacle-ratio", type=float, default=0.1)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    engines = sorted(DistanceEngineFactory.registry.keys())
+
+    print(f"{'size':>6} {'engine':>12} {'time [s]':>12} {'cells/s':>14} {'legacy match':>14}")
+
+    for size in args.sizes:
+        map_2d = generate_map(size, args.obstacle_ratio, args.seed)
+
+        reference = (
+            DistanceEngineFactory.instantiate("legacy")().compute(map_2d)
+            if size <= LEGACY_MAX_SIZE
+            else None
+        )
+
+        for engine_name in engines:
+            if engine_name == "legacy" and reference is None:
+                continue
+
+            duration = benchmark(
+                engine_name, map_2d, 1 if engine_name == "legacy" else args.repeats
+            )
+
+            match = "-"
+            if reference is not None:
+                result = DistanceEngineFactory.instantiate(engine_name)().compute(map_2d)
+                match = str(bool(np.array_equal(result, reference)))
+
+            print(
+                f"{size:>6} {engine_name:>12} {duration:>12.5f} "
+                f"{map_2d.size / duration:>14.0f} {match:>14}"
+            )
@@ -1,15 +1,34 @@
 #!/usr/bin/env python3
 import os
+import time
 from math import isclose
 from pathlib import Path
 
 import numpy as np
 import rospkg
 import rospy
-from map_distance_server.srv import GetDistanceMap, GetDistanceMapResponse
+from map_distance_server import (
+    DistanceEngineFactory,
+    DistanceMapCache,
+    DistanceMapQuery,
+    SharedDistanceMap,
+)
+from map_distance_server.msg import DistanceMapUpdate
+from map_distance_server.srv import (
+    GetDistanceMap,
+    GetDistanceMapResponse,
+    GetDistances,
+    GetDistancesRequest,
+    GetDistancesResponse,
+    GetDistanceWindow,
+    GetDistanceWindowRequest,
+    GetDistanceWindowResponse,
+    SampleFreeCells,
+    SampleFreeCellsRequest,
+    SampleFreeCellsResponse,
+)
 from nav_msgs.msg import OccupancyGrid
 from nav_msgs.srv import GetMap
-from PIL import Image
 from std_msgs.msg import String
 
 
@@ -23,163 +42,169 @@ def print_map(map):
 
 
 class MapDistanceServer:
+    # clients attach to the shared distance map published at this path
+    PARAM_SHARED_PATH = "/distance_map/shared_path"
+
     def __init__(self):
-        self._distance_map_path = os.path.join(
-            Path(rospkg.RosPack().get_path("arena-simulation-setup")),
-            "maps",
-            rospy.get_param("map_file"),
-            "distance_map.png",
+        self._distance_engine_name = rospy.get_param("~distance_engine", "chessboard")
+        self._distance_engine = DistanceEngineFactory.instantiate(
+            self._distance_engine_name
+        )()
+
+        self._distance_map_cache = DistanceMapCache(
+            os.path.join(
+                Path(rospkg.RosPack().get_path("arena-simulation-setup")),
+                "maps",
+                rospy.get_param("map_file"),
+                DistanceMapCache.FILE_NAME,
+            )
         )
 
+        self._shared_distance_map = None
+        if rospy.get_param("~shared_distance_map", True):
+            self._shared_distance_map = SharedDistanceMap(
+                rospy.get_param(
+                    "~shared_distance_map_path", SharedDistanceMap.default_path()
+                )
+            )
+            rospy.on_shutdown(self._unlink_shared_distance_map)
+
         rospy.wait_for_service("/static_map")
         self.map_service = rospy.ServiceProxy("/static_map", GetMap)
 
         self.produce_distance_map()
 
+        if self._shared_distance_map is not None:
+            rospy.set_param(
+                MapDistanceServer.PARAM_SHARED_PATH, self._shared_distance_map.path
+            )
+
         self.distance_map_srv = rospy.Service(
             "/distance_map", GetDistanceMap, self._distance_map_srv_handler
         )
+        self.distances_srv = rospy.Service(
+            "/distance_map/points", GetDistances, self._distances_srv_handler
+        )
+        self.distance_window_srv = rospy.Service(
+            "/distance_map/window", GetDistanceWindow, self._distance_window_srv_handler
+        )
+        self.sample_free_cells_srv = rospy.Service(
+            "/distance_map/sample_free_cells",
+            SampleFreeCells,
+            self._sample_free_cells_srv_handler,
+        )
 
     def produce_distance_map(self):
         """Generates and saves or loads the distance map."""
         self.map = self.map_service().map
 
-        if not os.path.exists(self._distance_map_path):
-            # If the distance map does not exist or a new map is provided by map generator
-            distance_map = None
-            self.new_map_data = list(self._get_map_with_distances())
-            self.save_distance_map(
-                self._distance_map_path, self.new_map_data, self.map.info
-            )
-        else:
-            distance_map = self.get_distance_map(self._distance_map_path, self.map.info)
-            self.new_map_data = distance_map
-
-    def _distance_map_srv_handler(self, _):
-        msg = GetDistanceMapResponse()
-
-        msg.header = self.map.header
-        msg.info = self.map.info
-
-        msg.data = self.new_map_data
-
-        return msg
+        self.load_or_compute_distance_map()
 
-    def create_distance_color(self, value):
-        if value < 0:
-            return (0, 0, 0)
+    def load_or_compute_distance_map(self) -> bool:
+        """Loads the distance map of the current map from the cache or
+        computes and caches it if the cache is missing or stale.
 
-        as_bits = "{0:b}".format(pow(255, 3) - value)
+        Returns:
+            bool: True if the distance map had to be computed.
+        """
+        map_hash = DistanceMapCache.map_hash(self.map, self._distance_engine_name)
 
-        return tuple(int(as_bits[(i * 8) : ((i + 1) * 8)], base=2) for i in range(3))
+        distance_map = self._distance_map_cache.load(map_hash)
+        computed = distance_map is None
 
-    def create_distance_value(self, color):
-        m = int("".join(["{0:b}".format(i).rjust(8, "0") for i in color]), base=2)
+        if computed:
+            distance_map = self._get_map_with_distances()
+            self._distance_map_cache.save(
+                map_hash, distance_map, self.map.info.resolution
+            )
 
-        return 0 if m == 0 else pow(255, 3) - m
+        self.map_2d = self._get_map_2d()
+        self.set_distance_map(distance_map)
 
-    def save_distance_map(self, path: str, distance_map, info):
-        width = info.width
-        height = info.height
+        return computed
 
-        distance_map_img = np.array(
-            list(map(self.create_distance_color, distance_map))
-        ).ravel()
+    def set_distance_map(self, distance_map: np.ndarray):
+        """Sets the distance map served by all services."""
+        self.distance_map = distance_map
+        # list of the full map, only built when the full map service is called
+        self._map_data = None
+        self.query = DistanceMapQuery(
+            distance_map,
+            self.map.info.resolution,
+            (self.map.info.origin.position.x, self.map.info.origin.position.y),
+        )
 
-        distance_map_img = np.reshape(distance_map_img, (height, width, 3))
+        if self._shared_distance_map is not None:
+            self._shared_distance_map.publish(distance_map, self.map.info)
 
-        image = Image.fromarray(np.uint8(distance_map_img), "RGB")
+    def _unlink_shared_distance_map(self):
+        if rospy.has_param(MapDistanceServer.PARAM_SHARED_PATH):
+            rospy.delete_param(MapDistanceServer.PARAM_SHARED_PATH)
+        self._shared_distance_map.unlink()
 
-        image.save(path)
+    def _distance_map_srv_handler(self, _):
+        msg = GetDistanceMapResponse()
 
-    def get_distance_map(self, distance_map_path, info):
-        image = map(
-            self.create_distance_value,
-            np.array(Image.open(distance_map_path))
-            .ravel()
-            .reshape((info.width * info.height, 3)),
-        )
+        msg.header = self.map.header
+        msg.info = self.map.info
 
-        return list(image)
+        if self._map_data is None:
+            self._map_data = self.distance_map.ravel().tolist()
+        msg.data = self._map_data
 
-    def _get_map_with_distances(self):
-        width_in_cell, height_in_cell = self.map.info.width, self.map.info.height
+        return msg
 
-        map_2d = np.reshape(self.map.data, (height_in_cell, width_in_cell))
+    def _distances_srv_handler(self, req: GetDistancesRequest):
+        msg = GetDistancesResponse()
 
-        free_space_indices = np.where(map_2d == 0)
-        free_space_coordinates = np.array(free_space_indices).transpose()
+        msg.data = self.query.distances(
+            [point.x for point in req.points], [point.y for point in req.points]
+        ).tolist()
 
-        coordinates_with_length = np.full(
-            len(self.map.data), -1
-        )  ## Hier wird die Länge gespeichert
-        coordinates_length_dict = (
-            {}
-        )  # Für schnellen Zugriff dict mit key = Länge und value = Array[(x, y)]
+        return msg
 
-        # Loop over all free spaces and all neighbors and set distance of current
-        # cell to 0 if neighbors have no distance (are obstacles) or to
-        # nearest distance + 1 (cell is one more step away from obstacle than
-        # neighbor)
-        for x, y in free_space_coordinates:
-            dist = float("inf")
+    def _distance_window_srv_handler(self, req: GetDistanceWindowRequest):
+        msg = GetDistanceWindowResponse()
 
-            for j in range(-1, 2):
-                for i in range(-1, 2):
-                    if (i == 0 and j == 0) or x + j < 0 or y + i < 0:
-                        continue
+        window, origin = self.query.window(req.x, req.y, req.width, req.height)
 
-                    try:
-                        val = map_2d[x + j, y + i]
-                    except:
-                        continue
+        msg.header = self.map.header
+        msg.data = window.ravel().tolist()
 
-                    if val != 0:
-                        dist = 0
-                        continue
+        if window.size == 0:
+            # metadata only request, describes the full map
+            msg.info = self.map.info
+            return msg
 
-                    index = self._get_index(x + j, y + i)
+        msg.info.map_load_time = self.map.info.map_load_time
+        msg.info.resolution = self.map.info.resolution
+        msg.info.height, msg.info.width = window.shape
+        msg.info.origin.position.x, msg.info.origin.position.y = origin
+        msg.info.origin.orientation = self.map.info.origin.orientation
 
-                    if coordinates_with_length[index] >= 0:
-                        dist = min(coordinates_with_length[index] + 1, dist)
+        return msg
 
-            coordinates_length_dict.setdefault(dist, []).append((x, y))
-            coordinates_with_length[self._get_index(x, y)] = dist
+    def _sample_free_cells_srv_handler(self, req: SampleFreeCellsRequest):
+        msg = SampleFreeCellsResponse()
 
-        min_key, max_key = min(coordinates_length_dict.keys()), max(
-            coordinates_length_dict.keys()
+        rows, cols, available = self.query.sample_free_cells(
+            req.n, req.min_distance
         )
 
-        # Loop again over all cells from lowest to highest distance and update
-        # all direct neighbors -> Set all distance to max current_dist + 1
-        for key in range(min_key, max_key + 1):
-            if not coordinates_length_dict.get(key):
-                continue
-
-            for x, y in coordinates_length_dict[key]:
-                for j in range(-1, 2):
-                    for i in range(-1, 2):
-                        if (i == 0 and j == 0) or x + j < 0 or y + i < 0:
-                            continue
-
-                        try:
-                            val = map_2d[x + j, y + i]
-                        except:
-                            ## Out of bounds
-                            continue
+        msg.x = cols.tolist()
+        msg.y = rows.tolist()
+        msg.distances = self.query.distance_map[rows, cols].tolist()
+        msg.available = available
 
-                        index = self._get_index(x + j, y + i)
+        return msg
 
-                        if coordinates_with_length[index] > key + 1:
-                            coordinates_with_length[index] = key + 1
-                            coordinates_length_dict.setdefault(key + 1, []).append(
-                                (x + j, y + i)
-                            )
+    def _get_map_2d(self) -> np.ndarray:
+        width_in_cell, height_in_cell = self.map.info.width, self.map.info.height
 
-        # print(list(coordinates_with_length))
+        return np.reshape(self.map.data, (height_in_cell, width_in_cell))
 
-        return coordinates_with_length
-        # return np.reshape(coordinates_with_length, (height_in_cell, width_in_cell))
+    def _get_map_with_distances(self):
+        return self._distance_engine.compute(self._get_map_2d())
 
     def _get_index(self, x, y):
         return x * self.map.info.width + y
@@ -188,10 +213,16 @@ class MapDistanceServer:
 class DynamicMapDistanceServer(MapDistanceServer):
     def __init__(self):
         self._first_map = True
+        self._incremental_update = rospy.get_param("~incremental_update", True)
+        self._full_update_ratio = rospy.get_param("~full_update_ratio", 0.5)
         # Publish a message to the MapGenerator that the new distance map is ready
         self.new_dist_map_pub = rospy.Publisher(
             "/signal_new_distance_map", String, queue_size=1
         )
+        # Publish timings of every distance map update
+        self.dist_map_update_pub = rospy.Publisher(
+            "/distance_map_update", DistanceMapUpdate, queue_size=10
+        )
         super().__init__()
         # Subscribe to the map topic to know when a new map is generated
         self.map_sub = rospy.Subscriber("/map", OccupancyGrid, self._map_callback)
@@ -203,16 +234,52 @@ class DynamicMapDistanceServer(MapDistanceServer):
             # as static server only contains the first map
             self.map = self.map_service().map
 
-        if not os.path.exists(self._distance_map_path) or not self._first_map:
-            # If the distance map does not exist or a new map is provided by map generator
-            self.new_map_data = list(self._get_map_with_distances())
-            self.new_dist_map_pub.publish(String(""))
-            self.save_distance_map(
-                self._distance_map_path, self.new_map_data, self.map.info
-            )
+            if self.load_or_compute_distance_map():
+                self.new_dist_map_pub.publish(String(""))
+            return
+
+        # a new map is provided by map generator
+        if self._incremental_update:
+            self.update_distance_map()
         else:
-            distance_map = self.get_distance_map(self._distance_map_path, self.map.info)
-            self.new_map_data = distance_map
+            self.load_or_compute_distance_map()
+        self.new_dist_map_pub.publish(String(""))
+
+    def update_distance_map(self):
+        """Incrementally updates the distance map of the previous map to the
+        current map and publishes the update timings."""
+        start = time.perf_counter()
+
+        old_map_2d, new_map_2d = self.map_2d, self._get_map_2d()
+
+        self.distance_map, cells_recomputed = self._distance_engine.update(
+            self.distance_map, old_map_2d, new_map_2d, self._full_update_ratio
+        )
+        self.map_2d = new_map_2d
+        self.set_distance_map(self.distance_map)
+
+        duration = time.perf_counter() - start
+
+        self._distance_map_cache.save(
+            DistanceMapCache.map_hash(self.map, self._distance_engine_name),
+            self.distance_map,
+            self.map.info.resolution,
+        )
+
+        msg = DistanceMapUpdate()
+        msg.header.stamp = rospy.Time.now()
+        msg.incremental = cells_recomputed < new_map_2d.size
+        msg.cells_changed = (
+            np.count_nonzero(old_map_2d != new_map_2d)
+            if old_map_2d.shape == new_map_2d.shape
+            else new_map_2d.size
+        )
+        msg.cells_recomputed = cells_recomputed
+        msg.cells_total = new_map_2d.size
+        msg.recomputed_ratio = cells_recomputed / new_map_2d.size
+        msg.duration = duration
+
+        self.dist_map_update_pub.publish(msg)
 
     def _map_callback(self, msg: OccupancyGrid):
         """Callback for when a new map is generated and published.
@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("scipy")
+pytest.importorskip("nav_msgs")
+
+from map_distance_server.distance_engine import DistanceEngineFactory
+
+
+def random_map(rng: np.random.Generator, shape, obstacle_ratio: float) -> np.ndarray:
+    map_2d = np.zeros(shape, dtype=np.int8)
+    map_2d[rng.random(shape) < obstacle_ratio] = 100
+    map_2d[rng.random(shape) < 0.01] = -1
+    # the legacy engine can't seed its first pass from a free top left corner
+    map_2d[0, 0] = 100
+    return map_2d
+
+
+def bordered_map(rng: np.random.Generator, shape, n_obstacles: int) -> np.ndarray:
+    map_2d = np.zeros(shape, dtype=np.int8)
+    map_2d[0, :] = map_2d[-1, :] = map_2d[:, 0] = map_2d[:, -1] = 100
+
+    for _ in range(n_obstacles):
+        y, x = rng.integers(0, shape[0]), rng.integers(0, shape[1])
+        h, w = rng.integers(1, 8, 2)
+        map_2d[y : y + h, x : x + w] = 100
+    map_2d[rng.random(shape) < 0.001] = -1
+    return map_2d
+
+
+def assert_matches_legacy(map_2d: np.ndarray):
+    expected = DistanceEngineFactory.instantiate("legacy")().compute(map_2d)
+    result = DistanceEngineFactory.instantiate("chessboard")().compute(map_2d)
+
+    assert result.shape == expected.shape
+    np.testing.assert_array_equal(result, expected)
+
+
+@pytest.mark.parametrize("shape", [(1, 1), (1, 7), (7, 1), (20, 20), (31, 47)])
+@pytest.mark.parametrize("obstacle_ratio", [0.01, 0.05, 0.3, 1.0])
+def test_random_maps(shape, obstacle_ratio):
+    rng = np.random.default_rng(0)
+    for _ in range(3):
+        assert_matches_legacy(random_map(rng, shape, obstacle_ratio))
+
+
+@pytest.mark.parametrize("shape", [(3, 3), (40, 40), (25, 60)])
+def test_bordered_maps(shape):
+    rng = np.random.default_rng(1)
+    for n_obstacles in [0, 5, 20]:
+        assert_matches_legacy(bordered_map(rng, shape, n_obstacles))
+
+
+def test_sparse_obstacles():
+    map_2d = np.zeros((15, 15), dtype=np.int8)
+    map_2d[0, 1] = map_2d[4, 9] = 100
+
+    assert_matches_legacy(map_2d)